@@ -0,0 +1,55 @@
+# The pairs and idioms that macro fusion and move elimination rewrite, which gcc does not
+# emit for the C programs: calls that stay auipc + jalr, slt/sltu followed by bnez/beqz,
+# and the xor/sub zero idioms, along with lui + addi constants and moves.
+    .option norelax
+    .text
+    .globl main
+main:
+    addi sp, sp, -16
+    sw ra, 12(sp)
+    sw s0, 8(sp)
+    sw s1, 4(sp)
+    li s0, 0
+    li s1, 0
+1:
+    mv a0, s1
+    call step
+    add s0, s0, a0
+    addi s1, s1, 1
+    li t0, 12
+    slt t1, s1, t0
+    bnez t1, 1b
+    # The fused branch still writes the comparison.
+    add s0, s0, t1
+    mv a0, s0
+    lw s1, 4(sp)
+    lw s0, 8(sp)
+    lw ra, 12(sp)
+    addi sp, sp, 16
+    ret
+
+# step(i): 0x123 + (i < 5 ? 2 * i + 1 : i - 3) + (i < 8), with x - x for zero.
+step:
+    li t2, 0x12345678
+    srli t2, t2, 20
+    xor t3, t3, t3
+    sub t4, a0, a0
+    li t5, 5
+    sltu t6, a0, t5
+    beqz t6, 2f
+    add a1, a0, a0
+    addi a1, a1, 1
+    j 3f
+2:
+    addi a1, a0, -3
+3:
+    add a1, a1, t3
+    add a1, a1, t4
+    add a1, a1, t6
+    li t5, 8
+    slt t6, a0, t5
+    beqz t6, 4f
+    addi a1, a1, 1
+4:
+    add a0, a1, t2
+    ret
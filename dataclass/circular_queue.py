@@ -74,6 +74,16 @@ class CircularQueue:
     def front(self) -> ArrayRead:
         return self._storage[self._head[0]]
 
+    def entries(self) -> list[tuple[ArrayRead, Value]]:
+        """(value, occupied) of every slot, oldest first from the head."""
+        count_uint = self._count[0].bitcast(UInt(self.count_bits))
+        pointer = self._head[0]
+        entries = []
+        for offset in range(self.depth):
+            entries.append((self._storage[pointer], UInt(self.count_bits)(offset) < count_uint))
+            pointer = self._increment_pointer(pointer)
+        return entries
+
     def operate(
         self,
         *,
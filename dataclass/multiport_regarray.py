@@ -8,31 +8,46 @@ from assassyn.frontend import *
 
 
 @dataclass(frozen=True)
-class DualWriteReadResult:
+class MultiPortReadResult:
     """Output bundle for the multi-read view of the register file."""
 
     values: Tuple[Value, ...]
 
 
-class DualWriteRegArray:
-    """Two-write-port register array implemented with explicit indexing."""
+# (enable, addr, data) of one write port.
+WritePort = Tuple[Value, Value, Value]
+
+
+class MultiPortRegArray:
+    """
+    Register array with `num_write_ports` write and `num_read_ports` read ports.
+
+    Every entry is its own register, so all write ports can update different entries in
+    the same cycle. When several ports write one entry, the highest-numbered enabled port
+    wins. Reads go through a balanced mux tree over the address bits, and with bypassing
+    they return the data written in the same cycle instead of the stored value.
+    """
 
     def __init__(
         self,
         element_shape: DType,
         depth: int,
         *,
+        num_write_ports: int = 2,
         num_read_ports: int = 2,
         initializer: list[int] | None = None,
         name: str | None = None,
-        bypass_reads: bool = True,
+        bypass_reads: bool = False,
     ) -> None:
         if depth <= 0:
             raise ValueError("Register array depth must be positive.")
+        if num_write_ports <= 0:
+            raise ValueError("Number of write ports must be positive.")
         if num_read_ports < 0:
             raise ValueError("Number of read ports cannot be negative.")
         self.depth = depth
-        self.name = name or "dual_write_regarray"
+        self.name = name or "multiport_regarray"
+        self.num_write_ports = num_write_ports
         self.num_read_ports = num_read_ports
         self.addr_bits = max(1, math.ceil(math.log2(depth)))
         self._element_shape = element_shape
@@ -48,21 +63,112 @@ class DualWriteRegArray:
             RegArray(element_shape, 1, initializer=[value]) for value in initializer
         ]
         self._index_literals = [Bits(self.addr_bits)(idx) for idx in range(depth)]
+        # The writes of the current cycle, for bypassed reads.
+        self._writes: list[WritePort] | None = None
 
     def read_ports(
         self,
-        read_addrs: Sequence[Value]
-    ) -> DualWriteReadResult:
-        """Compute the read-port values without mutating state."""
+        read_addrs: Sequence[Value],
+        *,
+        bypass: bool | None = None,
+    ) -> MultiPortReadResult:
+        """
+        Compute the read-port values without mutating state.
+
+        `bypass` (default: the `bypass_reads` of the array) forwards the data of this
+        cycle's `write_ports`, which must then be applied first.
+        """
 
         self._validate_read_port_count(read_addrs)
+        if bypass is None:
+            bypass = self._default_bypass
+        if bypass and self._writes is None:
+            raise ValueError("Bypassed reads need the write ports of the cycle applied first.")
 
         read_values = []
         for addr in read_addrs:
-            value = self._read_mux(addr)
+            value = self._read_tree(addr)
+            if bypass:
+                for enable, write_addr, data in self._writes:
+                    value = (enable & (write_addr == addr)).select(data, value)
             read_values.append(value)
 
-        return DualWriteReadResult(values=tuple(read_values))
+        return MultiPortReadResult(values=tuple(read_values))
+
+    def write_ports(self, writes: Sequence[WritePort]) -> None:
+        """Apply the (enable, addr, data) write ports for the current cycle."""
+
+        if len(writes) != self.num_write_ports:
+            raise ValueError(
+                f"Expected {self.num_write_ports} write ports, got {len(writes)}."
+            )
+        self._writes = list(writes)
+        self._commit_writes(self._writes)
+
+    def _validate_read_port_count(self, read_addrs: Sequence[Value]) -> None:
+        if len(read_addrs) != self.num_read_ports:
+            raise ValueError(
+                f"Expected {self.num_read_ports} read addresses, got {len(read_addrs)}."
+            )
+
+    def _commit_writes(self, writes: Sequence[WritePort]) -> None:
+        for idx, literal in enumerate(self._index_literals):
+            current_value = self._storage[idx][0]
+            next_value = current_value
+            any_hit = Bits(1)(0)
+            for enable, addr, data in writes:
+                hit = enable & (addr == literal)
+                next_value = hit.select(data, next_value)
+                any_hit = any_hit | hit
+
+            with Condition(any_hit):
+                self._storage[idx][0] = next_value
+
+    def _read_tree(self, addr: Value) -> Value:
+        current_layer = [storage[0] for storage in self._storage]
+        next_power = 1 << self.addr_bits
+        while len(current_layer) < next_power:
+            current_layer.append(self._element_shape(0))
+
+        for bit_idx in range(self.addr_bits):
+            selector = addr[bit_idx:bit_idx]
+            current_layer = [
+                selector.select(current_layer[i + 1], current_layer[i])
+                for i in range(0, len(current_layer), 2)
+            ]
+
+        return current_layer[0]
+
+
+DualWriteReadResult = MultiPortReadResult
+
+
+class DualWriteRegArray(MultiPortRegArray):
+    """
+    `MultiPortRegArray` with two write ports, which never write the same entry.
+
+    Reads see the stored values unless `bypass_reads` is set, as they always have.
+    """
+
+    def __init__(
+        self,
+        element_shape: DType,
+        depth: int,
+        *,
+        num_read_ports: int = 2,
+        initializer: list[int] | None = None,
+        name: str | None = None,
+        bypass_reads: bool = False,
+    ) -> None:
+        super().__init__(
+            element_shape,
+            depth,
+            num_write_ports=2,
+            num_read_ports=num_read_ports,
+            initializer=initializer,
+            name=name or "dual_write_regarray",
+            bypass_reads=bypass_reads,
+        )
 
     def write_ports(
         self,
@@ -80,48 +186,183 @@ class DualWriteRegArray:
         with Condition(both_fire):
             assume(write0_addr != write1_addr)
 
-        self._commit_writes(
-            write0_enable=write0_enable,
-            write0_addr=write0_addr,
-            write0_data=write0_data,
-            write1_enable=write1_enable,
-            write1_addr=write1_addr,
-            write1_data=write1_data,
-        )
+        writes = [
+            (write0_enable, write0_addr, write0_data),
+            (write1_enable, write1_addr, write1_data),
+        ]
+        super().write_ports(writes)
 
 
-    def _validate_read_port_count(self, read_addrs: Sequence[Value]) -> None:
-        if len(read_addrs) != self.num_read_ports:
-            raise ValueError(
-                f"Expected {self.num_read_ports} read addresses, got {len(read_addrs)}."
-            )
+@dataclass(frozen=True)
+class BankedReadResult:
+    """Values of the read requests, and whether each got a port of its bank."""
+
+    values: Tuple[Value, ...]
+    granted: Tuple[Value, ...]
+
+
+class BankedRegArray:
+    """
+    Register array split into interleaved banks with a fixed number of read ports each.
+
+    Entry `addr` lives in bank `addr % num_banks` at row `addr // num_banks`. `read_ports`
+    routes requests to `read_ports_per_bank` ports per bank, each muxing only
+    `depth // num_banks` entries, and `arbitrate` decides which groups of reads (e.g. the
+    operands of the instructions issued in one cycle) fit.
 
-    def _commit_writes(
+    Indexing (`array[addr]`, `array[addr] = v`) selects the bank like a plain `RegArray`,
+    so it can stand in for one, but each indexed read muxes over every bank. The core
+    writes through indexing and reads its operands through `read_ports`.
+    """
+
+    def __init__(
         self,
+        element_shape: DType,
+        depth: int,
         *,
-        write0_enable: Value,
-        write0_addr: Value,
-        write0_data: Value,
-        write1_enable: Value,
-        write1_addr: Value,
-        write1_data: Value,
+        num_banks: int = 2,
+        read_ports_per_bank: int = 2,
+        initializer: list[int] | None = None,
+        name: str | None = None,
     ) -> None:
-        for idx, literal in enumerate(self._index_literals):
-            port0_hit = write0_enable & (write0_addr == literal)
-            port1_hit = write1_enable & (write1_addr == literal)
-            any_hit = port0_hit | port1_hit
+        if num_banks <= 0 or num_banks & (num_banks - 1):
+            raise ValueError("Number of banks must be a power of two.")
+        if depth <= 0 or depth % num_banks:
+            raise ValueError("Register array depth must be a positive multiple of the banks.")
+        if read_ports_per_bank <= 0:
+            raise ValueError("Each bank needs at least one read port.")
+        self.depth = depth
+        self.name = name or "banked_regarray"
+        self.num_banks = num_banks
+        self.read_ports_per_bank = read_ports_per_bank
+        self.rows = depth // num_banks
+        self.addr_bits = max(1, math.ceil(math.log2(depth)))
+        self.bank_bits = num_banks.bit_length() - 1
+        self._element_shape = element_shape
+        if initializer is None:
+            initializer = [0] * depth
+        elif len(initializer) != depth:
+            raise ValueError(
+                f"Initializer length {len(initializer)} does not match depth {depth}."
+            )
 
-            current_value = self._storage[idx][0]
-            next_value = port0_hit.select(write0_data, current_value)
-            next_value = port1_hit.select(write1_data, next_value)
+        self.banks = [
+            RegArray(element_shape, self.rows, initializer=initializer[bank::num_banks])
+            for bank in range(num_banks)
+        ]
 
-            with Condition(any_hit):
-                self._storage[idx][0] = next_value
+    def bank_of(self, addr: Value) -> Value:
+        if self.bank_bits == 0:
+            return Bits(1)(0)
+        return addr[0 : self.bank_bits - 1]
+
+    def row_of(self, addr: Value) -> Value:
+        if self.rows == 1:
+            return Bits(1)(0)
+        return addr[self.bank_bits : self.addr_bits - 1]
+
+    def __getitem__(self, addr: Value) -> Value:
+        row = self.row_of(addr)
+        return self._select_bank(addr, [bank[row] for bank in self.banks])
+
+    def __setitem__(self, addr: Value, value: Value) -> None:
+        row = self.row_of(addr)
+        bank_idx = self.bank_of(addr)
+        for bank, array in enumerate(self.banks):
+            with Condition(bank_idx == self._bank_literal(bank)):
+                array[row] = value
+
+    def read_ports(
+        self, requests: Sequence[Tuple[Value, Value]], *, arbitrated: bool = False
+    ) -> BankedReadResult:
+        """
+        Read (enable, addr) requests through the bank ports, earlier requests first.
+
+        A request that finds every port of its bank taken is not granted and reads zero.
+        `arbitrated` requests were already granted by `arbitrate` (their enables fit the
+        ports), so they skip the per-request arbitration.
+        """
+        if not requests:
+            return BankedReadResult(values=(), granted=())
+        if arbitrated:
+            grants = [Bits(1)(1) for _ in requests]
+        else:
+            grants = self.arbitrate([[request] for request in requests])
+        rank_type = UInt(max(1, len(requests).bit_length()))
+
+        # The rank of a request among the earlier granted requests to its bank is its port.
+        active = [enable & granted for (enable, _), granted in zip(requests, grants)]
+        banks = [self.bank_of(addr) for _, addr in requests]
+        ranks = []
+        for i in range(len(requests)):
+            rank = rank_type(0)
+            for k in range(i):
+                rank = rank + (active[k] & (banks[k] == banks[i])).zext(rank_type)
+            ranks.append(rank)
+
+        port_values = {}
+        for bank in range(self.num_banks):
+            for port in range(min(self.read_ports_per_bank, len(requests))):
+                row = self.row_of(requests[0][1])
+                for i, (_, addr) in enumerate(requests):
+                    uses = active[i] & (banks[i] == self._bank_literal(bank)) & (ranks[i] == rank_type(port))
+                    row = uses.select(self.row_of(addr), row)
+                port_values[bank, port] = self.banks[bank][row]
+
+        values = []
+        for i in range(len(requests)):
+            value = self._element_shape(0)
+            for (bank, port), port_value in port_values.items():
+                uses = active[i] & (banks[i] == self._bank_literal(bank)) & (ranks[i] == rank_type(port))
+                value = uses.select(port_value, value)
+            values.append(value)
+        return BankedReadResult(values=tuple(values), granted=tuple(grants))
+
+    def arbitrate(
+        self,
+        groups: Sequence[Sequence[Tuple[Value, Value]]],
+        required: Sequence[bool] | None = None,
+    ) -> list[Value]:
+        """
+        Grant groups of (enable, addr) reads in order while their banks have free ports.
+
+        A group is granted as a whole or not at all. A `required` group (one that cannot
+        wait) is always granted and takes its ports first.
+        """
+        required = list(required) if required is not None else [False] * len(groups)
+        total = sum(len(group) for group in groups) + self.read_ports_per_bank
+        count_type = UInt(max(1, total.bit_length()))
+        ports = count_type(self.read_ports_per_bank)
+        used = [count_type(0) for _ in range(self.num_banks)]
+
+        grants: list[Value | None] = [None] * len(groups)
+        order = [i for i in range(len(groups)) if required[i]] + [
+            i for i in range(len(groups)) if not required[i]
+        ]
+        for i in order:
+            demand = []
+            for bank in range(self.num_banks):
+                count = count_type(0)
+                for enable, addr in groups[i]:
+                    hit = enable & (self.bank_of(addr) == self._bank_literal(bank))
+                    count = count + hit.zext(count_type)
+                demand.append(count)
+            granted = Bits(1)(1)
+            if not required[i]:
+                for bank in range(self.num_banks):
+                    granted = granted & ((used[bank] + demand[bank]) <= ports)
+            used = [
+                granted.select(used[bank] + demand[bank], used[bank])
+                for bank in range(self.num_banks)
+            ]
+            grants[i] = granted
+        return grants
+
+    def _bank_literal(self, bank: int) -> Value:
+        return Bits(max(1, self.bank_bits))(bank)
 
-    def _read_mux(self, addr: Value) -> Value:
-        value = self._storage[0][0]
-        for idx in range(1, self.depth):
-            literal = self._index_literals[idx]
-            match = addr == literal
-            value = match.select(self._storage[idx][0], value)
-        return value
+    def _select_bank(self, addr: Value, values: list[Value]) -> Value:
+        for bit in range(self.bank_bits):
+            selector = addr[bit:bit]
+            values = [selector.select(values[i + 1], values[i]) for i in range(0, len(values), 2)]
+        return values[0]
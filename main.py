@@ -1,10 +1,16 @@
+import inspect
+import os
+import time
 from typing import Callable, Sequence
 from assassyn.frontend import *
 from assassyn.backend import *
 from assassyn import utils
 
 from r10k_cpu.downstreams.fetcher_impl import FetcherImpl
+from r10k_cpu.downstreams.early_release import EarlyRelease
 from r10k_cpu.downstreams.free_list import FreeList
+from r10k_cpu.downstreams.icache import InstructionCache
+from r10k_cpu.downstreams.load_bypass import LoadBypass
 from r10k_cpu.downstreams.active_list import ActiveList
 from r10k_cpu.downstreams.alu_queue import ALUQueue
 from r10k_cpu.downstreams.lsq import LSQ, StoreBuffer
@@ -15,7 +21,7 @@ from r10k_cpu.downstreams.predictor import (
     BinaryPredictor,
     Predictor,
 )
-from r10k_cpu.downstreams.scheduler_down import SchedulerDown
+from r10k_cpu.downstreams.scheduler_down import LoadPortDown, SchedulerDown
 from r10k_cpu.downstreams.speculation_state import SpeculationState
 from r10k_cpu.modules.commit import Commit
 from r10k_cpu.modules.decoder import Decoder
@@ -26,12 +32,19 @@ from r10k_cpu.modules.alu import ALU, Multiply_ALU
 from r10k_cpu.modules.writeback import WriteBack
 from r10k_cpu.modules.scheduler import Scheduler
 from r10k_cpu.modules.byte_memory import ByteAddressableMemory
-from r10k_cpu.utils import prepare_byte_files
+from dataclass.multiport_regarray import BankedRegArray
+from r10k_cpu.fusion import MacroFusion
+from r10k_cpu.move_elimination import MoveElimination
+from r10k_cpu.perf_counters import PerfCounters
+from r10k_cpu.pipeline_trace import PipelineTrace
+from r10k_cpu.common import CoreConfig
+from r10k_cpu.build_cache import BuildCacheResult, build_key, cached_build, describe
+from r10k_cpu.utils import memory_depth_for, prepare_byte_files
 
 
 
 def build_cpu(
-    sram_files: Sequence[str | None]= [None, None, None, None, None],
+    sram_files: Sequence[str | None] | None = None,
     verilog: bool = False,
     resource_base: str = os.getcwd(),
     sim_threshold: int = 20480,
@@ -39,45 +52,169 @@ def build_cpu(
     predictor_factory: Callable[[], Predictor] = lambda: BinaryPredictor(
         4, BinaryPredictState.WeaklyNo
     ),
+    icache_factory: Callable[[], InstructionCache] | None = None,
+    load_ports: int = 1,
+    speculative_load_wakeup: bool = False,
+    memory_depth: int = 0x100000,
+    active_list_depth: int = 32,
+    alu_queue_depth: int = 32,
+    lsq_depth: int = 32,
+    physical_registers: int = 64,
+    perf_counters: bool = False,
+    trace: bool = False,
+    commit_log: bool = False,
+    macro_fusion: bool = False,
+    move_elimination: bool = False,
+    early_release: bool = False,
+    register_banks: int = 1,
+    bank_read_ports: int = 2,
+    divider_radix: int = 2,
 ):
-    """Build and elaborate the Naive memory-capable RV32I CPU."""
+    """
+    Build and elaborate the Naive memory-capable RV32I CPU.
+
+    memory_depth is the number of 32-bit words of both the instruction and the data
+    memory. The simulator allocates and initializes all of it at startup, so sizing it
+    to the programs (see `memory_depth_for`) makes each instance start faster and smaller.
+
+    The queue depths and the physical register count form the `CoreConfig`, which sizes
+    every index field and record type; see `CoreConfig` for the constraints.
+
+    perf_counters adds the event counters of `r10k_cpu.perf_counters`: they are logged in
+    a `[Perf]` line before the terminator line and read by rdcycle, rdinstret and the
+    hpmcounter CSRs. Without them those CSRs read as zero.
+
+    trace logs the fetch, decode, issue, complete and commit cycle of every instruction
+    (`[Trace]` lines, see `r10k_cpu.pipeline_trace`); scripts/konata.py turns the output
+    into a Konata pipeline view. It is off by default and adds nothing to the design.
+
+    commit_log logs a `Retire pc=.. rd=.. value=..` line per committed instruction, which
+    scripts/cosim.py checks against the instruction-set simulator in `r10k_cpu.iss`.
+
+    macro_fusion adds a second instruction memory port reading the next instruction, and
+    decodes `lui`+`addi`, `auipc`+`jalr` and `slt(u)`+`bnez`/`beqz` pairs as one op (see
+    `r10k_cpu.fusion`).
+
+    move_elimination resolves register moves and zero idioms in rename, so they never
+    issue, with reference-counted physical registers (see `r10k_cpu.move_elimination`).
+
+    early_release frees a physical register before the instruction overwriting it commits,
+    once it is written, unread and can no longer be needed after a flush (see
+    `EarlyRelease`).
+
+    register_banks > 1 splits the physical register file into that many interleaved banks
+    with bank_read_ports read ports each (`BankedRegArray`). SchedulerDown holds back an
+    issue whose operands do not fit the ports left in this cycle, reads the operands of
+    the others through the ports and sends them to the units, so each port muxes only
+    one bank's registers.
+
+    divider_radix is 2 (the default) for the divider retiring one quotient bit per cycle,
+    or 4 for two per cycle, which also skips the quotient bits the divisor's size rules out.
+    Radix 4 chains two non-restoring steps in one cycle, so its critical path has two
+    33-bit add/subtracts in series instead of one; it only pays off if the cycle time
+    can absorb that.
+    """
 
     if sim_threshold <= 0 or idle_threshold <= 0:
         raise ValueError("Thresholds must be positive.")
+    if load_ports not in (1, 2):
+        raise ValueError("Only one or two load ports are supported.")
+    if memory_depth < 2 * load_ports or memory_depth & (memory_depth - 1):
+        raise ValueError("Memory depth must be a power of two with at least two words per bank.")
+    if register_banks > 1 and bank_read_ports < 2:
+        # A draining store reads both of its operands, which may sit in the same bank.
+        raise ValueError("Banked register files need at least two read ports per bank.")
+    core_config = CoreConfig(
+        active_list_depth=active_list_depth,
+        alu_queue_depth=alu_queue_depth,
+        lsq_depth=lsq_depth,
+        physical_registers=physical_registers,
+    )
+    if sram_files is None:
+        # Instruction file plus 4 byte lanes per data memory bank.
+        sram_files = [None] * (1 + 4 * load_ports)
 
     sys = SysBuilder("MIPS_R10K_OoO")
 
     with sys:
         driver = Driver()
-        commit = Commit()
-        free_list = FreeList(register_number=2**6)  # 64 physical registers
-        active_list = ActiveList(depth=2**5)  # Active List depth = 32
-        alu = ALU()
-        mul_alu = Multiply_ALU()
-        lsu = LSU()
-        writeback = WriteBack()
-        alu_queue = ALUQueue(depth=2**5)  # ALU Queue depth = 32
-        lsq = LSQ(depth=2**5)  # LSQ depth = 32
-        map_table = MapTable(num_logical=32, physical_bits=6)
+        commit = Commit(config=core_config)
+        counters = PerfCounters(instret=commit.retire_count) if perf_counters else None
+        pipeline_trace = PipelineTrace() if trace else None
+        free_list = FreeList(
+            register_number=core_config.physical_registers, shared_registers=move_elimination
+        )
+        active_list = ActiveList(config=core_config, trace=pipeline_trace)
+        release = EarlyRelease(config=core_config) if early_release else None
+        # With a banked register file the operands are read at issue and sent to the units.
+        operand_ports = register_banks > 1
+        alu = ALU(config=core_config, operand_ports=operand_ports)
+        mul_alu = Multiply_ALU(
+            config=core_config, divider_radix=divider_radix, operand_ports=operand_ports
+        )
+        lsu = LSU(config=core_config, operand_ports=operand_ports)
+        writeback = WriteBack(config=core_config)
+        # The second LSU only executes loads; stores keep draining through the first one.
+        load_lsu = (
+            LSU(name="LSU1", config=core_config, operand_ports=operand_ports)
+            if load_ports == 2
+            else None
+        )
+        load_writeback = WriteBack(name="WriteBack1", config=core_config) if load_ports == 2 else None
+        load_port_down = LoadPortDown() if load_ports == 2 else None
+        alu_queue = ALUQueue(config=core_config)
+        lsq = LSQ(config=core_config)
+        map_table = MapTable(num_logical=32, physical_bits=core_config.physical_idx_len)
         decoder = Decoder()
         fetcher = Fetcher()
-        fetcher_impl = FetcherImpl()
+        # Without an icache_factory the instruction SRAM behaves as a perfect single-cycle cache.
+        fetcher_impl = FetcherImpl(
+            icache_model=icache_factory() if icache_factory is not None else None,
+            address_bits=memory_depth.bit_length() - 1,
+        )
         speculation_state = SpeculationState()
         scheduler = Scheduler()
         scheduler_down = SchedulerDown()
         predictor: Predictor = predictor_factory()
 
-        physical_register_file = RegArray(Bits(32), 64, initializer=[0] * 64)
+        bank_ports = None
+        if register_banks > 1:
+            # Written through indexing like the plain array; SchedulerDown reads the operands.
+            physical_register_file = bank_ports = BankedRegArray(
+                Bits(32),
+                core_config.physical_registers,
+                num_banks=register_banks,
+                read_ports_per_bank=bank_read_ports,
+            )
+        else:
+            physical_register_file = RegArray(
+                Bits(32),
+                core_config.physical_registers,
+                initializer=[0] * core_config.physical_registers,
+            )
         # Tracks readiness of each physical register; packed so we can atomically reset on flush.
-        register_ready = RegisterReady(num_registers=64)
+        register_ready = RegisterReady(num_registers=core_config.physical_registers)
 
         # This buffer stores store instruction that have been committed but not yet executed.
-        store_buffer = StoreBuffer()
+        store_buffer = StoreBuffer(config=core_config)
 
-        dcache = ByteAddressableMemory(depth=0x100000, byte_files=sram_files[1:])
+        # One word-interleaved bank per load port.
+        dcache = ByteAddressableMemory(
+            depth=memory_depth, byte_files=sram_files[1:], num_banks=load_ports
+        )
+        # Forwards the data of loads on port 0 to dependents woken at load issue.
+        load_bypass = (
+            LoadBypass(memory=dcache, port=0, config=core_config)
+            if speculative_load_wakeup
+            else None
+        )
 
-        icache = SRAM(width=32, depth=0x100000, init_file=sram_files[0])
+        icache = SRAM(width=32, depth=memory_depth, init_file=sram_files[0])
         icache.name = "memory_instruction"
+        icache_next = None
+        if macro_fusion:
+            icache_next = SRAM(width=32, depth=memory_depth, init_file=sram_files[0])
+            icache_next.name = "memory_instruction_next"
 
         PC_reg, PC_addr = fetcher.build()
 
@@ -96,16 +233,24 @@ def build_cpu(
             fetcher_flush_entry,
             out_branch,
             predict_feedback,
+            share_enable,
+            share_data,
         ) = commit.build(
             active_list_queue=active_list.queue,
             map_table=map_table,
             register_file=physical_register_file,
+            perf_counters=counters,
+            trace=pipeline_trace,
+            commit_log=commit_log,
+            early_release=release,
         )
 
         alu.build(
             physical_register_file=physical_register_file,
             register_ready=register_ready,
             active_list=active_list,
+            load_bypass=load_bypass,
+            perf_counters=counters,
         )
 
         mul_alu.build(
@@ -113,15 +258,31 @@ def build_cpu(
             register_ready=register_ready,
             active_list=active_list,
             flush=commit.flush,
+            load_bypass=load_bypass,
         )
 
-        lsu.build(
-            physical_register_file=physical_register_file,
-            memory=dcache,
-            wb=writeback,
-        )
-
-        scheduler_down_entry, store_buffer_pop_enable = scheduler.build(
+        memory_requests = [
+            lsu.build(
+                physical_register_file=physical_register_file,
+                wb=writeback,
+                load_bypass=load_bypass,
+                forward_loads=load_bypass is not None,
+            )
+        ]
+        if load_lsu is not None:
+            memory_requests.append(
+                load_lsu.build(
+                    physical_register_file=physical_register_file,
+                    wb=load_writeback,
+                    load_bypass=load_bypass,
+                )
+            )
+
+        dcache.build(requests=memory_requests)
+        if load_bypass is not None:
+            load_bypass.build()
+
+        scheduler_down_entry, store_buffer_pop_enable, load_port_entry = scheduler.build(
             alu_queue=alu_queue,
             lsq=lsq,
             store_buffer=store_buffer,
@@ -129,9 +290,17 @@ def build_cpu(
             alu=alu,
             multiply_alu=mul_alu,
             lsu=lsu,
+            load_lsu=load_lsu,
+            speculative_load_wakeup=speculative_load_wakeup,
+            perf_counters=counters,
+            trace=pipeline_trace,
+            register_banks=bank_ports,
+            load_bypass=load_bypass,
         )
 
-        scheduler_down.build(scheduler_down_entry, flush_recover)
+        load_port_grant = scheduler_down.build(scheduler_down_entry, flush_recover)
+        if load_port_down is not None:
+            load_port_down.build(load_port_entry, flush_recover, grant=load_port_grant)
 
         writeback.build(
             active_list=active_list,
@@ -139,6 +308,16 @@ def build_cpu(
             physical_register_file=physical_register_file,
             memory=dcache,
         )
+        if load_writeback is not None:
+            load_writeback.build(
+                active_list=active_list,
+                register_ready=register_ready,
+                physical_register_file=physical_register_file,
+                memory=dcache,
+                port=1,
+                lsq=lsq,
+                flush=commit.flush,
+            )
 
         (
             fetcher_entry,
@@ -157,6 +336,11 @@ def build_cpu(
             active_list,
             speculation_state,
             register_ready,
+            perf_counters=counters,
+            trace=pipeline_trace,
+            next_instruction_reg=icache_next.dout if icache_next is not None else None,
+            fusion=MacroFusion() if macro_fusion else None,
+            move_elimination=MoveElimination() if move_elimination else None,
         )
 
         predict_branch = predictor.build(alu_queue_entry.PC, predict_feedback)
@@ -169,6 +353,9 @@ def build_cpu(
             entry=fetcher_entry,
             flush_entry=fetcher_flush_entry,
             predict_branch=predict_branch,
+            perf_counters=counters,
+            trace=pipeline_trace,
+            icache_next=icache_next,
         )
 
         active_list_entry = active_list_entry_partial(predict_branch=predict_branch)
@@ -185,12 +372,30 @@ def build_cpu(
             flush_to_commit=flush_recover,
         )
 
+        release_enable = release_physical = None
+        if release is not None:
+            release_enable, release_physical = release.build(
+                active_list=active_list,
+                alu_queue=alu_queue,
+                lsq=lsq,
+                store_buffer=store_buffer,
+                register_ready=register_ready,
+                push_enable=active_list_entry.valid,
+                commit_push=push_freelist,
+                flush=flush_recover,
+                perf_counters=counters,
+            )
+
         free_list.build(
             push_enable=push_freelist,
             push_data=old_physical,
             pop_enable=free_list_pop_enable,
             make_snapshot=into_speculating,
             flush_recover=flush_recover,
+            share_enable=share_enable,
+            share_data=share_data,
+            release_enable=release_enable,
+            release_data=release_physical,
         )
 
         active_list_idx = active_list.build(
@@ -229,7 +434,11 @@ def build_cpu(
         )
 
         sys.expose_on_top(PC_reg, "Output")
-        sys.expose_on_top(physical_register_file, "Output")
+        if bank_ports is not None:
+            for bank in bank_ports.banks:
+                sys.expose_on_top(bank, "Output")
+        else:
+            sys.expose_on_top(physical_register_file, "Output")
 
     conf = config(
         verilog=verilog,  # pyright: ignore[reportArgumentType]
@@ -244,6 +453,44 @@ def build_cpu(
     return sys, simulator_path, verilog_path
 
 
+def build_simulator_cached(
+    cache_dir: str | None = ".build_cache", report: bool = True, **build_cpu_kwargs
+) -> BuildCacheResult:
+    """
+    Build the simulator binary for `build_cpu(**build_cpu_kwargs)`, reusing a cached one.
+
+    The key covers every build_cpu argument (defaults included, factories by their code)
+    and the design sources, so any change rebuilds. Only the simulator binary is cached.
+    cache_dir=None always rebuilds.
+    """
+    bound = inspect.signature(build_cpu).bind(**build_cpu_kwargs)
+    bound.apply_defaults()
+    params = dict(bound.arguments)
+
+    def build() -> str:
+        _, simulator_path, _ = build_cpu(**params)
+        simulator_binary = utils.build_simulator(simulator_path)
+        if not simulator_binary:
+            raise RuntimeError(f"Build simulator failed for {simulator_path}")
+        return simulator_binary
+
+    if cache_dir is None:
+        start = time.monotonic()
+        result = BuildCacheResult(build(), "uncached", False, time.monotonic() - start)
+    else:
+        import assassyn
+
+        key = build_key(
+            params,
+            source_root=os.path.dirname(os.path.abspath(__file__)),
+            toolchain=os.path.dirname(os.path.abspath(assassyn.__file__)),
+        )
+        result = cached_build(key, cache_dir, build, description=describe(params))
+    if report:
+        print(result.report())
+    return result
+
+
 if __name__ == "__main__":
     sram_file = "asms/bubble_sort/bubble_sort.hex"
     byte_files = prepare_byte_files(sram_file)
@@ -252,6 +499,7 @@ if __name__ == "__main__":
         sram_files= byte_files,
         verilog=True,
         sim_threshold=3000,
+        memory_depth=memory_depth_for([sram_file]),
     )
     sim_output = utils.run_simulator(simulator_path)
     with open("out/bubble_sort_sim.out", "w") as f:
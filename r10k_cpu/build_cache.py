@@ -0,0 +1,113 @@
+"""
+Cache for built simulator binaries.
+
+A build is keyed by the design parameters passed to `build_cpu` and by the sources that
+describe the hardware. When neither changed, the binary built last time is reused and the
+whole elaborate + compile step is skipped.
+"""
+
+from __future__ import annotations
+
+import enum
+import functools
+import hashlib
+import json
+import os
+import shutil
+import time
+import types
+from dataclasses import dataclass
+from typing import Any, Callable
+
+# Everything that shapes the generated design, relative to the repository root.
+SOURCE_ROOTS = ("main.py", "r10k_cpu", "dataclass", "algorithms")
+
+
+@dataclass(frozen=True)
+class BuildCacheResult:
+    binary: str
+    key: str
+    hit: bool
+    seconds: float
+
+    def report(self) -> str:
+        status = "hit" if self.hit else "miss"
+        return f"[build-cache] {status} {self.key[:12]} ({self.seconds:.1f}s) -> {self.binary}"
+
+
+def describe(value: Any) -> str:
+    """A stable description of a design parameter, including the code of factories."""
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return repr(value)
+    if isinstance(value, enum.Enum):
+        return f"{type(value).__qualname__}.{value.name}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(describe(item) for item in value) + "]"
+    if isinstance(value, dict):
+        items = sorted((str(k), describe(v)) for k, v in value.items())
+        return "{" + ", ".join(f"{k}: {v}" for k, v in items) + "}"
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    if isinstance(value, functools.partial):
+        return f"partial({describe(value.func)}, {describe(value.args)}, {describe(value.keywords)})"
+    if isinstance(value, types.CodeType):
+        return f"code({value.co_code.hex()}, {describe(value.co_consts)}, {describe(value.co_names)})"
+    if isinstance(value, types.FunctionType):
+        closure = [cell.cell_contents for cell in (value.__closure__ or ())]
+        return "function({}, {}, {}, {})".format(
+            value.__qualname__,
+            describe(value.__code__),
+            describe(list(value.__defaults__ or ())),
+            describe(closure),
+        )
+    if hasattr(value, "__dict__"):
+        return f"{type(value).__qualname__}({describe(vars(value))})"
+    return repr(value)
+
+
+def source_digest(root: str, roots: tuple[str, ...] = SOURCE_ROOTS) -> str:
+    digest = hashlib.sha256()
+    for entry in roots:
+        path = os.path.join(root, entry)
+        files = [path] if os.path.isfile(path) else []
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+            files.extend(os.path.join(dirpath, f) for f in sorted(filenames) if f.endswith(".py"))
+        for file in files:
+            digest.update(os.path.relpath(file, root).encode())
+            with open(file, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def build_key(params: dict[str, Any], source_root: str, toolchain: str = "") -> str:
+    payload = json.dumps(
+        {
+            "params": describe(params),
+            "sources": source_digest(source_root),
+            "toolchain": toolchain,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def cached_build(
+    key: str, cache_dir: str, build: Callable[[], str], description: str = ""
+) -> BuildCacheResult:
+    """Return the cached binary for `key`, or run `build` (returning a binary path) and store it."""
+    start = time.monotonic()
+    entry_dir = os.path.join(cache_dir, key)
+    binary = os.path.join(entry_dir, "simulator")
+    if os.path.isfile(binary) and os.access(binary, os.X_OK):
+        return BuildCacheResult(binary, key, True, time.monotonic() - start)
+
+    built = build()
+    os.makedirs(entry_dir, exist_ok=True)
+    # Copy then rename, so a concurrent reader never sees a partial binary.
+    partial = f"{binary}.{os.getpid()}.tmp"
+    shutil.copy2(built, partial)
+    os.replace(partial, binary)
+    with open(os.path.join(entry_dir, "params.txt"), "w") as f:
+        f.write(description)
+    return BuildCacheResult(binary, key, False, time.monotonic() - start)
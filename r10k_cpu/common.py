@@ -1,27 +1,10 @@
 from dataclasses import dataclass
 from enum import Enum
+from functools import cached_property
 from math import ceil, log2
 from assassyn.frontend import Bits, Record, Value
 
 
-ROBEntryType = Record(
-    pc=Bits(32),
-    dest_logical=Bits(5),
-    dest_new_physical=Bits(6),
-    dest_old_physical=Bits(6),
-    has_dest=Bits(1),
-    imm=Bits(32),
-    ready=Bits(1),
-    is_branch=Bits(1),
-    is_alu=Bits(1),  # 1 for ALU, 0 for LSQ
-    predict_branch=Bits(1),
-    actual_branch=Bits(1),  # waiting ALU to fill this in
-    is_jump=Bits(1),
-    is_jalr=Bits(1),
-    is_terminator=Bits(1),  # for ebreak
-)
-
-
 class MemoryOpType(Enum):
     BYTE = 0
     HALF = 1
@@ -33,21 +16,6 @@ class MemoryOpType(Enum):
 MEMORY_OP_TYPE_LEN = ceil(log2(len(MemoryOpType)))
 
 
-LSQEntryType = Record(
-    valid=Bits(1),
-    active_list_idx=Bits(5),
-    lsq_queue_idx=Bits(5),
-    rs1_physical=Bits(6),
-    rs2_physical=Bits(6),
-    rd_physical=Bits(6),
-    imm=Bits(32),
-    is_load=Bits(1),
-    is_store=Bits(1),
-    op_type=Bits(MEMORY_OP_TYPE_LEN),
-    issued=Bits(1),
-)
-
-
 class ALU_Code(Enum):
     ADD = 0
     SUB = 1
@@ -99,28 +67,120 @@ class OperantFrom(Enum):
     IMM = 2
     PC = 3
     LITERAL_FOUR = 4
+    CSR = 5  # counter CSR numbered by the low 12 bits of imm
 
 
 OPERANT_FROM_LEN = ceil(log2(len(OperantFrom)))
 
 
-ALUQueueEntryType = Record(
-    valid=Bits(1),
-    active_list_idx=Bits(5),
-    alu_queue_idx=Bits(5),
-    rs1_physical=Bits(6),
-    rs2_physical=Bits(6),
-    rd_physical=Bits(6),
-    alu_op=Bits(ALU_CODE_LEN),
-    imm=Bits(32),
-    operant1_from=Bits(OPERANT_FROM_LEN),
-    operant2_from=Bits(OPERANT_FROM_LEN),
-    PC=Bits(32),
-    is_branch=Bits(1),
-    is_jalr=Bits(1),
-    branch_flip=Bits(1),
-    issued=Bits(1),
-)
+def _index_len(size: int) -> int:
+    return max(1, ceil(log2(size)))
+
+
+@dataclass(frozen=True)
+class CoreConfig:
+    """
+    Sizes of the core's queues and physical register file.
+
+    The widths of the queue indices and physical register numbers, and with them the
+    record types passed between the stages, are all derived from these sizes.
+    """
+
+    active_list_depth: int = 32
+    alu_queue_depth: int = 32
+    lsq_depth: int = 32
+    physical_registers: int = 64
+
+    def __post_init__(self):
+        for depth in (self.active_list_depth, self.alu_queue_depth, self.lsq_depth):
+            if depth < 2 or depth & (depth - 1):
+                raise ValueError("Queue depths must be powers of two of at least 2.")
+        # Renaming stalls on an empty free list; at least one register must be left for it.
+        if self.physical_registers - 1 < 32:
+            raise ValueError(
+                "Physical registers must cover the 32 architectural registers and one rename."
+            )
+
+    @property
+    def active_list_idx_len(self) -> int:
+        return _index_len(self.active_list_depth)
+
+    @property
+    def alu_queue_idx_len(self) -> int:
+        return _index_len(self.alu_queue_depth)
+
+    @property
+    def lsq_idx_len(self) -> int:
+        return _index_len(self.lsq_depth)
+
+    @property
+    def physical_idx_len(self) -> int:
+        return _index_len(self.physical_registers)
+
+    @cached_property
+    def rob_entry_type(self) -> Record:
+        return Record(
+            pc=Bits(32),
+            dest_logical=Bits(5),
+            dest_new_physical=Bits(self.physical_idx_len),
+            dest_old_physical=Bits(self.physical_idx_len),
+            has_dest=Bits(1),
+            imm=Bits(32),
+            ready=Bits(1),
+            is_branch=Bits(1),
+            is_alu=Bits(1),  # 1 for ALU, 0 for LSQ
+            predict_branch=Bits(1),
+            actual_branch=Bits(1),  # waiting ALU to fill this in
+            is_jump=Bits(1),
+            is_jalr=Bits(1),
+            is_terminator=Bits(1),  # for ebreak
+            is_fused=Bits(1),  # two instructions retire, see r10k_cpu.fusion
+            is_eliminated=Bits(1),  # resolved at rename, see r10k_cpu.move_elimination
+        )
+
+    @cached_property
+    def lsq_entry_type(self) -> Record:
+        return Record(
+            valid=Bits(1),
+            active_list_idx=Bits(self.active_list_idx_len),
+            lsq_queue_idx=Bits(self.lsq_idx_len),
+            rs1_physical=Bits(self.physical_idx_len),
+            rs2_physical=Bits(self.physical_idx_len),
+            rd_physical=Bits(self.physical_idx_len),
+            imm=Bits(32),
+            is_load=Bits(1),
+            is_store=Bits(1),
+            op_type=Bits(MEMORY_OP_TYPE_LEN),
+            issued=Bits(1),
+        )
+
+    @cached_property
+    def alu_queue_entry_type(self) -> Record:
+        return Record(
+            valid=Bits(1),
+            active_list_idx=Bits(self.active_list_idx_len),
+            alu_queue_idx=Bits(self.alu_queue_idx_len),
+            rs1_physical=Bits(self.physical_idx_len),
+            rs2_physical=Bits(self.physical_idx_len),
+            rd_physical=Bits(self.physical_idx_len),
+            alu_op=Bits(ALU_CODE_LEN),
+            imm=Bits(32),
+            operant1_from=Bits(OPERANT_FROM_LEN),
+            operant2_from=Bits(OPERANT_FROM_LEN),
+            PC=Bits(32),
+            is_branch=Bits(1),
+            is_jalr=Bits(1),
+            branch_flip=Bits(1),
+            issued=Bits(1),
+        )
+
+
+DEFAULT_CORE_CONFIG = CoreConfig()
+
+# Record types of the default configuration.
+ROBEntryType = DEFAULT_CORE_CONFIG.rob_entry_type
+LSQEntryType = DEFAULT_CORE_CONFIG.lsq_entry_type
+ALUQueueEntryType = DEFAULT_CORE_CONFIG.alu_queue_entry_type
 
 
 @dataclass(frozen=True)
@@ -129,6 +189,8 @@ class FetcherImplEntry:
     stall: Value
     is_branch: Value
     branch_offset: Value
+    # The next instruction was fused into this one, so it is skipped.
+    fused: Value
 
 
 @dataclass(frozen=True)
@@ -0,0 +1,101 @@
+"""
+Lock-step co-simulation of the core against the instruction-set simulator.
+
+A simulator built with `build_cpu(commit_log=True)` logs one `[Commit] Retire pc=.. rd=..
+value=.. n=..` line per committed op. `LockStepChecker` steps the `ISS` n times per such
+line (a fused op is n = 2 instructions and commits at the pc of the last one, with the last
+register write among them) while the output streams in, and stops the simulator at the
+first difference, so a change that corrupts an intermediate value is caught even when the
+final x10 is right.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+from r10k_cpu.iss import ISS, CommitRecord
+from r10k_cpu.sim_runner import CommitLogParser, StreamedRun, stream_program
+
+RETIRE_RE = re.compile(
+    r"\[Commit\]\s+Retire pc=(?P<pc>[0-9a-fA-F]{8}) rd=(?P<rd>[0-9]+) value=(?P<value>[0-9a-fA-F]{8})"
+    r"(?: n=(?P<n>[0-9]+))?"
+)
+
+
+@dataclass(frozen=True)
+class Mismatch:
+    # Position in the commit stream, from 0.
+    index: int
+    expected: CommitRecord | None
+    actual: CommitRecord
+
+    def __str__(self) -> str:
+        expected = "nothing (the ISS has finished)" if self.expected is None else _format(self.expected)
+        return f"commit {self.index}: expected {expected}, got {_format(self.actual)}"
+
+
+def _format(record: CommitRecord) -> str:
+    return f"pc={record.pc:08x} rd={record.rd} value={record.value:08x}"
+
+
+@dataclass
+class LockStepChecker(CommitLogParser):
+    """A `CommitLogParser` that also checks every Retire line against `iss`."""
+
+    iss: ISS | None = None
+    commits: int = 0
+    mismatch: Mismatch | None = None
+
+    def feed(self, line: str) -> bool:
+        if not super().feed(line):
+            return False
+        m = RETIRE_RE.search(line)
+        if m is None:
+            return True
+        actual = CommitRecord(int(m.group("pc"), 16), int(m.group("rd")), int(m.group("value"), 16))
+        expected = None
+        for _ in range(int(m.group("n") or 1)):
+            record = None if self.iss.halted else self.iss.step()
+            if record is not None and expected is not None and not record.rd:
+                # A fused compare-and-branch writes the slt result, at the branch.
+                record = CommitRecord(record.pc, expected.rd, expected.value, expected.exact)
+            expected = record
+        if expected is not None and not expected.exact and expected.rd == actual.rd:
+            # Counter CSRs depend on timing; take the core's value and carry on from it.
+            self.iss.regs[actual.rd] = actual.value
+            expected = CommitRecord(expected.pc, expected.rd, actual.value)
+        if expected != actual:
+            self.mismatch = Mismatch(self.commits, expected, actual)
+            self.failure = str(self.mismatch)
+            return False
+        self.commits += 1
+        return True
+
+
+@dataclass(frozen=True)
+class CoSimResult:
+    name: str
+    run: StreamedRun
+    commits: int
+    mismatch: Mismatch | None
+    # The ISS reached the terminator, i.e. both sides ran the whole program.
+    finished: bool
+
+    @property
+    def ok(self) -> bool:
+        return self.mismatch is None and self.finished and not self.run.error
+
+
+def cosim_program(
+    binary: str,
+    init_file: str,
+    work_dir: str | None = None,
+    num_banks: int = 1,
+    name: str = "",
+    memory_depth: int = 0x100000,
+) -> CoSimResult:
+    """Run `init_file` on the core built with commit_log=True and check it against the ISS."""
+    checker = LockStepChecker(iss=ISS.from_file(init_file, memory_depth=memory_depth))
+    run = stream_program(binary, init_file, work_dir, num_banks=num_banks, name=name, parser=checker)
+    return CoSimResult(name, run, checker.commits, checker.mismatch, checker.iss.halted)
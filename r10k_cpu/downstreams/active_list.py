@@ -2,8 +2,9 @@ from dataclasses import dataclass
 from typing import Optional
 from assassyn.frontend import *
 from dataclass.circular_queue import CircularQueue
-from r10k_cpu.common import ROBEntryType
-from r10k_cpu.utils import replace_bundle
+from r10k_cpu.common import DEFAULT_CORE_CONFIG, CoreConfig
+from r10k_cpu.pipeline_trace import PipelineTrace
+from r10k_cpu.utils import replace_bundle, resize
 
 
 @dataclass(frozen=True)
@@ -22,14 +23,28 @@ class InstructionPushEntry:
     is_jalr: Value
     is_terminator: Value
     is_naturally_ready: Value
+    is_fused: Optional[Value] = None
+    is_eliminated: Optional[Value] = None
 
 
 class ActiveList(Downstream):
     queue: CircularQueue
 
-    def __init__(self, depth: int):
+    def __init__(
+        self,
+        depth: Optional[int] = None,
+        config: CoreConfig = DEFAULT_CORE_CONFIG,
+        trace: Optional[PipelineTrace] = None,
+    ):
         super().__init__()
-        self.queue = CircularQueue(ROBEntryType, depth)
+        depth = config.active_list_depth if depth is None else depth
+        if depth > config.active_list_depth:
+            raise ValueError("Active List is deeper than its index in the core config.")
+        self.config = config
+        # Every execution unit completes through set_ready, so it also logs completion.
+        self.trace = trace
+        self.entry_type = config.rob_entry_type
+        self.queue = CircularQueue(self.entry_type, depth)
 
     @downstream.combinational
     def build(
@@ -40,11 +55,12 @@ class ActiveList(Downstream):
     ):
         flush = flush.optional(Bits(1)(0))
         push_valid = push_inst.valid.optional(Bits(1)(0))
-        entry = ROBEntryType.bundle(
+        physical_bits = self.config.physical_idx_len
+        entry = self.entry_type.bundle(
             pc=push_inst.pc.optional(Bits(32)(0)),
             dest_logical=push_inst.dest_logical.optional(Bits(5)(0)),
-            dest_new_physical=push_inst.dest_new_physical.optional(Bits(6)(0)),
-            dest_old_physical=push_inst.dest_old_physical.optional(Bits(6)(0)),
+            dest_new_physical=push_inst.dest_new_physical.optional(Bits(physical_bits)(0)),
+            dest_old_physical=push_inst.dest_old_physical.optional(Bits(physical_bits)(0)),
             has_dest=push_inst.has_dest.optional(Bits(1)(0)),
             imm=push_inst.imm.optional(Bits(32)(0)),
             ready=push_inst.is_naturally_ready.optional(Bits(1)(0)),
@@ -55,6 +71,16 @@ class ActiveList(Downstream):
             is_jump=push_inst.is_jump.optional(Bits(1)(0)),
             is_jalr=push_inst.is_jalr.optional(Bits(1)(0)),
             is_terminator=push_inst.is_terminator.optional(Bits(1)(0)),
+            is_fused=(
+                push_inst.is_fused.optional(Bits(1)(0))
+                if push_inst.is_fused is not None
+                else Bits(1)(0)
+            ),
+            is_eliminated=(
+                push_inst.is_eliminated.optional(Bits(1)(0))
+                if push_inst.is_eliminated is not None
+                else Bits(1)(0)
+            ),
         )
         pop_enable = pop_enable.optional(Bits(1)(0))
 
@@ -65,7 +91,7 @@ class ActiveList(Downstream):
             clear=flush,
         )
 
-        return self.queue.get_tail()
+        return resize(self.queue.get_tail(), self.config.active_list_idx_len)
 
     def set_ready(
         self,
@@ -74,6 +100,7 @@ class ActiveList(Downstream):
         new_imm: Optional[Value] = None,
         new_imm_enable: Optional[Value] = None,
     ) -> None:
+        index = resize(index, self.queue.addr_bits)
         bundle = self.queue[index]
         imm_value = bundle.imm
         if new_imm is not None:
@@ -88,6 +115,8 @@ class ActiveList(Downstream):
             imm=imm_value,
         )
         self.queue[index] = new_bundle
+        if self.trace is not None:
+            self.trace.complete(index)
 
     def is_full(self) -> Value:
         return self.queue.is_full()
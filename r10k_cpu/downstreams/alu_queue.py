@@ -1,9 +1,11 @@
 from dataclasses import dataclass
+from typing import Optional
 from assassyn.frontend import *
+from assassyn.ir.dtype import RecordValue
 from dataclass.circular_queue import CircularQueue, CircularQueueSelection
-from r10k_cpu.common import ALU_CODE_LEN, ALUQueueEntryType, OperantFrom, OPERANT_FROM_LEN
+from r10k_cpu.common import ALU_CODE_LEN, DEFAULT_CORE_CONFIG, CoreConfig, OperantFrom, OPERANT_FROM_LEN
 from r10k_cpu.downstreams.register_ready import RegisterReady
-from r10k_cpu.utils import replace_bundle
+from r10k_cpu.utils import replace_bundle, resize
 
 @dataclass(frozen=True)
 class ALUQueuePushEntry:
@@ -22,19 +24,25 @@ class ALUQueuePushEntry:
 class ALUQueue(Downstream):
     queue: CircularQueue
 
-    def __init__(self, depth: int):
+    def __init__(self, depth: Optional[int] = None, config: CoreConfig = DEFAULT_CORE_CONFIG):
         super().__init__()
-        self.queue = CircularQueue(ALUQueueEntryType, depth)
+        depth = config.alu_queue_depth if depth is None else depth
+        if depth > config.alu_queue_depth:
+            raise ValueError("ALU Queue is deeper than its index in the core config.")
+        self.config = config
+        self.entry_type = config.alu_queue_entry_type
+        self.queue = CircularQueue(self.entry_type, depth)
     
     @downstream.combinational
     def build(self, push_enable: Value, push_data: ALUQueuePushEntry, pop_enable: Value, active_list_idx: Value, flush: Value):
-        entry = ALUQueueEntryType.bundle(
+        physical_bits = self.config.physical_idx_len
+        entry = self.entry_type.bundle(
             valid=push_enable.optional(Bits(1)(0)),
             active_list_idx=active_list_idx,
-            alu_queue_idx=(self.queue.get_tail().bitcast(UInt(5))).bitcast(Bits(5)),
-            rs1_physical=push_data.rs1_physical.optional(Bits(6)(0)),
-            rs2_physical=push_data.rs2_physical.optional(Bits(6)(0)),
-            rd_physical=push_data.rd_physical.optional(Bits(6)(0)),
+            alu_queue_idx=resize(self.queue.get_tail(), self.config.alu_queue_idx_len),
+            rs1_physical=push_data.rs1_physical.optional(Bits(physical_bits)(0)),
+            rs2_physical=push_data.rs2_physical.optional(Bits(physical_bits)(0)),
+            rd_physical=push_data.rd_physical.optional(Bits(physical_bits)(0)),
             alu_op=push_data.alu_op.optional(Bits(ALU_CODE_LEN)(0)),
             imm=push_data.imm.optional(Bits(32)(0)),
             operant1_from=push_data.operant1_from.optional(Bits(OPERANT_FROM_LEN)(0)),
@@ -52,12 +60,8 @@ class ALUQueue(Downstream):
 
     def select_first_ready(self, register_ready: RegisterReady) -> CircularQueueSelection:
         def selector(value: Value, _) -> Value:
-            entry = ALUQueueEntryType.view(value)
-            
-            rs1_needed = (entry.operant1_from == Bits(OPERANT_FROM_LEN)(OperantFrom.RS1.value)) | \
-                         (entry.operant2_from == Bits(OPERANT_FROM_LEN)(OperantFrom.RS1.value))
-            rs2_needed = (entry.operant1_from == Bits(OPERANT_FROM_LEN)(OperantFrom.RS2.value)) | \
-                         (entry.operant2_from == Bits(OPERANT_FROM_LEN)(OperantFrom.RS2.value))
+            entry = self.entry_type.view(value)
+            rs1_needed, rs2_needed = self.operands_needed(entry)
 
             rs1_ready = self._operand_ready(register_ready, entry.rs1_physical, rs1_needed)
             rs2_ready = self._operand_ready(register_ready, entry.rs2_physical, rs2_needed)
@@ -74,6 +78,15 @@ class ALUQueue(Downstream):
         self.queue[index] = new_bundle
 
 
+    @staticmethod
+    def operands_needed(entry: RecordValue) -> tuple[Value, Value]:
+        """Whether the entry reads rs1 and rs2."""
+        rs1_needed = (entry.operant1_from == Bits(OPERANT_FROM_LEN)(OperantFrom.RS1.value)) | \
+                     (entry.operant2_from == Bits(OPERANT_FROM_LEN)(OperantFrom.RS1.value))
+        rs2_needed = (entry.operant1_from == Bits(OPERANT_FROM_LEN)(OperantFrom.RS2.value)) | \
+                     (entry.operant2_from == Bits(OPERANT_FROM_LEN)(OperantFrom.RS2.value))
+        return rs1_needed, rs2_needed
+
     @staticmethod
     def _operand_ready(register_ready: RegisterReady, physical: Value, needed: Value) -> Value:
         ready_bit = register_ready.read(physical).bitcast(Bits(1))
@@ -0,0 +1,126 @@
+from typing import Optional
+from assassyn.frontend import *
+from r10k_cpu.common import DEFAULT_CORE_CONFIG, CoreConfig
+from r10k_cpu.downstreams.active_list import ActiveList
+from r10k_cpu.downstreams.alu_queue import ALUQueue
+from r10k_cpu.downstreams.lsq import LSQ, StoreBuffer
+from r10k_cpu.downstreams.register_ready import RegisterReady
+from r10k_cpu.perf_counters import PerfCounters
+from r10k_cpu.utils import resize
+
+
+class EarlyRelease(Downstream):
+    """
+    Frees the old physical register of an instruction before the instruction commits.
+
+    Commit frees `dest_old_physical` when the instruction overwriting its mapping retires,
+    but the register is dead as soon as
+    - that instruction can no longer be squashed: no branch is older than it in the Active
+      List (at most one branch is in flight, and a flush only squashes younger entries),
+    - the register has been written (RegisterReady), and
+    - nothing still reads it: no unissued ALU queue entry, no LSQ or store buffer entry
+      (a load may be replayed, a store reads its operands after it commits) and no
+      eliminated move in the Active List, whose mapping is not counted in the Free List
+      until it commits.
+
+    One register is released per cycle, through the Free List push port when Commit does
+    not use it. `released` marks the Active List entries whose old register is already
+    free, so Commit does not push it again.
+    """
+
+    released: Array
+
+    def __init__(self, config: CoreConfig = DEFAULT_CORE_CONFIG):
+        super().__init__()
+        self.config = config
+        self.depth = config.active_list_depth
+        self.released = RegArray(Bits(self.depth), 1)
+
+    def is_released(self, index: Value) -> Value:
+        index = resize(index, self.config.active_list_idx_len).bitcast(UInt(self.config.active_list_idx_len))
+        return ((self.released[0].bitcast(UInt(self.depth)) >> index)[0:0]).bitcast(Bits(1))
+
+    @downstream.combinational
+    def build(
+        self,
+        active_list: ActiveList,
+        alu_queue: ALUQueue,
+        lsq: LSQ,
+        store_buffer: StoreBuffer,
+        register_ready: RegisterReady,
+        push_enable: Value,
+        commit_push: Value,
+        flush: Value,
+        perf_counters: Optional[PerfCounters] = None,
+    ):
+        """Return (release enable, released physical register) for the Free List."""
+        push_enable = push_enable.optional(Bits(1)(0))
+        commit_push = commit_push.optional(Bits(1)(0))
+        flush = flush.optional(Bits(1)(0))
+        physical_zero = Bits(self.config.physical_idx_len)(0)
+
+        readers = Bits(self.config.physical_registers)(0)
+        for value, occupied in alu_queue.queue.entries():
+            entry = alu_queue.entry_type.view(value)
+            rs1_needed, rs2_needed = ALUQueue.operands_needed(entry)
+            waiting = occupied & entry.valid & ~entry.issued
+            readers = self._mark(readers, entry.rs1_physical, waiting & rs1_needed)
+            readers = self._mark(readers, entry.rs2_physical, waiting & rs2_needed)
+        for value, occupied in lsq.queue.entries():
+            entry = lsq.entry_type.view(value)
+            readers = self._mark(readers, entry.rs1_physical, occupied & entry.valid)
+            readers = self._mark(readers, entry.rs2_physical, occupied & entry.valid & entry.is_store)
+        buffered = store_buffer.entry_type.view(store_buffer.reg[0])
+        readers = self._mark(readers, buffered.rs1_physical, buffered.valid)
+        readers = self._mark(readers, buffered.rs2_physical, buffered.valid)
+        for value, occupied in active_list.queue.entries():
+            entry = active_list.entry_type.view(value)
+            readers = self._mark(
+                readers, entry.dest_new_physical, occupied & entry.is_eliminated & entry.has_dest
+            )
+
+        # choose() calls the selector from the head on, so this accumulates the older entries.
+        branch_before = [Bits(1)(0)]
+
+        def selector(value: Value, index: Value) -> Value:
+            entry = active_list.entry_type.view(value)
+            speculative = branch_before[0]
+            branch_before[0] = branch_before[0] | entry.is_branch
+            old = entry.dest_old_physical
+            read_pending = (readers.bitcast(UInt(self.config.physical_registers)) >> old.bitcast(
+                UInt(self.config.physical_idx_len)
+            ))[0:0].bitcast(Bits(1))
+            return (
+                entry.has_dest
+                & (old != physical_zero)
+                & ~self.is_released(index)
+                & ~speculative
+                & register_ready.read(old)
+                & ~read_pending
+            )
+
+        selection = active_list.queue.choose(selector)
+        release_enable = selection.valid & ~commit_push & ~flush
+        release_physical = selection.data.dest_old_physical
+
+        # A reused Active List entry starts unreleased.
+        released = self.released[0]
+        released = self._set(released, selection.index, release_enable, Bits(1)(1))
+        released = self._set(
+            released, active_list.queue.get_tail(), push_enable & ~flush, Bits(1)(0)
+        )
+        self.released[0] = released
+
+        if perf_counters is not None:
+            perf_counters.count("early_release", release_enable)
+
+        return release_enable, release_physical
+
+    def _mark(self, vector: Value, physical: Value, enable: Value) -> Value:
+        one_hot = Bits(self.config.physical_registers)(1) << physical
+        return enable.select(vector | one_hot, vector)
+
+    def _set(self, bits: Value, index: Value, enable: Value, value: Value) -> Value:
+        one_hot = Bits(self.depth)(1) << index
+        updated = value.select(bits | one_hot, bits & ~one_hot)
+        return enable.select(updated, bits)
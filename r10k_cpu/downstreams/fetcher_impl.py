@@ -1,16 +1,36 @@
 from dataclasses import dataclass
 from assassyn.frontend import *
 from r10k_cpu.common import FetcherFlushEntry, FetcherImplEntry
+from r10k_cpu.downstreams.icache import InstructionCache
 from r10k_cpu.modules.decoder import Decoder
+from r10k_cpu.perf_counters import PerfCounters
+from r10k_cpu.pipeline_trace import PipelineTrace
 from r10k_cpu.utils import Bool
 
 
+def fetch_offset(is_branch: Value, predict_branch: Value, branch_offset: Value, fused: Value) -> Value:
+    """Offset from the decoded PC to the next one; a fused pair is two instructions long."""
+    # A fused branch is the second instruction of the pair, at PC + 4.
+    taken_offset = fused.select(
+        (branch_offset.bitcast(UInt(32)) + UInt(32)(4)).bitcast(Bits(32)), branch_offset
+    )
+    return (is_branch & predict_branch).select(
+        taken_offset, fused.select(Bits(32)(8), Bits(32)(4))
+    )
+
+
 class FetcherImpl(Downstream):
     stalled: Array
+    icache_model: InstructionCache | None
+    address_bits: int
 
-    def __init__(self):
+    def __init__(self, icache_model: InstructionCache | None = None, address_bits: int = 20):
         super().__init__()
         self.stalled = RegArray(Bool, size=1)
+        # None models a perfect single-cycle instruction memory.
+        self.icache_model = icache_model
+        # Word address width of the instruction SRAM.
+        self.address_bits = address_bits
 
     @downstream.combinational
     def build(
@@ -22,6 +42,9 @@ class FetcherImpl(Downstream):
         flush_entry: FetcherFlushEntry,
         predict_branch: Value,
         entry: FetcherImplEntry,
+        perf_counters: PerfCounters | None = None,
+        trace: PipelineTrace | None = None,
+        icache_next: SRAM | None = None,
     ):
         decode_success = entry.decode_success.optional(Bool(0))
         flush_enable = flush_entry.enable.optional(Bool(0))
@@ -31,10 +54,11 @@ class FetcherImpl(Downstream):
         predict_branch = predict_branch.optional(Bool(0))
         branch_offset = entry.branch_offset.optional(Bits(32)(4))
         stall = entry.stall.optional(Bool(0))
+        fused = entry.fused.optional(Bool(0))
 
         new_stalled = (self.stalled[0] | stall) & ~flush_enable
 
-        offset = (is_branch & predict_branch).select(branch_offset, Bits(32)(4))
+        offset = fetch_offset(is_branch, predict_branch, branch_offset, fused)
 
         new_PC = flush_enable.select(
             (flush_PC.bitcast(UInt(32)) + flush_offset.bitcast(UInt(32))).bitcast(Bits(32)),
@@ -48,10 +72,26 @@ class FetcherImpl(Downstream):
         PC_reg[0] = new_PC
         self.stalled[0] = new_stalled
 
+        if perf_counters is not None:
+            perf_counters.count("jump_stall", self.stalled[0])
+
         icache.build(
-            we=Bool(0), re=Bool(1), addr=new_PC[2:31].zext(Bits(32))[0:19], wdata=Bits(32)(0)
+            we=Bool(0), re=Bool(1), addr=new_PC[2:31].zext(Bits(32))[0 : self.address_bits - 1], wdata=Bits(32)(0)
         )
+        if icache_next is not None:
+            # The following instruction, for macro-op fusion in the Decoder.
+            next_PC = (new_PC.bitcast(UInt(32)) + UInt(32)(4)).bitcast(Bits(32))
+            icache_next.build(
+                we=Bool(0), re=Bool(1), addr=next_PC[2:31].zext(Bits(32))[0 : self.address_bits - 1], wdata=Bits(32)(0)
+            )
+
+        # An I-cache miss holds new_PC in PC_reg and keeps the decoder idle until the line arrives.
+        fetch_ready = Bool(1)
+        if self.icache_model is not None:
+            fetch_ready = self.icache_model.build(addr=new_PC, enable=~new_stalled)
 
-        with Condition(~new_stalled):
+        with Condition(~new_stalled & fetch_ready):
             decoder_call = decoder.async_called(PC=new_PC)
             decoder_call.bind.set_fifo_depth(PC=1)
+            if trace is not None:
+                trace.fetch(new_PC)
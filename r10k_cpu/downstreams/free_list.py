@@ -10,7 +10,11 @@ class FreeList(Downstream):
     # Only snapshot_head is needed to track the head position for recovery, because the push operations before branch are valid.
     snapshot_head: Array
 
-    def __init__(self, register_number: int):
+    # Per physical register, how many committed mappings it has beyond the first; None
+    # unless logical registers can share physical registers (move elimination).
+    sharers: Array | None
+
+    def __init__(self, register_number: int, shared_registers: bool = False):
         super().__init__()
         bits = ceil(log2(register_number))
 
@@ -27,6 +31,8 @@ class FreeList(Downstream):
         self.zero_reg = Bits(bits)(0)
 
         self.snapshot_head = RegArray(Bits(self.queue.addr_bits), 1)
+        # At most every logical register maps to one physical register.
+        self.sharers = RegArray(Bits(5), register_number) if shared_registers else None
 
     @downstream.combinational
     def build(
@@ -36,32 +42,54 @@ class FreeList(Downstream):
         push_data: Value,
         make_snapshot: Value,
         flush_recover: Value,
+        share_enable: Value | None = None,
+        share_data: Value | None = None,
+        release_enable: Value | None = None,
+        release_data: Value | None = None,
     ):
         make_snapshot = make_snapshot.optional(Bits(1)(0))
         flush_recover = flush_recover.optional(Bits(1)(0))
         pop_enable = pop_enable.optional(Bits(1)(0))
         push_enable = push_enable.optional(Bits(1)(0))
 
+        if release_enable is not None:
+            # An early release (see EarlyRelease) uses the push port when Commit does not.
+            release_enable = release_enable.optional(Bits(1)(0)) & ~push_enable
+            push_data = push_enable.select(push_data, release_data.optional(self.zero_reg))
+            push_enable = push_enable | release_enable
+
+        if self.sharers is not None:
+            push_enable = self._release(push_enable, push_data, share_enable, share_data)
+
+        addr_type = UInt(self.queue.addr_bits)
+        head = self.queue.get_head()
+        tail = self.queue.get_tail()
+        next_head = self.queue._increment_pointer(head)
+        next_tail = self.queue._increment_pointer(tail)
+
+        # A branch that also writes a register (a fused compare-and-branch) pops in the same
+        # cycle; its register is not given back on recovery.
         with Condition(make_snapshot):
-            self.snapshot_head[0] = self.queue.get_head()
+            self.snapshot_head[0] = pop_enable.select(next_head, head)
 
+        # The mispredicted op may free its old register in the flush cycle too.
+        recovered_tail = push_enable.select(next_tail, tail)
+        # The entries from the snapshot head up to the tail, modulo the depth. The queue is
+        # twice the register count, so it is never full and equal pointers mean empty.
+        # Both differences are taken without wrapping, as the depth need not be a power of 2.
+        recovered_head = self.snapshot_head[0].bitcast(addr_type)
+        tail_uint = recovered_tail.bitcast(addr_type)
+        count_type = UInt(self.queue.count_bits)
+        recovered_count = (tail_uint >= recovered_head).select(
+            (tail_uint - recovered_head).zext(count_type),
+            count_type(self.queue.depth) - (recovered_head - tail_uint).zext(count_type),
+        )
         with Condition(flush_recover):
+            with Condition(push_enable):
+                self.queue._storage[tail] = push_data
+            self.queue._tail[0] = recovered_tail
             self.queue._head[0] = self.snapshot_head[0]
-            self.queue._count[0] = (
-                (self.queue.get_tail() > self.queue.get_head())
-                .select(
-                    (
-                        self.queue._tail[0].bitcast(UInt(self.queue.addr_bits))
-                        - self.snapshot_head[0].bitcast(UInt(self.queue.addr_bits))
-                    ).zext(UInt(self.queue.count_bits)),
-                    UInt(self.queue.count_bits)(self.queue.depth)
-                    - (
-                        self.snapshot_head[0].bitcast(UInt(self.queue.addr_bits))
-                        - self.queue._tail[0].bitcast(UInt(self.queue.addr_bits))
-                    ).zext(UInt(self.queue.count_bits)),
-                )
-                .bitcast(Bits(self.queue.count_bits))
-            )
+            self.queue._count[0] = recovered_count.bitcast(Bits(self.queue.count_bits))
 
         self.queue.operate(
             pop_enable=pop_enable & ~flush_recover,
@@ -69,6 +97,35 @@ class FreeList(Downstream):
             push_data=push_data,
         )
 
+    def _release(
+        self, push_enable: Value, push_data: Value, share_enable: Value, share_data: Value
+    ) -> Value:
+        """
+        Count the mapping a committed move adds (share) and the one a committed overwrite
+        removes (push); a register is only pushed when its last mapping is removed.
+
+        Moves are counted when they commit, as the committed map is exact: a move reads
+        the mapping it copies before that mapping is overwritten, so it commits first.
+        """
+        share_data = share_data.optional(self.zero_reg)
+        share_enable = share_enable.optional(Bits(1)(0)) & (share_data != self.zero_reg)
+        count_type = UInt(5)
+        # `mv x1, x1` removes and adds a mapping of the same register.
+        same = share_enable & push_enable & (share_data == push_data)
+        released = self.sharers[push_data]
+        shared = released != Bits(5)(0)
+
+        with Condition(share_enable & ~same):
+            self.sharers[share_data] = (
+                self.sharers[share_data].bitcast(count_type) + count_type(1)
+            ).bitcast(Bits(5))
+        with Condition(push_enable & ~same & shared):
+            self.sharers[push_data] = (released.bitcast(count_type) - count_type(1)).bitcast(
+                Bits(5)
+            )
+
+        return push_enable & ~same & ~shared
+
     def free_reg(self) -> Value:
         return self.queue.front()
 
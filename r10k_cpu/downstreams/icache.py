@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import math
+
+from assassyn.frontend import *
+from r10k_cpu.utils import Bool
+
+
+def _is_power_of_two(value: int) -> bool:
+    return value > 0 and (value & (value - 1)) == 0
+
+
+class InstructionCache:
+    """
+    Tag-only timing model of a set-associative, blocking instruction cache.
+
+    Instruction words are still read from the backing instruction SRAM; this model only
+    decides whether a fetch hits or has to wait ``miss_latency`` cycles for its line.
+    Replacement is round-robin per set. With ``prefetch_lines > 0`` a miss on line L also
+    fills lines L+1 .. L+N (next-N-line prefetch); the prefetched lines arrive together
+    with the demand line.
+
+    It is driven from inside FetcherImpl, the same way CircularQueue is driven from
+    inside the queue downstreams.
+    """
+
+    def __init__(
+        self,
+        size: int = 1024,
+        ways: int = 2,
+        line_size: int = 16,
+        miss_latency: int = 8,
+        prefetch_lines: int = 0,
+    ) -> None:
+        if not (_is_power_of_two(size) and _is_power_of_two(ways) and _is_power_of_two(line_size)):
+            raise ValueError("I-cache size, ways and line size must be powers of two.")
+        if line_size < 4:
+            raise ValueError("I-cache line must hold at least one instruction.")
+        if size < ways * line_size:
+            raise ValueError("I-cache size must hold at least one set.")
+        if miss_latency <= 0:
+            raise ValueError("I-cache miss latency must be positive.")
+
+        self.size = size
+        self.ways = ways
+        self.line_size = line_size
+        self.miss_latency = miss_latency
+        self.prefetch_lines = prefetch_lines
+        self.sets = size // (ways * line_size)
+
+        if prefetch_lines < 0 or (prefetch_lines > 0 and prefetch_lines >= self.sets):
+            raise ValueError("Prefetch distance must be non-negative and smaller than the number of sets.")
+
+        self.offset_bits = int(math.log2(line_size))
+        self.index_bits = int(math.log2(self.sets))
+        self.line_bits = 32 - self.offset_bits
+        self.tag_bits = self.line_bits - self.index_bits
+        self.way_bits = max(1, int(math.log2(ways)))
+        self.counter_bits = max(1, math.ceil(math.log2(miss_latency + 1)))
+
+        # One register per line so that a fill can update several sets in the same cycle.
+        self._tags = [
+            [RegArray(Bits(self.tag_bits), 1) for _ in range(ways)] for _ in range(self.sets)
+        ]
+        self._valid = [[RegArray(Bool, 1) for _ in range(ways)] for _ in range(self.sets)]
+        self._victim = [RegArray(Bits(self.way_bits), 1) for _ in range(self.sets)]
+
+        self._pending = RegArray(Bool, 1)
+        self._pending_line = RegArray(Bits(self.line_bits), 1)
+        self._countdown = RegArray(UInt(self.counter_bits), 1)
+
+    def build(self, addr: Value, enable: Value) -> Value:
+        """Look up ``addr`` and advance the miss state machine; returns 1 when the fetch may proceed."""
+
+        line = addr[self.offset_bits : 31]
+        hit = self.contains(line)
+
+        busy = self._pending[0]
+        countdown = self._countdown[0]
+        fill_now = busy & (countdown == UInt(self.counter_bits)(1))
+        start_miss = enable & ~busy & ~hit
+
+        self._pending[0] = start_miss | (busy & ~fill_now)
+        self._pending_line[0] = start_miss.select(line, self._pending_line[0])
+        self._countdown[0] = start_miss.select(
+            UInt(self.counter_bits)(self.miss_latency),
+            busy.select(countdown - UInt(self.counter_bits)(1), countdown),
+        )
+
+        self._fill(fill_now)
+
+        return hit & ~busy
+
+    def contains(self, line: Value) -> Value:
+        """Whether the line address (PC >> offset_bits) is present in the cache."""
+        index = self._index_of(line)
+        tag = self._tag_of(line)
+
+        hit = Bool(0)
+        for s in range(self.sets):
+            in_set = self._set_match(index, s)
+            for w in range(self.ways):
+                hit = hit | (in_set & self._valid[s][w][0] & (self._tags[s][w][0] == tag))
+        return hit
+
+    def _fill(self, fill_now: Value) -> None:
+        base_line = self._pending_line[0]
+        fill_lines = [base_line] + [
+            (base_line.bitcast(UInt(self.line_bits)) + UInt(self.line_bits)(k)).bitcast(
+                Bits(self.line_bits)
+            )
+            for k in range(1, self.prefetch_lines + 1)
+        ]
+        fill_valid = [fill_now & ~self.contains(line) for line in fill_lines]
+
+        for s in range(self.sets):
+            # Consecutive lines map to distinct sets, so each set receives at most one fill.
+            set_fill = Bool(0)
+            set_tag = Bits(self.tag_bits)(0)
+            for line, valid in zip(fill_lines, fill_valid):
+                hit_set = valid & self._set_match(self._index_of(line), s)
+                set_fill = set_fill | hit_set
+                set_tag = hit_set.select(self._tag_of(line), set_tag)
+
+            victim = self._victim[s][0]
+            for w in range(self.ways):
+                replace = set_fill & (victim == Bits(self.way_bits)(w))
+                with Condition(replace):
+                    self._tags[s][w][0] = set_tag
+                    self._valid[s][w][0] = Bool(1)
+
+            if self.ways > 1:
+                next_victim = (victim.bitcast(UInt(self.way_bits)) + UInt(self.way_bits)(1)).bitcast(
+                    Bits(self.way_bits)
+                )
+                with Condition(set_fill):
+                    self._victim[s][0] = next_victim
+
+    def _index_of(self, line: Value) -> Value | None:
+        if self.index_bits == 0:
+            return None
+        return line[0 : self.index_bits - 1]
+
+    def _tag_of(self, line: Value) -> Value:
+        return line[self.index_bits : self.line_bits - 1]
+
+    def _set_match(self, index: Value | None, s: int) -> Value:
+        if index is None:
+            return Bool(1)
+        return index == Bits(self.index_bits)(s)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from assassyn.frontend import *
+from r10k_cpu.common import DEFAULT_CORE_CONFIG, CoreConfig
+from r10k_cpu.modules.byte_memory import ByteAddressableMemory
+from r10k_cpu.modules.writeback import WriteBack
+from r10k_cpu.utils import Bool
+
+
+@dataclass(frozen=True)
+class LoadBypassSource:
+    enable: Value
+    dest_physical: Value
+    op_type: Value
+    byte_offset: Value
+
+
+class LoadBypass(Downstream):
+    """
+    Forwards load data to the units executing in the same cycle as the load's WriteBack.
+
+    The scheduler wakes the dependents of a load when the load is issued, so they execute
+    while the loaded word is still on the SRAM output and not yet in the register file.
+    The LSU registers its load via `track`; consumers read operands through `read`, which
+    selects the aligned memory word instead of the stale register file entry, or pass a
+    value read earlier (through the register bank ports) to `forward`.
+    Only a memory port that is always granted may be tracked, so the data is never late.
+    """
+
+    def __init__(
+        self, memory: ByteAddressableMemory, port: int = 0, config: CoreConfig = DEFAULT_CORE_CONFIG
+    ):
+        super().__init__()
+        self.memory = memory
+        self.port = port
+        self._source: LoadBypassSource | None = None
+
+        self._valid = RegArray(Bool, 1)
+        self._physical_bits = config.physical_idx_len
+        self._dest = RegArray(Bits(self._physical_bits), 1)
+        self._op_type = RegArray(Bits(3), 1)
+        self._byte_offset = RegArray(Bits(2), 1)
+
+    def track(self, enable: Value, dest_physical: Value, op_type: Value, byte_offset: Value) -> None:
+        if self._source is not None:
+            raise ValueError("LoadBypass tracks a single LSU.")
+        self._source = LoadBypassSource(
+            enable=enable,
+            dest_physical=dest_physical,
+            op_type=op_type,
+            byte_offset=byte_offset,
+        )
+
+    def read(self, physical_register_file: Array, physical_idx: Value) -> Value:
+        """Read a physical register, taking the value of a load completing this cycle."""
+        return self.forward(physical_register_file[physical_idx], physical_idx)
+
+    def forward(self, value: Value, physical_idx: Value) -> Value:
+        """`value` of a physical register, or the data of a load to it completing this cycle."""
+        hit = self._valid[0] & (self._dest[0] == physical_idx)
+        load_data = WriteBack.process_memory_data(
+            self._op_type[0], self.memory.dout[self.port], self._byte_offset[0]
+        )
+        return hit.select(load_data, value)
+
+    @downstream.combinational
+    def build(self):
+        if self._source is None:
+            raise ValueError("LoadBypass has no LSU to track.")
+        source = self._source
+        zero = Bits(self._physical_bits)(0)
+        dest = source.dest_physical.optional(zero)
+        self._valid[0] = source.enable.optional(Bool(0)) & (dest != zero)
+        self._dest[0] = dest
+        self._op_type[0] = source.op_type.optional(Bits(3)(0))
+        self._byte_offset[0] = source.byte_offset.optional(Bits(2)(0))
+
+
+def read_register(
+    physical_register_file: Array,
+    physical_idx: Value,
+    load_bypass: LoadBypass | None,
+    value: Value | None = None,
+) -> Value:
+    """Read a physical register, or take `value` when it was read at issue."""
+    if value is None:
+        value = physical_register_file[physical_idx]
+    if load_bypass is None:
+        return value
+    return load_bypass.forward(value, physical_idx)
+
+
+def operand_port_types(entry_type: DType, operand_ports: bool) -> dict[str, Port]:
+    """Ports of a unit issued `entry_type`, plus its operands when they are read at issue."""
+    ports = {"instr": Port(entry_type)}
+    if operand_ports:
+        ports["rs1_value"] = Port(Bits(32))
+        ports["rs2_value"] = Port(Bits(32))
+    return ports
+
+
+def pop_operand_ports(
+    module: Module, operand_ports: bool
+) -> tuple[Value, Value | None, Value | None]:
+    """The issued instruction and its operands read at issue (None: read them now)."""
+    if operand_ports:
+        instr, rs1_value, rs2_value = module.pop_all_ports(False)
+        return instr, rs1_value, rs2_value
+    return module.pop_all_ports(False), None, None
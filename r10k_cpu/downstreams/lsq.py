@@ -1,11 +1,13 @@
 import math
 from dataclasses import dataclass
+from typing import Optional
 from assassyn.frontend import *
 from assassyn.ir.dtype import RecordValue
 from dataclass.circular_queue import CircularQueue, CircularQueueSelection
-from r10k_cpu.common import LSQEntryType
+from r10k_cpu.common import DEFAULT_CORE_CONFIG, CoreConfig
 from r10k_cpu.downstreams.register_ready import RegisterReady
-from r10k_cpu.utils import is_between, replace_bundle
+from r10k_cpu.perf_counters import PerfCounters
+from r10k_cpu.utils import is_between, replace_bundle, resize
 
 
 @dataclass(frozen=True)
@@ -22,9 +24,14 @@ class LSQPushEntry:
 class LSQ(Downstream):
     queue: CircularQueue
 
-    def __init__(self, depth: int):
+    def __init__(self, depth: Optional[int] = None, config: CoreConfig = DEFAULT_CORE_CONFIG):
         super().__init__()
-        self.queue = CircularQueue(LSQEntryType, depth)
+        depth = config.lsq_depth if depth is None else depth
+        if depth > config.lsq_depth:
+            raise ValueError("LSQ is deeper than its index in the core config.")
+        self.config = config
+        self.entry_type = config.lsq_entry_type
+        self.queue = CircularQueue(self.entry_type, depth)
 
     @downstream.combinational
     def build(
@@ -35,23 +42,24 @@ class LSQ(Downstream):
         active_list_idx: Value,
         flush: Value,
     ):
-        entry = LSQEntryType.bundle(
+        physical_bits = self.config.physical_idx_len
+        entry = self.entry_type.bundle(
             valid=push_enable.optional(Bits(1)(0)),
             active_list_idx=active_list_idx,
-            lsq_queue_idx=(self.queue.get_tail().bitcast(UInt(5))).bitcast(Bits(5)),
+            lsq_queue_idx=resize(self.queue.get_tail(), self.config.lsq_idx_len),
             imm=push_data.imm.optional(Bits(32)(0)),
             is_load=push_data.is_load.optional(Bits(1)(0)),
             is_store=push_data.is_store.optional(Bits(1)(0)),
             op_type=push_data.op_type.optional(Bits(3)(0)),
-            rd_physical=push_data.rd_physical.optional(Bits(6)(0)),
-            rs1_physical=push_data.rs1_physical.optional(Bits(6)(0)),
-            rs2_physical=push_data.rs2_physical.optional(Bits(6)(0)),
+            rd_physical=push_data.rd_physical.optional(Bits(physical_bits)(0)),
+            rs1_physical=push_data.rs1_physical.optional(Bits(physical_bits)(0)),
+            rs2_physical=push_data.rs2_physical.optional(Bits(physical_bits)(0)),
             issued=Bits(1)(0),
         )
         push_valid = push_enable.optional(Bits(1)(0))
         pop_enable = pop_enable.optional(Bits(1)(0))
 
-        store_buffer_push_data = LSQEntryType.view(self.queue[self.queue._head[0]])
+        store_buffer_push_data = self.entry_type.view(self.queue[self.queue._head[0]])
         store_buffer_push_enable = pop_enable & store_buffer_push_data.is_store
 
         self.queue.operate(
@@ -64,8 +72,27 @@ class LSQ(Downstream):
         return store_buffer_push_enable, store_buffer_push_data
 
     def select_first_ready(
-        self, register_ready: RegisterReady
+        self, register_ready: RegisterReady, perf_counters: Optional[PerfCounters] = None
     ) -> CircularQueueSelection:
+        return self._priority_select(self._load_candidates(register_ready, perf_counters))
+
+    def select_two_ready(
+        self, register_ready: RegisterReady, perf_counters: Optional[PerfCounters] = None
+    ) -> tuple[CircularQueueSelection, CircularQueueSelection]:
+        """Select the two oldest issuable loads, e.g. for two load pipelines."""
+        candidates = self._load_candidates(register_ready, perf_counters)
+        first = self._priority_select(candidates)
+
+        remaining = [
+            (data, pointer, distance, valid & ~(first.valid & (pointer == first.index)))
+            for data, pointer, distance, valid in candidates
+        ]
+        second = self._priority_select(remaining)
+        return first, second
+
+    def _load_candidates(
+        self, register_ready: RegisterReady, perf_counters: Optional[PerfCounters] = None
+    ) -> list[tuple]:
         count_uint = self.queue._count[0].bitcast(UInt(self.queue.count_bits))
 
         pointers = []
@@ -89,7 +116,7 @@ class LSQ(Downstream):
             distance_uint = distance.bitcast(UInt(self.queue.count_bits))
             distance = (distance_uint + self.queue._one).bitcast(Bits(self.queue.count_bits))
 
-        entries = [LSQEntryType.view(v) for v in values]
+        entries = [self.entry_type.view(v) for v in values]
         store_flags = [has_entries[i] & entries[i].valid & entries[i].is_store for i in range(self.queue.depth)]
 
         # Prefix OR with log depth to know if a store appears before each position.
@@ -106,19 +133,28 @@ class LSQ(Downstream):
             any_store_before[i] = Bits(1)(0) if i == 0 else store_prefix[i - 1]
 
         candidates = []
+        blocked_by_store = Bits(1)(0)
         for i in range(self.queue.depth):
             rs1_ready = self._operand_ready(register_ready, entries[i].rs1_physical)
-            matches = (
-                entries[i].valid
+            waiting_load = (
+                has_entries[i]
+                & entries[i].valid
                 & rs1_ready
                 & ~entries[i].issued
                 & ~entries[i].is_store
-                & ~any_store_before[i]
             )
-            candidate_valid = has_entries[i] & matches
+            candidate_valid = waiting_load & ~any_store_before[i]
+            blocked_by_store = blocked_by_store | (waiting_load & any_store_before[i])
 
             candidates.append((values[i], pointers[i], distances[i], candidate_valid))
 
+        if perf_counters is not None:
+            perf_counters.count("load_blocked_by_store", blocked_by_store)
+
+        return candidates
+
+    def _priority_select(self, candidates: list[tuple]) -> CircularQueueSelection:
+        candidates = list(candidates)
         next_power = 1 << math.ceil(math.log2(len(candidates)))
         zero_data, zero_index, zero_distance = candidates[0][0], self.queue._zero_addr, self.queue._zero
         for _ in range(len(candidates), next_power):
@@ -142,7 +178,7 @@ class LSQ(Downstream):
         selected_data, selected_index, selected_distance, selected_valid = candidates[0]
 
         return CircularQueueSelection(
-            data=LSQEntryType.view(selected_data),
+            data=self.entry_type.view(selected_data),
             index=selected_index,
             distance=selected_distance,
             valid=selected_valid,
@@ -156,6 +192,16 @@ class LSQ(Downstream):
         )
         self.queue[index] = new_bundle
 
+    def mark_replay(self, index: Value):
+        """Clear the issued bit of a load that has to be selected again."""
+        index = resize(index, self.queue.addr_bits)
+        bundle = self.queue[index]
+        new_bundle = replace_bundle(
+            bundle,
+            issued=Bits(1)(0),
+        )
+        self.queue[index] = new_bundle
+
     @staticmethod
     def _operand_ready(register_ready: RegisterReady, physical: Value) -> Value:
         ready_bit = register_ready.read(physical).bitcast(Bits(1))
@@ -180,9 +226,11 @@ class LSQ(Downstream):
 class StoreBuffer(Downstream):
     reg: Array
 
-    def __init__(self):
+    def __init__(self, config: CoreConfig = DEFAULT_CORE_CONFIG):
         super().__init__()
-        self.reg = RegArray(LSQEntryType, 1)
+        self.config = config
+        self.entry_type = config.lsq_entry_type
+        self.reg = RegArray(self.entry_type, 1)
 
     @downstream.combinational
     def build(self, push_enable: Value, push_data: RecordValue, pop_enable: Value):
@@ -194,16 +242,17 @@ class StoreBuffer(Downstream):
             self.reg[0] = push_data
 
         with Condition(~push_enable & pop_enable):
-            self.reg[0] = LSQEntryType.bundle(
+            physical_bits = self.config.physical_idx_len
+            self.reg[0] = self.entry_type.bundle(
                 valid=Bits(1)(0),
-                active_list_idx=Bits(5)(0),
-                lsq_queue_idx=Bits(5)(0),
+                active_list_idx=Bits(self.config.active_list_idx_len)(0),
+                lsq_queue_idx=Bits(self.config.lsq_idx_len)(0),
                 imm=Bits(32)(0),
                 is_load=Bits(1)(0),
                 is_store=Bits(1)(0),
                 op_type=Bits(3)(0),
-                rd_physical=Bits(6)(0),
-                rs1_physical=Bits(6)(0),
-                rs2_physical=Bits(6)(0),
+                rd_physical=Bits(physical_bits)(0),
+                rs1_physical=Bits(physical_bits)(0),
+                rs2_physical=Bits(physical_bits)(0),
                 issued=Bits(1)(0),
             )
\ No newline at end of file
@@ -49,28 +49,33 @@ class MapTable(Downstream):
     def build(
         self,
         *,
-        rename_write: MapTableWriteEntry,
-        commit_write: MapTableWriteEntry,
+        rename_write: MapTableWriteEntry | Sequence[MapTableWriteEntry],
+        commit_write: MapTableWriteEntry | Sequence[MapTableWriteEntry],
         flush_to_commit: Value,
     ) -> None:
-        flush_to_commit = flush_to_commit.optional(Bits(1)(0))
+        """
+        Apply this cycle's rename and commit writes.
 
-        rename_en = rename_write.enable.optional(Bits(1)(0))
-        rename_logical = rename_write.logical_idx.optional(Bits(self._index_bits)(0))
-        rename_physical = rename_write.physical_value.optional(Bits(self.physical_bits)(0))
+        Either side takes one write or a sequence of them in program order; when several
+        write the same logical register, the last enabled one wins.
+        """
+        flush_to_commit = flush_to_commit.optional(Bits(1)(0))
 
-        commit_en = commit_write.enable.optional(Bits(1)(0))
-        commit_logical = commit_write.logical_idx.optional(Bits(self._index_bits)(0))
-        commit_physical = commit_write.physical_value.optional(Bits(self.physical_bits)(0))
+        rename_writes = self._resolve_writes(rename_write)
+        commit_writes = self._resolve_writes(commit_write)
 
         spec_bits = self._spec_table[0].bitcast(UInt(self._storage_bits))
         commit_bits = self._commit_table[0].bitcast(UInt(self._storage_bits))
 
         flush_bit = flush_to_commit.bitcast(Bits(1))
+        rename_writes = [
+            (flush_bit.select(self._zero_enable, enable), logical, physical)
+            for enable, logical, physical in rename_writes
+        ]
 
-        commit_bits_next = self._apply_write(commit_bits, commit_en, commit_logical, commit_physical)
+        commit_bits_next = self._apply_writes(commit_bits, commit_writes)
         spec_after_flush = flush_bit.select(commit_bits_next, spec_bits)
-        spec_bits_next = self._apply_write(spec_after_flush, flush_bit.select(self._zero_enable, rename_en), rename_logical, rename_physical)
+        spec_bits_next = self._apply_writes(spec_after_flush, rename_writes)
 
         self._commit_table[0] = commit_bits_next.bitcast(Bits(self._storage_bits))
         self._spec_table[0] = spec_bits_next.bitcast(Bits(self._storage_bits))
@@ -79,6 +84,10 @@ class MapTable(Downstream):
         """Read the speculative physical mapping for a given logical index."""
         return self._read_entry(self._spec_table[0], logical_idx)
 
+    def read_spec_many(self, logical_idxs: Sequence[Value]) -> list[Value]:
+        """Read the speculative mappings of several logical indices from one table read."""
+        return self._read_entries(self._spec_table[0], logical_idxs)
+
     def read_commit(self, logical_idx: Value) -> Value:
         """Read the committed physical mapping for a given logical index."""
         return self._read_entry(self._commit_table[0], logical_idx)
@@ -89,55 +98,74 @@ class MapTable(Downstream):
     def commit_state(self) -> Value:
         return self._commit_table[0]
 
-    def _apply_write(
+    def _resolve_writes(
+        self, writes: MapTableWriteEntry | Sequence[MapTableWriteEntry]
+    ) -> list[tuple[Value, Value, Value]]:
+        if isinstance(writes, MapTableWriteEntry):
+            writes = [writes]
+        return [
+            (
+                write.enable.optional(Bits(1)(0)).bitcast(Bits(1)),
+                write.logical_idx.optional(Bits(self._index_bits)(0)).bitcast(Bits(self._index_bits)),
+                write.physical_value.optional(Bits(self.physical_bits)(0)).bitcast(Bits(self.physical_bits)),
+            )
+            for write in writes
+        ]
+
+    def _apply_writes(
         self,
         base_value: Value,
-        enable: Value,
-        logical_idx: Value,
-        physical_value: Value,
+        writes: Sequence[tuple[Value, Value, Value]],
     ) -> Value:
-        enable_bit = enable.bitcast(Bits(1))
-        idx_bits = logical_idx.bitcast(Bits(self._index_bits))
-        phys_bits = physical_value.bitcast(Bits(self.physical_bits))
         base_bits = base_value.bitcast(Bits(self._storage_bits))
+        if not writes:
+            return base_bits.bitcast(UInt(self._storage_bits))
+
+        # One decode per writer; each entry then only looks at its bit of every mask.
+        masks = [
+            enable.select(Bits(self.num_logical)(1) << logical_idx, Bits(self.num_logical)(0))
+            for enable, logical_idx, _ in writes
+        ]
 
-        one_hot_mask = Bits(self.num_logical)(1) << idx_bits
-        
         chunks = []
         for i in range(self.num_logical):
             lo, hi = self._entry_ranges[i]
             chunk = base_bits[lo:hi]
-            
-            is_target = one_hot_mask[i:i]
-            should_update = is_target & enable_bit
-            
-            new_chunk = should_update.select(phys_bits, chunk)
-            chunks.append(new_chunk)
+            for mask, (_, _, physical_value) in zip(masks, writes):
+                chunk = mask[i:i].select(physical_value, chunk)
+            chunks.append(chunk)
 
         result = concat(*reversed(chunks))
 
         return result.bitcast(UInt(self._storage_bits))
 
     def _read_entry(self, table_value: Value, logical_idx: Value) -> Value:
-        current_layer = []
+        return self._read_entries(table_value, [logical_idx])[0]
+
+    def _read_entries(self, table_value: Value, logical_idxs: Sequence[Value]) -> list[Value]:
+        leaves = []
         for lo, hi in self._entry_ranges:
-            current_layer.append(table_value[lo:hi])
-        
+            leaves.append(table_value[lo:hi])
+
         next_power = 1 << self._index_bits
-        while len(current_layer) < next_power:
-            current_layer.append(Bits(self.physical_bits)(0))
-
-        for bit_idx in range(self._index_bits):
-            selector = logical_idx[bit_idx:bit_idx]
-            next_layer = []
-            
-            for i in range(0, len(current_layer), 2):
-                val_even = current_layer[i]
-                val_odd = current_layer[i+1]
-                
-                muxed = selector.select(val_odd, val_even)
-                next_layer.append(muxed)
-            
-            current_layer = next_layer
-
-        return current_layer[0]
\ No newline at end of file
+        while len(leaves) < next_power:
+            leaves.append(Bits(self.physical_bits)(0))
+
+        results = []
+        for logical_idx in logical_idxs:
+            current_layer = leaves
+            for bit_idx in range(self._index_bits):
+                selector = logical_idx[bit_idx:bit_idx]
+                next_layer = []
+
+                for i in range(0, len(current_layer), 2):
+                    val_even = current_layer[i]
+                    val_odd = current_layer[i+1]
+
+                    muxed = selector.select(val_odd, val_even)
+                    next_layer.append(muxed)
+
+                current_layer = next_layer
+            results.append(current_layer[0])
+
+        return results
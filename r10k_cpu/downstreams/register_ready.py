@@ -57,9 +57,11 @@ class RegisterReady(Downstream):
         )
 
     def read(self, physical_idx: Value) -> Value:
-        idx  = physical_idx.bitcast(UInt(self.index_bits))
-        bits = self._ready_bits[0].bitcast(UInt(self.num_registers))
-        return ((bits >> idx)[0:0] & UInt(1)(1)).bitcast(Bits(1))
+        # One-hot decode of the tag, AND-ed with the vector and OR-reduced: no shifter.
+        idx = physical_idx.bitcast(UInt(self.index_bits))
+        one_hot = (UInt(self.num_registers)(1) << idx).bitcast(Bits(self.num_registers))
+        hit = self._ready_bits[0] & one_hot
+        return (hit != Bits(self.num_registers)(0)).bitcast(Bits(1))
 
     def state(self) -> Value:
         return self._ready_bits[0]
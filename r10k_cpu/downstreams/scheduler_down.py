@@ -1,11 +1,17 @@
 from dataclasses import dataclass
+from typing import Optional
 from assassyn.frontend import *
 from assassyn.ir.dtype import RecordValue
 from dataclass.circular_queue import CircularQueueSelection
+from dataclass.multiport_regarray import BankedRegArray
 from r10k_cpu.common import is_div_op, is_mul_op, is_rem_op
 from r10k_cpu.downstreams.alu_queue import ALUQueue
+from r10k_cpu.downstreams.load_bypass import LoadBypass
 from r10k_cpu.downstreams.lsq import LSQ
+from r10k_cpu.downstreams.register_ready import RegisterReady
 from r10k_cpu.modules.alu import Multiply_ALU
+from r10k_cpu.perf_counters import PerfCounters
+from r10k_cpu.pipeline_trace import PipelineTrace
 
 
 @dataclass(frozen=True)
@@ -19,6 +25,36 @@ class SchedulerDownEntry:
     lsu: Module
     lsq_selection: CircularQueueSelection
     lsq: LSQ
+    # Set when loads wake their dependents at issue instead of at WriteBack.
+    load_wakeup: Optional[RegisterReady] = None
+    perf_counters: Optional[PerfCounters] = None
+    trace: Optional[PipelineTrace] = None
+    # A banked register file; issue is limited to its read ports per bank, and the operands
+    # are read through them here and sent along with the instructions.
+    register_banks: Optional[BankedRegArray] = None
+    # The load chosen for the second LSU, which shares the register file ports.
+    load_port_selection: Optional[CircularQueueSelection] = None
+    # Forwards load data to the operands read at issue, for speculative load wakeup.
+    load_bypass: Optional[LoadBypass] = None
+
+
+@dataclass(frozen=True)
+class IssuedOperands:
+    """Operands read at issue through the register bank ports."""
+
+    alu_rs1: Value
+    alu_rs2: Value
+    lsu_rs1: Value
+    lsu_rs2: Value
+    load_port_rs1: Optional[Value] = None
+
+
+@dataclass(frozen=True)
+class LoadPortGrant:
+    """Whether the second LSU's load got its bank port, and the base register it read."""
+
+    granted: Value
+    rs1_value: Value
 
 
 class SchedulerDown(Downstream):
@@ -26,44 +62,203 @@ class SchedulerDown(Downstream):
         super().__init__()
 
     @downstream.combinational
-    def build(self, entry: SchedulerDownEntry, flush: Value):
+    def build(self, entry: SchedulerDownEntry, flush: Value) -> Optional[LoadPortGrant]:
+        """Issue this cycle's ALU and LSU instructions; return the second LSU's bank grant."""
         flush = flush.optional(Bits(1)(0))
         buffer_valid = entry.buffer_valid.optional(Bits(1)(0))
 
-        with Condition(entry.alu_selection.valid.optional(Bits(1)(0)) & ~flush):
-            is_mul = is_mul_op(entry.alu_selection.data.alu_op)
-            is_div_or_rem = is_div_op(entry.alu_selection.data.alu_op) | is_rem_op(
-                entry.alu_selection.data.alu_op
-            )
+        alu_valid = entry.alu_selection.valid.optional(Bits(1)(0)) & ~flush
+        alu_instr = entry.alu_selection.data
+        is_mul = is_mul_op(alu_instr.alu_op)
+        is_div_or_rem = is_div_op(alu_instr.alu_op) | is_rem_op(alu_instr.alu_op)
+        issue_mul_alu = alu_valid & (is_mul | (is_div_or_rem & ~entry.multiply_alu.div_busy[0]))
+        issue_alu = alu_valid & ~(is_mul | is_div_or_rem)
+
+        issue_lsq = (
+            entry.lsq_selection.valid.optional(Bits(1)(0)) & ~buffer_valid & ~flush
+        )
 
-            issue_mul_alu = is_mul | (is_div_or_rem & ~entry.multiply_alu.div_busy[0])
-            issue_alu = ~(is_mul | is_div_or_rem)
+        load_port_grant = None
+        alu_operands = {}
+        lsu_operands = {}
+        if entry.register_banks is not None:
+            issue_alu, issue_mul_alu, issue_lsq, load_port_granted, operands = self._arbitrate(
+                entry, buffer_valid, issue_alu, issue_mul_alu, issue_lsq, flush
+            )
+            alu_operands = {"rs1_value": operands.alu_rs1, "rs2_value": operands.alu_rs2}
+            lsu_operands = {"rs1_value": operands.lsu_rs1, "rs2_value": operands.lsu_rs2}
+            if load_port_granted is not None:
+                load_port_grant = LoadPortGrant(load_port_granted, operands.load_port_rs1)
 
-            with Condition(issue_mul_alu):
-                alu_call = entry.multiply_alu.async_called(
-                    instr=entry.alu_selection.data
-                )
-                alu_call.bind.set_fifo_depth(instr=1)
-                entry.multiply_alu.div_busy[0] = is_div_or_rem
+        with Condition(issue_mul_alu):
+            alu_call = entry.multiply_alu.async_called(instr=alu_instr, **alu_operands)
+            alu_call.bind.set_fifo_depth(instr=1, **{name: 1 for name in alu_operands})
+            entry.multiply_alu.div_busy[0] = is_div_or_rem
 
-            with Condition(issue_alu):
-                alu_call = entry.alu.async_called(instr=entry.alu_selection.data)
-                alu_call.bind.set_fifo_depth(instr=1)
+        with Condition(issue_alu):
+            alu_call = entry.alu.async_called(instr=alu_instr, **alu_operands)
+            alu_call.bind.set_fifo_depth(instr=1, **{name: 1 for name in alu_operands})
 
-            with Condition(issue_alu | issue_mul_alu):
-                entry.alu_queue.mark_issued(index=entry.alu_selection.index)
+        with Condition(issue_alu | issue_mul_alu):
+            entry.alu_queue.mark_issued(index=entry.alu_selection.index)
+            if entry.trace is not None:
+                entry.trace.issue(alu_instr.active_list_idx, "alu")
 
-        issue_lsq = (
-            entry.lsq_selection.valid.optional(Bits(1)(0)) & ~buffer_valid & ~flush
-        )
+        if entry.perf_counters is not None:
+            entry.perf_counters.count("alu_issue", issue_alu | issue_mul_alu)
 
         with Condition(issue_lsq):
             entry.lsq.mark_issued(index=entry.lsq_selection.index)
+            if entry.trace is not None:
+                entry.trace.issue(entry.lsq_selection.data.active_list_idx, "lsu")
+
+        if entry.load_wakeup is not None:
+            # This LSU always gets its bank, so the data reaches WriteBack exactly two cycles
+            # from now, which is when a dependent selected next cycle executes.
+            entry.load_wakeup.mark_ready(
+                entry.lsq_selection.data.rd_physical, enable=issue_lsq
+            )
 
         with Condition(issue_lsq | buffer_valid):
             lsu_call = entry.lsu.async_called(
                 instr=buffer_valid.select(
                     entry.buffer_instr.value(), entry.lsq_selection.data.value()
-                )
+                ),
+                **lsu_operands,
             )
-            lsu_call.bind.set_fifo_depth(instr=1)
+            lsu_call.bind.set_fifo_depth(instr=1, **{name: 1 for name in lsu_operands})
+
+        if entry.perf_counters is not None:
+            entry.perf_counters.count("lsq_issue", issue_lsq | buffer_valid)
+            entry.perf_counters.count("divider_busy", entry.multiply_alu.div_busy[0])
+            entry.perf_counters.count("store_buffer_full", buffer_valid)
+
+        return load_port_grant
+
+    @staticmethod
+    def _arbitrate(
+        entry: SchedulerDownEntry,
+        buffer_valid: Value,
+        issue_alu: Value,
+        issue_mul_alu: Value,
+        issue_lsq: Value,
+        flush: Value,
+    ) -> tuple[Value, Value, Value, Optional[Value], IssuedOperands]:
+        """
+        Hold back instructions whose operand reads do not fit the register bank ports,
+        and read the operands of the others through them.
+
+        A committed store in the buffer cannot wait and reads first, then the ALU
+        instruction, the load for the first LSU and the load for the second one.
+        """
+        alu_instr = entry.alu_selection.data
+        rs1_needed, rs2_needed = entry.alu_queue.operands_needed(alu_instr)
+        alu_wants = issue_alu | issue_mul_alu
+        groups = [
+            [
+                (buffer_valid, entry.buffer_instr.rs1_physical),
+                (buffer_valid, entry.buffer_instr.rs2_physical),
+            ],
+            [
+                (alu_wants & rs1_needed, alu_instr.rs1_physical),
+                (alu_wants & rs2_needed, alu_instr.rs2_physical),
+            ],
+            [(issue_lsq, entry.lsq_selection.data.rs1_physical)],
+        ]
+        load_port_wants = None
+        if entry.load_port_selection is not None:
+            load_port_wants = entry.load_port_selection.valid.optional(Bits(1)(0)) & ~flush
+            groups.append([(load_port_wants, entry.load_port_selection.data.rs1_physical)])
+
+        grants = entry.register_banks.arbitrate(groups, required=[True] + [False] * (len(groups) - 1))
+        alu_granted, lsq_granted = grants[1], grants[2]
+        conflict = (alu_wants & ~alu_granted) | (issue_lsq & ~lsq_granted)
+        load_port_granted = None
+        if load_port_wants is not None:
+            load_port_granted = grants[3]
+            conflict = conflict | (load_port_wants & ~load_port_granted)
+
+        if entry.perf_counters is not None:
+            entry.perf_counters.count("bank_conflict", conflict)
+
+        # The granted reads fit the ports, in the order they were granted in.
+        alu_issued = alu_wants & alu_granted
+        lsq_issued = issue_lsq & lsq_granted
+        requests = [
+            (buffer_valid, entry.buffer_instr.rs1_physical),
+            (buffer_valid, entry.buffer_instr.rs2_physical),
+            (alu_issued & rs1_needed, alu_instr.rs1_physical),
+            (alu_issued & rs2_needed, alu_instr.rs2_physical),
+            (lsq_issued, entry.lsq_selection.data.rs1_physical),
+        ]
+        if load_port_wants is not None:
+            requests.append(
+                (load_port_wants & load_port_granted, entry.load_port_selection.data.rs1_physical)
+            )
+        values = entry.register_banks.read_ports(requests, arbitrated=True).values
+
+        # A load whose data is on the memory output now reaches the register file only in
+        # the next cycle; its dependents woken at load issue may be issued in between.
+        if entry.load_bypass is not None:
+            values = [
+                entry.load_bypass.forward(value, addr) for (_, addr), value in zip(requests, values)
+            ]
+        operands = IssuedOperands(
+            alu_rs1=values[2],
+            alu_rs2=values[3],
+            # The store buffer and the LSQ never issue to the first LSU together.
+            lsu_rs1=buffer_valid.select(values[0], values[4]),
+            lsu_rs2=values[1],
+            load_port_rs1=values[5] if load_port_wants is not None else None,
+        )
+
+        return (
+            issue_alu & alu_granted,
+            issue_mul_alu & alu_granted,
+            lsq_issued,
+            load_port_granted,
+            operands,
+        )
+
+
+@dataclass(frozen=True)
+class LoadPortEntry:
+    selection: CircularQueueSelection
+    lsu: Module
+    lsq: LSQ
+    perf_counters: Optional[PerfCounters] = None
+    trace: Optional[PipelineTrace] = None
+
+
+class LoadPortDown(Downstream):
+    """
+    Issues a load to the second, load-only LSU.
+
+    Kept apart from SchedulerDown so that both downstreams can mark their LSQ entry issued in the same cycle.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+    @downstream.combinational
+    def build(self, entry: LoadPortEntry, flush: Value, grant: Optional[LoadPortGrant] = None):
+        flush = flush.optional(Bits(1)(0))
+        issue_load = entry.selection.valid.optional(Bits(1)(0)) & ~flush
+        operands = {}
+        if grant is not None:
+            # Register bank ports, see SchedulerDown. A load does not read rs2.
+            issue_load = issue_load & grant.granted.optional(Bits(1)(0))
+            operands = {
+                "rs1_value": grant.rs1_value.optional(Bits(32)(0)),
+                "rs2_value": Bits(32)(0),
+            }
+
+        with Condition(issue_load):
+            entry.lsq.mark_issued(index=entry.selection.index)
+            lsu_call = entry.lsu.async_called(instr=entry.selection.data.value(), **operands)
+            lsu_call.bind.set_fifo_depth(instr=1, **{name: 1 for name in operands})
+            if entry.trace is not None:
+                entry.trace.issue(entry.selection.data.active_list_idx, "lsu1")
+
+        if entry.perf_counters is not None:
+            entry.perf_counters.count("load_port1_issue", issue_load)
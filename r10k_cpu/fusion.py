@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import dataclasses
+from dataclasses import dataclass
+
+from assassyn.frontend import *
+from r10k_cpu.common import ALU_CODE_LEN
+from r10k_cpu.instruction import (
+    OPERANT_FROM_LEN,
+    BTypeInstruction,
+    InstructionArgs,
+    Instructions,
+)
+from r10k_cpu.utils import sext
+
+
+@dataclass(frozen=True)
+class FusedInstruction:
+    args: InstructionArgs
+    # PC of the last instruction of the pair, which the fused op commits as.
+    PC: Value
+    # The next instruction is consumed too; fetch continues at PC + 8.
+    fused: Value
+    # The pair is `slt`/`sltu` and a `bnez`/`beqz` on its result.
+    compare_branch: Value
+
+
+def _add(a: Value, b: Value) -> Value:
+    return (a.bitcast(UInt(32)) + b.bitcast(UInt(32))).bitcast(Bits(32))
+
+
+class MacroFusion:
+    """
+    Fuses adjacent instruction pairs into one op between fetch and rename.
+
+    The Decoder sees the instruction after the current one through a second instruction
+    memory port. Pairs writing the same register, whose first result is only read by the
+    second, become one op with one Active List, queue and physical register slot:
+
+    - `lui rd, hi; addi rd, rd, lo` loads the 32-bit constant like a single LUI
+    - `auipc rd, hi; jalr rd, lo(rd)` (`call`) is a direct jump, like a JAL at the jalr
+    - `slt(u) rd, a, b; bnez/beqz rd, L` is a branch at the bnez comparing a and b with
+      SLT(U), like `blt(u)`/`bge(u)`, which still writes the comparison to rd
+
+    A fused op commits once, as the second instruction, and counts twice in retire_count.
+    The fused branch keeps rd, as whether it is dead is unknown here, but it saves the
+    ALU pass before the branch and resolves as soon as a and b are ready.
+    """
+
+    def apply(
+        self, instruction: Value, next_instruction: Value, args: InstructionArgs, PC: Value
+    ) -> FusedInstruction:
+        rd = instruction[7:11]
+        opcode = instruction[0:6]
+        funct3 = instruction[12:14]
+        funct7 = instruction[25:31]
+        next_opcode = next_instruction[0:6]
+        next_funct3 = next_instruction[12:14]
+        next_funct7 = next_instruction[25:31]
+        # The second instruction overwrites rd and is the only reader of the first result.
+        chained = (
+            (next_instruction[7:11] == rd)
+            & (next_instruction[15:19] == rd)
+            & (rd != Bits(5)(0))
+        )
+        next_imm = sext(next_instruction[20:31], Bits(32))
+
+        is_li = (
+            (opcode == Bits(7)(Instructions.LUI.value.opcode))
+            & Instructions.ADDI.value.matches(next_opcode, next_funct3, next_funct7)
+            & chained
+        )
+        is_call = (
+            (opcode == Bits(7)(Instructions.AUIPC.value.opcode))
+            & Instructions.JALR.value.matches(next_opcode, next_funct3, next_funct7)
+            & chained
+        )
+
+        # bnez rd / beqz rd are bne / beq rd, x0.
+        is_beqz = Instructions.BEQ.value.matches(next_opcode, next_funct3, next_funct7)
+        is_bnez = Instructions.BNE.value.matches(next_opcode, next_funct3, next_funct7)
+        is_compare_branch = (
+            (
+                Instructions.SLT.value.matches(opcode, funct3, funct7)
+                | Instructions.SLTU.value.matches(opcode, funct3, funct7)
+            )
+            & (is_beqz | is_bnez)
+            & (next_instruction[15:19] == rd)
+            & (next_instruction[20:24] == Bits(5)(0))
+            & (rd != Bits(5)(0))
+        )
+
+        fused = is_li | is_call | is_compare_branch
+        constant = _add(args.imm, next_imm)
+        # A JAL at the jalr writes jalr PC + 4 and jumps to its PC + imm.
+        jal = Instructions.JAL.value.alu_info
+        fused_args = dataclasses.replace(
+            args,
+            imm=is_compare_branch.select(
+                BTypeInstruction.imm_fn(next_instruction),
+                fused.select(
+                    is_call.select(_add(constant, Bits(32)(-4 & 0xFFFFFFFF)), constant),
+                    args.imm,
+                ),
+            ),
+            is_jump=args.is_jump | is_call,
+            # The slt ALU operation and operands stay; the branch is taken on a nonzero
+            # result, or on zero for beqz.
+            is_branch=args.is_branch | is_compare_branch,
+            branch_flip=is_compare_branch.select(is_beqz, args.branch_flip),
+            alu_op=is_call.select(Bits(ALU_CODE_LEN)(jal.alu_op.value), args.alu_op),
+            operant1_from=is_call.select(
+                Bits(OPERANT_FROM_LEN)(jal.operant1_from.value), args.operant1_from
+            ),
+            operant2_from=is_call.select(
+                Bits(OPERANT_FROM_LEN)(jal.operant2_from.value), args.operant2_from
+            ),
+        )
+        return FusedInstruction(
+            args=fused_args,
+            PC=fused.select(_add(PC, Bits(32)(4)), PC),
+            fused=fused,
+            compare_branch=is_compare_branch,
+        )
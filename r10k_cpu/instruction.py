@@ -22,11 +22,45 @@ class OperantFrom(Enum):
     IMM = 2
     PC = 3
     LITERAL_FOUR = 4
+    CSR = 5  # counter CSR numbered by the low 12 bits of imm
 
 
 OPERANT_FROM_LEN = ceil(log2(len(OperantFrom)))
 
 
+class ImmFormat(Enum):
+    NONE = 0
+    I = 1
+    S = 2
+    B = 3
+    U = 4
+    J = 5
+
+
+IMM_FORMAT_LEN = ceil(log2(len(ImmFormat)))
+
+# Fields of the packed control word of the decode ROM, from bit 0 up.
+CONTROL_FIELDS = (
+    ("has_rd", 1),
+    ("has_rs1", 1),
+    ("has_rs2", 1),
+    ("is_alu", 1),
+    ("alu_op", ALU_CODE_LEN),
+    ("operant1_from", OPERANT_FROM_LEN),
+    ("operant2_from", OPERANT_FROM_LEN),
+    ("is_load", 1),
+    ("is_store", 1),
+    ("mem_op", MEMORY_OP_TYPE_LEN),
+    ("is_branch", 1),
+    ("branch_flip", 1),
+    ("is_terminator", 1),
+    ("is_jump", 1),
+    ("is_jalr", 1),
+    ("imm_format", IMM_FORMAT_LEN),
+)
+CONTROL_WORD_LEN = sum(width for _, width in CONTROL_FIELDS)
+
+
 @dataclass
 class InstructionArgs:
     has_rd: Value
@@ -95,6 +129,38 @@ class Instruction:
     is_jalr: bool
     is_alu: bool = True
 
+    IMM_FORMAT = ImmFormat.NONE
+
+    def control(self) -> dict[str, int]:
+        """The decoded fields as constants; `select_args` applies the same ones under a condition."""
+        return {
+            "has_rd": int(self.has_rd),
+            "has_rs1": int(self.has_rs1),
+            "has_rs2": int(self.has_rs2),
+            "is_alu": int(self.is_alu),
+            "alu_op": self.alu_info.alu_op.value,
+            "operant1_from": self.alu_info.operant1_from.value,
+            "operant2_from": self.alu_info.operant2_from.value,
+            "is_load": 0,
+            "is_store": 0,
+            "mem_op": 0,
+            "is_branch": 0,
+            "branch_flip": 0,
+            "is_terminator": 0,
+            "is_jump": int(self.is_jump),
+            "is_jalr": int(self.is_jalr),
+            "imm_format": self.IMM_FORMAT.value,
+        }
+
+    def control_word(self) -> int:
+        word, offset = 0, 0
+        control = self.control()
+        for name, width in CONTROL_FIELDS:
+            assert control[name] < (1 << width)
+            word |= control[name] << offset
+            offset += width
+        return word
+
     def matches(
             self, opcode: Value, funct3: Value, funct7: Value
         ) -> Value:
@@ -166,6 +232,8 @@ class ITypeInstruction(Instruction):
     is_terminator: bool
     is_jalr: bool
 
+    IMM_FORMAT = ImmFormat.I
+
     def __init__(
         self,
         opcode: int,
@@ -217,10 +285,20 @@ class ITypeInstruction(Instruction):
             args.is_jalr = cond.select(Bool(1), args.is_jalr)
         return args
 
+    def control(self) -> dict[str, int]:
+        control = super().control()
+        control["is_load"] = int(self.is_load)
+        if self.mem_op is not None:
+            control["mem_op"] = self.mem_op.value
+        control["is_terminator"] = int(self.is_terminator)
+        return control
+
 
 class STypeInstruction(Instruction):
     mem_op: MemoryOpType
 
+    IMM_FORMAT = ImmFormat.S
+
     def __init__(
         self,
         opcode: int,
@@ -258,9 +336,16 @@ class STypeInstruction(Instruction):
         )
         return args
 
+    def control(self) -> dict[str, int]:
+        control = super().control()
+        control["is_store"] = 1
+        control["mem_op"] = self.mem_op.value
+        return control
+
 
 class BTypeInstruction(Instruction):
     OPCODE = 0b1100011
+    IMM_FORMAT = ImmFormat.B
 
     branch_flip: bool
 
@@ -300,8 +385,16 @@ class BTypeInstruction(Instruction):
         args.is_branch = cond.select(Bool(1), args.is_branch)
         return args
 
+    def control(self) -> dict[str, int]:
+        control = super().control()
+        control["is_branch"] = 1
+        control["branch_flip"] = int(self.branch_flip)
+        return control
+
 
 class UTypeInstruction(Instruction):
+    IMM_FORMAT = ImmFormat.U
+
     def __init__(
         self,
         opcode: int,
@@ -327,6 +420,8 @@ class UTypeInstruction(Instruction):
 
 
 class JTypeInstruction(Instruction):
+    IMM_FORMAT = ImmFormat.J
+
     def __init__(self, opcode: int, alu_op: ALU_Code):
         def imm_fn(instruction: Value) -> Value:
             imm_19_12 = instruction[12:19]
@@ -519,6 +614,23 @@ class Instructions(Enum):
     EBREAK = ITypeInstruction(
         opcode=0b1110011, funct3=0x0, alu_op=ALU_Code.ADD, is_terminator=True
     )
+    # Only reads of the counter CSRs (rdcycle, rdinstret, ...); the rs1 bits are not written back.
+    CSRRS = ITypeInstruction(
+        opcode=0b1110011,
+        funct3=0x2,
+        alu_op=ALU_Code.OR,
+        operant1_from=OperantFrom.CSR,
+        operant2_from=OperantFrom.CSR,
+    )
+
+
+def _control_slice(control: Value, field: str) -> Value:
+    offset = 0
+    for name, width in CONTROL_FIELDS:
+        if name == field:
+            return control[offset : offset + width - 1]
+        offset += width
+    raise KeyError(field)
 
 
 def select_instruction_args(
@@ -527,6 +639,67 @@ def select_instruction_args(
         funct3: Value,
         funct7: Value,
     ) -> InstructionArgs:
+    """
+    Decode with a ROM of control words generated from `Instructions`.
+
+    Every instruction contributes one match term on {opcode, funct3, funct7}; the terms
+    form a one-hot vector and each control bit is the OR of the terms of the instructions
+    that set it. The immediate is picked once by the format field. An instruction matching
+    no entry decodes to all zeros, like `select_instruction_args_chain`.
+    """
+    entries: list[Instruction] = [instr.value for instr in Instructions]
+    # Each distinct comparison is built once and shared by the entries using it.
+    compares: dict[tuple[str, int], Value] = {}
+
+    def equals(name: str, value: Value, constant: int, bits: int) -> Value:
+        if (name, constant) not in compares:
+            compares[(name, constant)] = value == Bits(bits)(constant)
+        return compares[(name, constant)]
+
+    one_hot = None
+    for entry in entries:
+        term = equals("opcode", opcode, entry.opcode, 7)
+        if entry.funct3 is not None:
+            term = term & equals("funct3", funct3, entry.funct3, 3)
+        if entry.funct7 is not None:
+            term = term & equals("funct7", funct7, entry.funct7, 7)
+        # Entry i ends up at bit i.
+        one_hot = term if one_hot is None else term.concat(one_hot)
+
+    control_words = [entry.control_word() for entry in entries]
+    control = None
+    for bit in range(CONTROL_WORD_LEN):
+        mask = sum(1 << i for i, word in enumerate(control_words) if word >> bit & 1)
+        control_bit = (
+            (one_hot & Bits(len(entries))(mask)) != Bits(len(entries))(0) if mask else Bool(0)
+        )
+        control = control_bit if control is None else control_bit.concat(control)
+
+    imm_format = _control_slice(control, "imm_format")
+    imm = Bits(32)(0)
+    imm_by_format = {type(entry).IMM_FORMAT: entry.imm for entry in entries if entry.imm is not None}
+    for fmt, imm_fn in imm_by_format.items():
+        imm = (imm_format == Bits(IMM_FORMAT_LEN)(fmt.value)).select(imm_fn(instruction), imm)
+
+    fields = {
+        name: _control_slice(control, name)
+        for name, _ in CONTROL_FIELDS
+        if name != "imm_format"
+    }
+    return InstructionArgs(imm=imm, **fields)
+
+
+def select_instruction_args_chain(
+        instruction: Value,
+        opcode: Value,
+        funct3: Value,
+        funct7: Value,
+    ) -> InstructionArgs:
+    """
+    Decode with a chain of muxes per field and instruction, then per opcode.
+
+    The original decoder, kept as the reference `select_instruction_args` is tested against.
+    """
     instr_by_opcode = defaultdict(list)
     for instr in Instructions:
         instr_obj: Instruction = instr.value
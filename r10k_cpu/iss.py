@@ -0,0 +1,313 @@
+"""
+Instruction-set simulator of the RV32IM subset the core implements, used as a golden model.
+
+Decode metadata (fields, ALU operation, operand sources, memory operation, branch polarity)
+comes from the `Instructions` table the Decoder is built from, so the ISS accepts exactly
+the instructions the core decodes; only the immediates and the ALU operations are written
+out again here. `step` executes one instruction and returns its `CommitRecord`, the same
+(pc, rd, value) the core logs with `build_cpu(commit_log=True)`; `r10k_cpu.cosim` compares
+the two streams.
+"""
+
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+from r10k_cpu.common import ALU_Code, MemoryOpType
+from r10k_cpu.instruction import (
+    BTypeInstruction,
+    Instruction,
+    Instructions,
+    ITypeInstruction,
+    JTypeInstruction,
+    OperantFrom,
+    RTypeInstruction,
+    STypeInstruction,
+    UTypeInstruction,
+)
+from r10k_cpu.memory_image import MemoryImage
+
+MASK = 0xFFFFFFFF
+# sb x0, -1(x0), which the Decoder also treats as the end of the program.
+TERMINATOR_WORD = 0b1111111_00000_00000_000_11111_0100011
+
+
+def _signed(value: int) -> int:
+    return value - (1 << 32) if value & 0x80000000 else value
+
+
+def _sext(value: int, bits: int) -> int:
+    sign = 1 << (bits - 1)
+    return ((value ^ sign) - sign) & MASK
+
+
+def _i_imm(word: int) -> int:
+    return _sext(word >> 20, 12)
+
+
+def _s_imm(word: int) -> int:
+    return _sext(((word >> 25) << 5) | ((word >> 7) & 0x1F), 12)
+
+
+def _b_imm(word: int) -> int:
+    imm = (
+        ((word >> 31) & 1) << 12
+        | ((word >> 7) & 1) << 11
+        | ((word >> 25) & 0x3F) << 5
+        | ((word >> 8) & 0xF) << 1
+    )
+    return _sext(imm, 13)
+
+
+def _u_imm(word: int) -> int:
+    return word & 0xFFFFF000
+
+
+def _j_imm(word: int) -> int:
+    imm = (
+        ((word >> 31) & 1) << 20
+        | ((word >> 12) & 0xFF) << 12
+        | ((word >> 20) & 1) << 11
+        | ((word >> 21) & 0x3FF) << 1
+    )
+    return _sext(imm, 21)
+
+
+_IMMEDIATES: dict[type, Callable[[int], int]] = {
+    RTypeInstruction: lambda word: 0,
+    ITypeInstruction: _i_imm,
+    STypeInstruction: _s_imm,
+    BTypeInstruction: _b_imm,
+    UTypeInstruction: _u_imm,
+    JTypeInstruction: _j_imm,
+}
+
+
+def _div(a: int, b: int, unsigned: bool) -> int:
+    if b == 0:
+        return MASK
+    if unsigned:
+        return a // b
+    sa, sb = _signed(a), _signed(b)
+    quotient = abs(sa) // abs(sb)
+    # -2^31 / -1 wraps back to -2^31.
+    return (-quotient if (sa < 0) != (sb < 0) else quotient) & MASK
+
+
+def _rem(a: int, b: int, unsigned: bool) -> int:
+    if b == 0:
+        return a
+    if unsigned:
+        return a % b
+    sa, sb = _signed(a), _signed(b)
+    remainder = abs(sa) % abs(sb)
+    return (-remainder if sa < 0 else remainder) & MASK
+
+
+ALU_OPERATIONS: dict[ALU_Code, Callable[[int, int], int]] = {
+    ALU_Code.ADD: lambda a, b: (a + b) & MASK,
+    ALU_Code.SUB: lambda a, b: (a - b) & MASK,
+    ALU_Code.SLL: lambda a, b: (a << (b & 31)) & MASK,
+    ALU_Code.SLT: lambda a, b: int(_signed(a) < _signed(b)),
+    ALU_Code.SLTU: lambda a, b: int(a < b),
+    ALU_Code.XOR: lambda a, b: a ^ b,
+    ALU_Code.SRA: lambda a, b: (_signed(a) >> (b & 31)) & MASK,
+    ALU_Code.SRL: lambda a, b: a >> (b & 31),
+    ALU_Code.OR: lambda a, b: a | b,
+    ALU_Code.AND: lambda a, b: a & b,
+    ALU_Code.MUL: lambda a, b: (a * b) & MASK,
+    ALU_Code.MULH: lambda a, b: ((_signed(a) * _signed(b)) >> 32) & MASK,
+    ALU_Code.MULSU: lambda a, b: ((_signed(a) * b) >> 32) & MASK,
+    ALU_Code.MULU: lambda a, b: (a * b) >> 32,
+    ALU_Code.DIV: lambda a, b: _div(a, b, unsigned=False),
+    ALU_Code.DIVU: lambda a, b: _div(a, b, unsigned=True),
+    ALU_Code.REM: lambda a, b: _rem(a, b, unsigned=False),
+    ALU_Code.REMU: lambda a, b: _rem(a, b, unsigned=True),
+}
+
+# (bytes, sign-extend) per memory operation.
+MEMORY_ACCESS: dict[MemoryOpType, tuple[int, bool]] = {
+    MemoryOpType.BYTE: (1, True),
+    MemoryOpType.HALF: (2, True),
+    MemoryOpType.WORD: (4, False),
+    MemoryOpType.BYTE_U: (1, False),
+    MemoryOpType.HALF_U: (2, False),
+}
+
+
+@dataclass(frozen=True)
+class CommitRecord:
+    pc: int
+    # 0 when the instruction writes no register (or writes x0).
+    rd: int
+    value: int
+    # False for counter CSR reads, whose value depends on the timing of the core.
+    exact: bool = True
+
+
+@dataclass(frozen=True)
+class DecodedInstruction:
+    name: str
+    info: Instruction
+    rd: int
+    rs1: int
+    rs2: int
+    imm: int
+    is_terminator: bool
+
+
+def _decode_table() -> dict[tuple[int, int | None, int | None], tuple[str, Instruction]]:
+    table = {}
+    for instr in Instructions:
+        info: Instruction = instr.value
+        table[(info.opcode, info.funct3, info.funct7)] = (instr.name, info)
+    return table
+
+
+DECODE_TABLE = _decode_table()
+
+
+def decode(word: int) -> DecodedInstruction:
+    """Decode `word` with the `Instructions` table; ValueError if the core does not decode it."""
+    opcode, funct3, funct7 = word & 0x7F, (word >> 12) & 0x7, word >> 25
+    for key in ((opcode, funct3, funct7), (opcode, funct3, None), (opcode, None, None)):
+        if key in DECODE_TABLE:
+            name, info = DECODE_TABLE[key]
+            break
+    else:
+        raise ValueError(f"Illegal instruction {word:08x}")
+    return DecodedInstruction(
+        name=name,
+        info=info,
+        rd=(word >> 7) & 0x1F,
+        rs1=(word >> 15) & 0x1F,
+        rs2=(word >> 20) & 0x1F,
+        imm=_IMMEDIATES[type(info)](word),
+        is_terminator=getattr(info, "is_terminator", False) or word == TERMINATOR_WORD,
+    )
+
+
+class ISS:
+    """
+    Architectural state (pc, x0..x31, memory) of one program run.
+
+    Memory is `memory_depth` 32-bit words. A load or store outside it raises ValueError,
+    as the core's memory does not wrap it either. As in the core, instructions are
+    fetched from the initial image, so stores never change code.
+    """
+
+    def __init__(self, image: MemoryImage, memory_depth: int = 0x100000, pc: int = 0):
+        if memory_depth <= 0 or memory_depth & (memory_depth - 1):
+            raise ValueError("Memory depth must be a power of two.")
+        if image.end_word > memory_depth:
+            raise ValueError(f"The image needs {image.end_word} words, memory has {memory_depth}.")
+        self.memory = bytearray(4 * memory_depth)
+        for segment in image.segments:
+            start = 4 * segment.word_addr
+            data = struct.pack(f"<{len(segment.words)}I", *segment.words)
+            self.memory[start : start + len(data)] = data
+        self.code = bytes(self.memory)
+        self.address_mask = 4 * memory_depth - 1
+        self.regs = [0] * 32
+        self.pc = pc
+        self.retired = 0
+        self.halted = False
+        # Counter CSR reads; the core's values depend on its timing, so any value will do.
+        self.read_csr: Callable[[int], int] = lambda csr: self.retired & MASK
+        self._decoded: dict[int, DecodedInstruction] = {}
+
+    @classmethod
+    def from_file(cls, path: str, memory_depth: int = 0x100000) -> ISS:
+        return cls(MemoryImage.from_file(path), memory_depth=memory_depth)
+
+    def load(self, address: int, op: MemoryOpType) -> int:
+        size, signed = MEMORY_ACCESS[op]
+        self._check_address(address, size)
+        value = int.from_bytes(self.memory[address : address + size], "little")
+        return _sext(value, 8 * size) if signed else value
+
+    def store(self, address: int, value: int, op: MemoryOpType) -> None:
+        size, _ = MEMORY_ACCESS[op]
+        self._check_address(address, size)
+        self.memory[address : address + size] = (value & ((1 << (8 * size)) - 1)).to_bytes(
+            size, "little"
+        )
+
+    def _check_address(self, address: int, size: int) -> None:
+        if address + size > len(self.memory):
+            raise ValueError(
+                f"Access at {address:#010x} is outside the {len(self.memory) // 4}-word memory."
+            )
+
+    def fetch(self, pc: int) -> DecodedInstruction:
+        decoded = self._decoded.get(pc)
+        if decoded is None:
+            address = pc & self.address_mask
+            decoded = decode(int.from_bytes(self.code[address : address + 4], "little"))
+            self._decoded[pc] = decoded
+        return decoded
+
+    def _operand(self, source: OperantFrom, decoded: DecodedInstruction, pc: int) -> int:
+        if source == OperantFrom.RS1:
+            return self.regs[decoded.rs1]
+        if source == OperantFrom.RS2:
+            return self.regs[decoded.rs2]
+        if source == OperantFrom.IMM:
+            return decoded.imm
+        if source == OperantFrom.PC:
+            return pc
+        if source == OperantFrom.LITERAL_FOUR:
+            return 4
+        return self.read_csr(decoded.imm & 0xFFF)
+
+    def step(self) -> CommitRecord:
+        """Execute the instruction at pc and return what the core commits for it."""
+        if self.halted:
+            raise RuntimeError("The program has already finished.")
+        pc = self.pc
+        decoded = self.fetch(pc)
+        info = decoded.info
+        next_pc = (pc + 4) & MASK
+        value = None
+        exact = True
+
+        if decoded.is_terminator:
+            self.halted = True
+        elif info.is_alu:
+            alu = info.alu_info
+            a = self._operand(alu.operant1_from, decoded, pc)
+            b = self._operand(alu.operant2_from, decoded, pc)
+            result = ALU_OPERATIONS[alu.alu_op](a, b)
+            exact = alu.operant1_from != OperantFrom.CSR
+            if isinstance(info, BTypeInstruction):
+                # Taken on a nonzero result, or on zero for the flipped branches.
+                if (result != 0) != info.branch_flip:
+                    next_pc = (pc + decoded.imm) & MASK
+            elif info.is_jalr:
+                next_pc = result & ~1
+                value = (pc + 4) & MASK
+            else:
+                if info.is_jump:
+                    next_pc = (pc + decoded.imm) & MASK
+                value = result
+        elif getattr(info, "is_load", False):
+            address = (self.regs[decoded.rs1] + decoded.imm) & MASK
+            value = self.load(address, info.mem_op)
+        else:
+            address = (self.regs[decoded.rs1] + decoded.imm) & MASK
+            self.store(address, self.regs[decoded.rs2], info.mem_op)
+
+        rd = decoded.rd if info.has_rd and value is not None else 0
+        if rd:
+            self.regs[rd] = value
+        self.pc = next_pc
+        self.retired += 1
+        return CommitRecord(pc, rd, value if rd else 0, exact)
+
+    def run(self, max_instructions: int | None = None) -> Iterator[CommitRecord]:
+        """Commit records up to and including the terminator."""
+        while not self.halted and (max_instructions is None or self.retired < max_instructions):
+            yield self.step()
+
@@ -0,0 +1,146 @@
+"""
+Convert the `[Trace]` lines of a traced simulator run into a Konata pipeline trace.
+
+`build_cpu(trace=True)` logs fetch, decode, issue, complete and commit events keyed by
+Active List index (see `pipeline_trace.PipelineTrace`). Active List entries are reused, so
+each decoded instruction gets its own sequence number here, and an instruction still in
+the Active List when a mispredicted branch commits is shown as flushed.
+
+Stages: F (fetch), Dc (decode and rename), Ds (waiting in the ALU queue or LSQ),
+Is (executing), Cm (completed, waiting to commit).
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+TRACE_LINE_RE = re.compile(
+    r"Cycle\s+@(?P<cycle>[0-9]+(?:\.[0-9]+)?):.*\[Trace\]\s+(?P<kind>[FDICR])\s+(?P<fields>.*)$"
+)
+FIELD_RE = re.compile(r"(?P<name>\w+)=(?P<value>\w+)")
+
+
+@dataclass
+class TracedInstruction:
+    seq: int
+    rob: int
+    pc: int
+    word: int
+    fetch: Optional[int]
+    decode: int
+    issue: Optional[int] = None
+    unit: str = ""
+    complete: Optional[int] = None
+    retire: Optional[int] = None
+    flushed: bool = False
+
+    def stages(self) -> list[tuple[str, int]]:
+        """(stage, start cycle) in pipeline order, skipping stages the instruction never entered."""
+        stages = [("F", self.fetch), ("Dc", self.decode), ("Ds", self.decode + 1)]
+        stages += [("Is", self.issue), ("Cm", self.complete)]
+        result: list[tuple[str, int]] = []
+        for name, cycle in stages:
+            if cycle is None:
+                continue
+            if self.retire is not None and cycle > self.retire:
+                break
+            # Stages never start before the previous one, e.g. a store is issued after commit.
+            if result and cycle < result[-1][1]:
+                continue
+            result.append((name, cycle))
+        return result
+
+
+def parse_trace(lines: Iterable[str]) -> list[TracedInstruction]:
+    """Rebuild the instructions of a run from its trace lines, in decode order."""
+    instructions: list[TracedInstruction] = []
+    in_flight: dict[int, TracedInstruction] = {}
+    fetches: dict[int, int] = {}
+
+    for line in lines:
+        m = TRACE_LINE_RE.search(line)
+        if m is None:
+            continue
+        cycle = int(float(m.group("cycle")))
+        kind = m.group("kind")
+        fields = {f.group("name"): f.group("value") for f in FIELD_RE.finditer(m.group("fields"))}
+
+        if kind == "F":
+            # A PC is fetched again while the decoder is stalled; keep the first request.
+            fetches.setdefault(int(fields["pc"], 16), cycle)
+        elif kind == "D":
+            pc = int(fields["pc"], 16)
+            instruction = TracedInstruction(
+                seq=len(instructions),
+                rob=int(fields["rob"]),
+                pc=pc,
+                word=int(fields["instr"], 16),
+                fetch=fetches.pop(pc, None),
+                decode=cycle,
+            )
+            instructions.append(instruction)
+            in_flight[instruction.rob] = instruction
+        elif kind == "I":
+            instruction = in_flight.get(int(fields["rob"]))
+            if instruction is not None:
+                # A load that lost its memory bank is issued again; keep the last issue.
+                instruction.issue = cycle
+                instruction.unit = fields.get("unit", "")
+        elif kind == "C":
+            instruction = in_flight.get(int(fields["rob"]))
+            if instruction is not None and instruction.complete is None:
+                instruction.complete = cycle
+        elif kind == "R":
+            instruction = in_flight.pop(int(fields["rob"]), None)
+            if instruction is not None:
+                instruction.retire = cycle
+            if int(fields["flush"]):
+                for flushed in in_flight.values():
+                    flushed.retire = cycle
+                    flushed.flushed = True
+                in_flight.clear()
+                # Wrong-path fetches are dropped; the redirected fetch is logged this cycle.
+                fetches = {pc: c for pc, c in fetches.items() if c >= cycle}
+    return instructions
+
+
+def konata_lines(instructions: Iterable[TracedInstruction]) -> Iterator[str]:
+    """The Kanata 0004 log of `instructions`."""
+    events: list[tuple[int, int, int, str]] = []
+    retire_count = 0
+    for instruction in instructions:
+        seq = instruction.seq
+        stages = instruction.stages()
+        first_cycle = stages[0][1]
+        events.append((first_cycle, seq, 0, f"I\t{seq}\t{seq}\t0"))
+        events.append(
+            (first_cycle, seq, 1, f"L\t{seq}\t0\t{instruction.pc:08x}: {instruction.word:08x}")
+        )
+        hover = f"rob={instruction.rob}" + (f" unit={instruction.unit}" if instruction.unit else "")
+        events.append((first_cycle, seq, 2, f"L\t{seq}\t1\t{hover}"))
+        for order, (name, cycle) in enumerate(stages):
+            events.append((cycle, seq, 3 + order, f"S\t{seq}\t0\t{name}"))
+        if instruction.retire is not None:
+            if instruction.flushed:
+                line = f"R\t{seq}\t{seq}\t1"
+            else:
+                line = f"R\t{seq}\t{retire_count}\t0"
+                retire_count += 1
+            events.append((instruction.retire, seq, 10, line))
+
+    events.sort(key=lambda event: event[:3])
+    yield "Kanata\t0004"
+    current: Optional[int] = None
+    for cycle, _, _, line in events:
+        if current is None:
+            yield f"C=\t{cycle}"
+        elif cycle != current:
+            yield f"C\t{cycle - current}"
+        current = cycle
+        yield line
+
+
+def convert(lines: Iterable[str]) -> str:
+    return "".join(f"{line}\n" for line in konata_lines(parse_trace(lines)))
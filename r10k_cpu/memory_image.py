@@ -0,0 +1,304 @@
+"""
+Program image loader for the instruction and data SRAMs.
+
+A 32-bit hex file (one word per line, optional `@addr` byte-address markers) or an ELF32
+executable (its PT_LOAD segments) is parsed once into `array('I')` segments. The SRAM init files are then produced in bulk:
+
+- `<base>_bf<ext>`: the words with word-address markers (instruction SRAM)
+- `<base>_b0<ext>` .. `<base>_b3<ext>`: one byte lane each (ByteAddressableMemory)
+- `<base>_bank{k}_b{i}<ext>` instead of the lane files for a banked data memory
+
+Generated files are recorded in `<base>_image.json` together with the size, mtime and
+SHA-256 of the source, so preparing an unchanged program again does not rewrite anything.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+
+
+def _word_array(values=()) -> array:
+    words = array("I", values)
+    assert words.itemsize == 4, "array('I') must hold 32-bit words"
+    return words
+
+
+@dataclass(frozen=True)
+class Segment:
+    word_addr: int
+    words: array
+    # Whether the segment started at an `@addr` marker in the source file.
+    marked: bool
+
+
+class MemoryImage:
+    """A program image as a list of contiguous word segments."""
+
+    def __init__(self, segments: list[Segment], memory_end: int = 0):
+        self.segments = segments
+        # Word address after the image, including zero-initialized memory (ELF .bss).
+        self.end_word = max(
+            [memory_end] + [segment.word_addr + len(segment.words) for segment in segments]
+        )
+
+    @classmethod
+    def parse(cls, text: str) -> MemoryImage:
+        segments: list[Segment] = []
+        word_addr, marked, values = 0, False, []
+
+        def close():
+            segments.append(Segment(word_addr, _parse_words(values), marked))
+
+        for token in text.split():
+            if token.startswith("@"):
+                if values or marked:
+                    close()
+                addr = int(token[1:], 16)
+                assert addr % 4 == 0, "Address in init file must be 4-byte aligned"
+                word_addr, marked, values = addr // 4, True, []
+                continue
+            values.append(token)
+        if values or marked:
+            close()
+        return cls(segments)
+
+    @classmethod
+    def parse_elf(cls, data: bytes) -> MemoryImage:
+        """
+        Load the PT_LOAD segments of a little-endian RV32 ELF file.
+
+        Only the file-backed bytes are kept: the SRAMs start zeroed, so .bss and the
+        gaps between segments need no words, though `end_word` covers the .bss.
+        Segments are widened to whole words.
+        """
+        if data[:4] != b"\x7fELF":
+            raise ValueError("Not an ELF file.")
+        if data[4] != 1 or data[5] != 1:
+            raise ValueError("Only little-endian ELF32 files are supported.")
+        (e_machine,) = struct.unpack_from("<H", data, 0x12)
+        if e_machine != _EM_RISCV:
+            raise ValueError(f"ELF machine {e_machine:#x} is not RISC-V.")
+        (e_phoff,) = struct.unpack_from("<I", data, 0x1C)
+        e_phentsize, e_phnum = struct.unpack_from("<HH", data, 0x2A)
+
+        memory: dict[int, bytearray] = {}
+        memory_end = 0
+        for i in range(e_phnum):
+            p_type, p_offset, _, p_paddr, p_filesz, p_memsz = struct.unpack_from(
+                "<6I", data, e_phoff + i * e_phentsize
+            )
+            if p_type != _PT_LOAD:
+                continue
+            memory_end = max(memory_end, (p_paddr + p_memsz + 3) // 4)
+            if p_filesz == 0:
+                continue
+            start = p_paddr & ~3
+            chunk = bytearray(p_paddr - start) + data[p_offset : p_offset + p_filesz]
+            chunk += bytes(-len(chunk) % 4)
+            for word in range(len(chunk) // 4):
+                old = memory.setdefault(start // 4 + word, bytearray(4))
+                for j in range(4):
+                    old[j] |= chunk[4 * word + j]
+
+        segments: list[Segment] = []
+        run_start, run = 0, bytearray()
+        for word_addr in sorted(memory):
+            if run and word_addr != run_start + len(run) // 4:
+                segments.append(Segment(run_start, _bytes_to_words(run), True))
+                run = bytearray()
+            if not run:
+                run_start = word_addr
+            run += memory[word_addr]
+        if run:
+            segments.append(Segment(run_start, _bytes_to_words(run), True))
+        return cls(segments, memory_end)
+
+    @classmethod
+    def from_file(cls, path: str) -> MemoryImage:
+        if is_elf_file(path):
+            with open(path, "rb") as f:
+                return cls.parse_elf(f.read())
+        with open(path, "r") as f:
+            return cls.parse(f.read())
+
+    def hex_file(self) -> str:
+        """The image in the input format: words with byte-address markers."""
+        lines = []
+        for segment in self.segments:
+            if segment.marked:
+                lines.append(f"@{segment.word_addr * 4:x}")
+            if segment.words:
+                lines.append(_big_endian(segment.words).tobytes().hex("\n", 4))
+        return _join(lines)
+
+    def word_file(self) -> str:
+        """The words with word-address markers, e.g. for the instruction SRAM."""
+        lines = []
+        for segment in self.segments:
+            if segment.marked:
+                lines.append(f"@{segment.word_addr:x}")
+            if segment.words:
+                lines.append(_big_endian(segment.words).tobytes().hex("\n", 4))
+        return _join(lines)
+
+    def lane_files(self, num_banks: int = 1) -> list[str]:
+        """Byte lane files, 4 per bank and bank by bank; words are interleaved over the banks."""
+        if num_banks <= 0 or num_banks & (num_banks - 1):
+            raise ValueError("Number of memory banks must be a power of two.")
+
+        lanes: list[list[str]] = [[] for _ in range(4 * num_banks)]
+        # Next row each bank would write without an explicit segment marker.
+        next_row = [0] * num_banks
+        for segment in self.segments:
+            for bank in range(num_banks):
+                first = (bank - segment.word_addr) % num_banks
+                words = segment.words[first::num_banks]
+                row = (segment.word_addr + first) // num_banks
+                bank_lanes = lanes[4 * bank : 4 * bank + 4]
+                if num_banks == 1:
+                    # Keep every marker of the source, as the SRAM loader expects them.
+                    emit_marker = segment.marked
+                else:
+                    emit_marker = bool(words) and row != next_row[bank]
+                if emit_marker:
+                    for lane in bank_lanes:
+                        lane.append(f"@{row:x}")
+                if not words:
+                    continue
+                data = _little_endian(words).tobytes()
+                for i, lane in enumerate(bank_lanes):
+                    lane.append(data[i::4].hex("\n"))
+                next_row[bank] = row + len(words)
+        return [_join(lane) for lane in lanes]
+
+
+_PT_LOAD = 1
+_EM_RISCV = 0xF3
+
+
+def is_elf_file(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(4) == b"\x7fELF"
+
+
+def _bytes_to_words(data: bytes) -> array:
+    words = _word_array()
+    words.frombytes(bytes(data))
+    return _little_endian(words)
+
+
+def _parse_words(values: list[str]) -> array:
+    if all(len(v) == 8 for v in values):
+        # Fixed-width words convert in one pass as big-endian bytes.
+        words = _word_array()
+        words.frombytes(bytes.fromhex("".join(values)))
+        return _big_endian(words)
+    return _word_array(int(v, 16) for v in values)
+
+
+def _little_endian(words: array) -> array:
+    if sys.byteorder == "little":
+        return words
+    swapped = _word_array(words)
+    swapped.byteswap()
+    return swapped
+
+
+def _big_endian(words: array) -> array:
+    if sys.byteorder == "big":
+        return words
+    swapped = _word_array(words)
+    swapped.byteswap()
+    return swapped
+
+
+def _join(lines: list[str]) -> str:
+    return "".join(f"{line}\n" for line in lines)
+
+
+def image_file_paths(output_base: str, ext: str = ".hex", num_banks: int = 1) -> list[str]:
+    """The word file followed by the lane files that `prepare_image_files` writes."""
+    if num_banks == 1:
+        lanes = [f"{output_base}_b{i}{ext}" for i in range(4)]
+    else:
+        lanes = [f"{output_base}_bank{bank}_b{i}{ext}" for bank in range(num_banks) for i in range(4)]
+    return [f"{output_base}_bf{ext}"] + lanes
+
+
+def prepare_image_files(
+    init_file: str, num_banks: int = 1, output_base: str | None = None
+) -> list[str]:
+    """
+    Write the SRAM init files for `init_file` (hex or ELF) and return their paths.
+
+    Outputs go next to the source unless `output_base` (a path without extension) is given.
+    Nothing is written when the manifest shows the same source was already prepared there.
+    """
+    base, ext = os.path.splitext(init_file)
+    if ext == ".elf":
+        ext = ".hex"
+    if output_base is None:
+        output_base = base
+    paths = image_file_paths(output_base, ext, num_banks)
+    if not os.path.exists(init_file):
+        return paths
+
+    manifest_path = f"{output_base}_image.json"
+    source = os.path.abspath(init_file)
+    stat = os.stat(init_file)
+    manifest = _read_manifest(manifest_path)
+    up_to_date = (
+        manifest is not None
+        and manifest.get("num_banks") == num_banks
+        and manifest.get("outputs") == paths
+        and all(os.path.exists(path) for path in paths)
+    )
+    if (
+        up_to_date
+        and manifest["source"] == source
+        and manifest["size"] == stat.st_size
+        and manifest["mtime_ns"] == stat.st_mtime_ns
+    ):
+        return paths
+
+    with open(init_file, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha256(content).hexdigest()
+
+    # A touched or copied file with the same content keeps the existing outputs.
+    if not (up_to_date and manifest["sha256"] == digest):
+        if content[:4] == b"\x7fELF":
+            image = MemoryImage.parse_elf(content)
+        else:
+            image = MemoryImage.parse(content.decode("ascii"))
+        for path, data in zip(paths, [image.word_file()] + image.lane_files(num_banks)):
+            with open(path, "w") as f:
+                f.write(data)
+
+    with open(manifest_path, "w") as f:
+        json.dump(
+            {
+                "source": source,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": digest,
+                "num_banks": num_banks,
+                "outputs": paths,
+            },
+            f,
+        )
+    return paths
+
+
+def _read_manifest(path: str) -> dict | None:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
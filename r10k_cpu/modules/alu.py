@@ -1,4 +1,4 @@
-from typing import Callable
+from typing import Callable, Optional
 from algorithms import wallace_tree
 from algorithms.adder import combination_adder
 from algorithms.multiply_partial_products import radix4_partial_products
@@ -6,16 +6,24 @@ from assassyn.frontend import *
 from assassyn.ir.dtype import RecordValue
 from r10k_cpu import utils
 from r10k_cpu.common import (
-    ALUQueueEntryType,
     ALU_CODE_LEN,
+    DEFAULT_CORE_CONFIG,
     OPERANT_FROM_LEN,
     ALU_Code,
+    CoreConfig,
     OperantFrom,
     is_div_op,
     is_mul_op,
 )
 from r10k_cpu.downstreams.active_list import ActiveList
+from r10k_cpu.downstreams.load_bypass import (
+    LoadBypass,
+    operand_port_types,
+    pop_operand_ports,
+    read_register,
+)
 from r10k_cpu.downstreams.register_ready import RegisterReady
+from r10k_cpu.perf_counters import PerfCounters
 from r10k_cpu.utils import attach_context, leading_zero_count
 
 
@@ -28,11 +36,17 @@ class ALU(Module):
     It needs to modify active list (to notify the branch outcome),
     write results to the physical register file,
     and update register_ready accordingly.
+
+    With operand_ports the operands come with the instruction, read at issue through the
+    register bank ports, instead of from the register file.
     """
 
-    def __init__(self):
-        super().__init__(ports={"instr": Port(ALUQueueEntryType)})
+    def __init__(self, config: CoreConfig = DEFAULT_CORE_CONFIG, operand_ports: bool = False):
+        super().__init__(ports=operand_port_types(config.alu_queue_entry_type, operand_ports))
         self.name = "ALU"
+        self.config = config
+        self.entry_type = config.alu_queue_entry_type
+        self.operand_ports = operand_ports
 
     @module.combinational
     def build(
@@ -40,11 +54,20 @@ class ALU(Module):
         physical_register_file: Array,
         register_ready: RegisterReady,
         active_list: ActiveList,
+        load_bypass: Optional[LoadBypass] = None,
+        perf_counters: Optional[PerfCounters] = None,
     ):
-        instr: RecordValue = ALUQueueEntryType.view(self.pop_all_ports(False))
+        instr, rs1_issued, rs2_issued = pop_operand_ports(self, self.operand_ports)
+        instr: RecordValue = self.entry_type.view(instr)
+
+        rs1_value = read_register(physical_register_file, instr.rs1_physical, load_bypass, rs1_issued)
+        rs2_value = read_register(physical_register_file, instr.rs2_physical, load_bypass, rs2_issued)
+        csr_value = (
+            perf_counters.read_csr(instr.imm[0:11]) if perf_counters is not None else Bits(32)(0)
+        )
 
-        op_a = self._select_operand(instr, instr.operant1_from, physical_register_file)
-        op_b = self._select_operand(instr, instr.operant2_from, physical_register_file)
+        op_a = self._select_operand(instr, instr.operant1_from, rs1_value, rs2_value, csr_value)
+        op_b = self._select_operand(instr, instr.operant2_from, rs1_value, rs2_value, csr_value)
 
         op_select = self._decode_one_hot(instr.alu_op)
 
@@ -71,12 +94,12 @@ class ALU(Module):
         result_value = op_select.select1hot(*results)
         pc_plus_four = (instr.PC.bitcast(Int(32)) + Int(32)(4)).bitcast(Bits(32))
         jalr_target = (
-            physical_register_file[instr.rs1_physical].bitcast(Int(32))
+            rs1_value.bitcast(Int(32))
             + instr.imm.bitcast(Int(32))
         ).bitcast(Bits(32))
         rd_value = instr.is_jalr.select(pc_plus_four, result_value)
 
-        rd_zero = Bits(6)(0)
+        rd_zero = Bits(self.config.physical_idx_len)(0)
         rd_has_dest = instr.rd_physical != rd_zero
         write_valid = instr.valid & rd_has_dest
 
@@ -113,15 +136,20 @@ class ALU(Module):
 
     @staticmethod
     def _select_operand(
-        instr: RecordValue, selector: Value, physical_register_file: Array
+        instr: RecordValue,
+        selector: Value,
+        rs1_value: Value,
+        rs2_value: Value,
+        csr_value: Value,
     ) -> Value:
         literal_four = Bits(32)(4)
         sources = {
-            OperantFrom.RS1: physical_register_file[instr.rs1_physical],
-            OperantFrom.RS2: physical_register_file[instr.rs2_physical],
+            OperantFrom.RS1: rs1_value,
+            OperantFrom.RS2: rs2_value,
             OperantFrom.IMM: instr.imm,
             OperantFrom.PC: instr.PC,
             OperantFrom.LITERAL_FOUR: literal_four,
+            OperantFrom.CSR: csr_value,
         }
 
         value = Bits(32)(0)
@@ -137,10 +165,20 @@ class Multiply_ALU(Module):
 
     instr: Port
 
-    def __init__(self):
-        super().__init__(ports={"instr": Port(ALUQueueEntryType)})
+    def __init__(
+        self,
+        config: CoreConfig = DEFAULT_CORE_CONFIG,
+        divider_radix: int = 2,
+        operand_ports: bool = False,
+    ):
+        super().__init__(ports=operand_port_types(config.alu_queue_entry_type, operand_ports))
+        if divider_radix not in (2, 4):
+            raise ValueError("Only radix-2 and radix-4 dividers are supported.")
         self.name = "Multiply_ALU"
+        self.entry_type = config.alu_queue_entry_type
         self.div_busy = RegArray(Bits(1), 1)
+        self.divider_radix = divider_radix
+        self.operand_ports = operand_ports
 
     @module.combinational
     def build(
@@ -149,11 +187,13 @@ class Multiply_ALU(Module):
         register_ready: RegisterReady,
         active_list: ActiveList,
         flush: Array,
+        load_bypass: Optional[LoadBypass] = None,
     ):
-        instr: RecordValue = ALUQueueEntryType.view(self.pop_all_ports(False))
+        instr, rs1_issued, rs2_issued = pop_operand_ports(self, self.operand_ports)
+        instr: RecordValue = self.entry_type.view(instr)
 
-        op_a = physical_register_file[instr.rs1_physical]
-        op_b = physical_register_file[instr.rs2_physical]
+        op_a = read_register(physical_register_file, instr.rs1_physical, load_bypass, rs1_issued)
+        op_b = read_register(physical_register_file, instr.rs2_physical, load_bypass, rs2_issued)
 
         is_op_a_signed = (instr.alu_op == Bits(ALU_CODE_LEN)(ALU_Code.MULH.value)) | (
             instr.alu_op == Bits(ALU_CODE_LEN)(ALU_Code.MULSU.value)
@@ -171,6 +211,8 @@ class Multiply_ALU(Module):
         for i in range(len(products)):
             self.products[i][0] = products[i]
 
+        entry_type = self.entry_type
+
         def update_register(flush, instr, result):
             physical_register_file[instr.rd_physical] = result
 
@@ -191,7 +233,7 @@ class Multiply_ALU(Module):
             instr: Port
 
             def __init__(self):
-                super().__init__(ports={"instr": Port(ALUQueueEntryType)})
+                super().__init__(ports={"instr": Port(entry_type)})
 
             @module.combinational
             def build(self, products: list[Array], sum_level: Module, flush: Array):
@@ -211,7 +253,7 @@ class Multiply_ALU(Module):
             def __init__(self):
                 super().__init__(
                     ports={
-                        "instr": Port(ALUQueueEntryType),
+                        "instr": Port(entry_type),
                         "sum": Port(Bits(product_bits)),
                         "carry": Port(Bits(product_bits)),
                     }
@@ -232,7 +274,21 @@ class Multiply_ALU(Module):
 
                 update_register(flush, instr, result)
 
+        divider_radix = self.divider_radix
+
         class Divider(Module):
+            """
+            Non-restoring divider of the absolute values, one quotient bit per step.
+
+            Radix 2 does one step per cycle, starting after the leading zeros of the
+            dividend. Radix 4 does two per cycle and also skips the quotient bits that the
+            divisor's leading zeros make zero: with la and lb leading zeros, the quotient
+            has at most lb - la + 1 bits, so the dividend starts shifted by 31 - lb + la
+            (rounded down to even, and at most 32) with its top bits as partial remainder.
+            The two radix-4 steps are chained combinationally, which doubles the adder
+            depth of the cycle.
+            """
+
             instr: Port
             op_a: Port
             op_b: Port
@@ -246,7 +302,7 @@ class Multiply_ALU(Module):
             def __init__(self):
                 super().__init__(
                     ports={
-                        "instr": Port(ALUQueueEntryType),
+                        "instr": Port(entry_type),
                         "quotient_sign": Port(Bits(1)),
                         "remainder_sign": Port(Bits(1)),
                         "op_a": Port(Bits(32)),
@@ -277,11 +333,23 @@ class Multiply_ALU(Module):
                         op_a = self.op_a.pop()
                         op_b = self.op_b.pop()
                         lzc = leading_zero_count(op_a)
-                        pa = (op_a << lzc).zext(Bits(32 + 32 + 1))
+                        if divider_radix == 4:
+                            # A zero divisor is answered by Multiply_ALU and never gets here,
+                            # so lb <= 31; the floor at 0 only keeps the subtraction in range.
+                            upper = UInt(7)(31) + lzc.zext(UInt(7))
+                            lzb = leading_zero_count(op_b).zext(UInt(7))
+                            skip = (upper < lzb).select(UInt(7)(0), upper - lzb)
+                            skip = (skip > UInt(7)(32)).select(UInt(7)(32), skip)
+                            skip = skip.bitcast(Bits(7)) & Bits(7)(0b1111110)
+                            pa = op_a.zext(Bits(32 + 32 + 1)) << skip
+                            start = skip[0:5].bitcast(UInt(6))
+                        else:
+                            pa = (op_a << lzc).zext(Bits(32 + 32 + 1))
+                            start = lzc.zext(UInt(6))
 
                         self.PA[0] = pa
                         self.B[0] = op_b
-                        self.i[0] = lzc.zext(UInt(6))
+                        self.i[0] = start
 
                         self.async_called()
 
@@ -294,22 +362,24 @@ class Multiply_ALU(Module):
                             self.finish(flush, update_register, quotient, raw_remainder)
 
                         with Condition(~is_loop_end):
-                            is_negative = self.PA[0][64:64]
-                            new_P = self.PA[0][31:63]
-                            new_P = is_negative.select(
-                                combination_adder(new_P, self.B[0].zext(Bits(33)), 4)[
-                                    0
-                                ],
-                                combination_adder(
-                                    new_P, ~self.B[0].zext(Bits(33)), 4, Bits(1)(1)
-                                )[0],
-                            )
-                            new_A = self.PA[0][0:30].concat(~new_P[32:32])
-                            self.PA[0] = new_P.concat(new_A)
-                            self.i[0] = self.i[0] + UInt(6)(1)
+                            pa = self.PA[0]
+                            for _ in range(divider_radix // 2):
+                                pa = self.step(pa)
+                            self.PA[0] = pa
+                            self.i[0] = self.i[0] + UInt(6)(divider_radix // 2)
 
                             self.async_called()
 
+            def step(self, pa):
+                is_negative = pa[64:64]
+                new_P = pa[31:63]
+                new_P = is_negative.select(
+                    combination_adder(new_P, self.B[0].zext(Bits(33)), 4)[0],
+                    combination_adder(new_P, ~self.B[0].zext(Bits(33)), 4, Bits(1)(1))[0],
+                )
+                new_A = pa[0:30].concat(~new_P[32:32])
+                return new_P.concat(new_A)
+
             def finish(self, flush, update_register, quotient, raw_remainder):
                 instr = self.instr.pop()
                 quotient_sign = self.quotient_sign.pop()
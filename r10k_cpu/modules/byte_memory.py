@@ -5,80 +5,198 @@ This module wraps 4 separate 8-bit SRAMs to form a 32-bit word-addressable
 memory that supports byte, halfword, and word store operations.
 """
 
+import math
+from dataclasses import dataclass
 from typing import Sequence
 from assassyn.frontend import *
 from r10k_cpu.common import MemoryOpType, MEMORY_OP_TYPE_LEN
+from r10k_cpu.utils import Bool
+
+
+@dataclass(frozen=True)
+class MemoryRequest:
+    we: Value
+    re: Value
+    word_addr: Value  # Byte address bits [31:2]; the bits above the depth must be zero
+    wdata: Value
+    op_type: Value  # Memory operation type (BYTE, HALF, WORD)
+    byte_offset: Value  # Lower 2 bits of address for byte/halfword alignment
 
 
 class ByteAddressableMemory(Downstream):
     """
     A memory wrapper that uses 4 byte-wide SRAMs to support byte and halfword stores.
-    
+
     The memory is organized as:
     - byte0: bits [7:0] of each word
     - byte1: bits [15:8] of each word
     - byte2: bits [23:16] of each word
     - byte3: bits [31:24] of each word
-    
+
     For loads, all 4 bytes are always read and combined.
     For stores, byte write enables are computed based on op_type and byte offset.
-    
+
+    With num_banks > 1 the words are interleaved over the banks by the low bits of the
+    word address, and every bank has its own 4 byte SRAMs. Each request is a port; a bank
+    serves the lowest-numbered port addressing it, and `granted(port)` tells WriteBack
+    whether its request was served in the previous cycle.
+
+    Addresses beyond the depth are not wrapped into it. Stores only reach the memory once
+    committed, so a store out of range fails the simulation, except the terminator's
+    `sb x0, -1(x0)`. Loads may be on a mispredicted path; an out-of-range one is logged
+    and reads the wrapped address, which a correct path never uses.
+
     Note: The init_file should be the base path without extension. The class will
     look for _b0.hex, _b1.hex, _b2.hex, _b3.hex files for each byte lane, or
     use a preprocessing step to split the original hex file.
+    For banked memories, byte_files holds 4 lane files per bank, bank by bank
+    (see `prepare_byte_files(..., num_banks=...)`).
     """
-    
-    def __init__(self, depth: int, byte_files: Sequence[str | None]= [None, None, None, None]):
+
+    def __init__(
+        self,
+        depth: int,
+        byte_files: Sequence[str | None] | None = None,
+        num_banks: int = 1,
+    ):
         super().__init__()
+        if num_banks <= 0 or num_banks & (num_banks - 1):
+            raise ValueError("Number of memory banks must be a power of two.")
+        if depth % num_banks:
+            raise ValueError("Memory depth must be divisible by the number of banks.")
+        if byte_files is None:
+            byte_files = [None] * (4 * num_banks)
+        if len(byte_files) != 4 * num_banks:
+            raise ValueError(f"Expected {4 * num_banks} byte lane files, got {len(byte_files)}.")
+
         self.depth = depth
-        
-        # Create 4 byte-wide SRAMs
-        self.byte0 = SRAM(width=8, depth=depth, init_file=byte_files[0])
-        self.byte1 = SRAM(width=8, depth=depth, init_file=byte_files[1])
-        self.byte2 = SRAM(width=8, depth=depth, init_file=byte_files[2])
-        self.byte3 = SRAM(width=8, depth=depth, init_file=byte_files[3])
-        
-        self.byte0.name = "byte_mem_0"
-        self.byte1.name = "byte_mem_1"
-        self.byte2.name = "byte_mem_2"
-        self.byte3.name = "byte_mem_3"
-    
+        self.num_banks = num_banks
+        self.addr_bits = max(1, math.ceil(math.log2(depth)))
+        self.bank_bits = int(math.log2(num_banks))
+
+        # Create 4 byte-wide SRAMs per bank
+        self.banks: list[list[SRAM]] = []
+        for bank in range(num_banks):
+            lanes = []
+            for lane in range(4):
+                sram = SRAM(width=8, depth=depth // num_banks, init_file=byte_files[bank * 4 + lane])
+                sram.name = f"byte_mem_{lane}" if num_banks == 1 else f"byte_mem_{bank}_{lane}"
+                lanes.append(sram)
+            self.banks.append(lanes)
+
+        # Per-port bookkeeping for the cycle in which the SRAM output becomes visible.
+        self._read_bank = [RegArray(Bits(max(1, self.bank_bits)), 1) for _ in range(num_banks)]
+        self._granted = [RegArray(Bool, 1) for _ in range(num_banks)]
+
     @downstream.combinational
-    def build(
-        self,
-        we: Value,
-        re: Value,
-        word_addr: Value,
-        wdata: Value,
-        op_type: Value,  # Memory operation type (BYTE, HALF, WORD)
-        byte_offset: Value,  # Lower 2 bits of address for byte/halfword alignment
-    ):
+    def build(self, requests: Sequence[MemoryRequest]):
         """
         Build the byte-addressable memory.
         """
+        if not 1 <= len(requests) <= self.num_banks:
+            raise ValueError(f"Memory with {self.num_banks} bank(s) cannot serve {len(requests)} port(s).")
+
+        ports = []
+        for request in requests:
+            we = request.we.optional(Bool(0))
+            re = request.re.optional(Bool(0))
+            word_addr = request.word_addr.optional(Bits(30)(0))
+            self._check_range(we, re, word_addr)
+            ports.append(
+                (
+                    we,
+                    re,
+                    self._bank_of(word_addr),
+                    word_addr[self.bank_bits : self.addr_bits - 1],
+                    self._lane_writes(
+                        we,
+                        request.wdata.optional(Bits(32)(0)),
+                        request.op_type.optional(Bits(MEMORY_OP_TYPE_LEN)(0)),
+                        request.byte_offset.optional(Bits(2)(0)),
+                    ),
+                )
+            )
+
+        # A port is served unless a lower-numbered port addresses the same bank.
+        for idx, (we, re, bank, _, _) in enumerate(ports):
+            granted = we | re
+            for prev_we, prev_re, prev_bank, _, _ in ports[:idx]:
+                granted = granted & ~((prev_we | prev_re) & (prev_bank == bank))
+            self._granted[idx][0] = granted
+            self._read_bank[idx][0] = bank
+
+        for bank_idx, lanes in enumerate(self.banks):
+            served = Bool(0)
+            bank_we = [Bool(0)] * 4
+            bank_re = Bool(0)
+            bank_row = Bits(self.addr_bits - self.bank_bits)(0)
+            bank_wdata = [Bits(8)(0)] * 4
+            for we, re, bank, row, lane_writes in reversed(ports):
+                # Iterate from the highest port so that lower ports take priority.
+                hit = (we | re) & (bank == Bits(max(1, self.bank_bits))(bank_idx))
+                served = served | hit
+                bank_re = hit.select(re, bank_re)
+                bank_row = hit.select(row, bank_row)
+                for lane in range(4):
+                    lane_we, lane_wdata = lane_writes[lane]
+                    bank_we[lane] = hit.select(lane_we, bank_we[lane])
+                    bank_wdata[lane] = hit.select(lane_wdata, bank_wdata[lane])
+
+            for lane in range(4):
+                lanes[lane].build(
+                    we=served & bank_we[lane], re=served & bank_re, addr=bank_row, wdata=bank_wdata[lane]
+                )
+
+    def _check_range(self, we: Value, re: Value, word_addr: Value) -> None:
+        if self.addr_bits >= 30:
+            return
+        out_of_range = word_addr[self.addr_bits : 29] != Bits(30 - self.addr_bits)(0)
+        terminator = word_addr == Bits(30)(0x3FFFFFFF)
+        with Condition(we):
+            assume(~out_of_range | terminator)
+        with Condition(re & out_of_range):
+            log(f"[Memory] load outside the {self.depth}-word memory: word {{:08x}}", word_addr)
+
+    def granted(self, port: int) -> Value:
+        """Whether the request of `port` issued in the previous cycle was served."""
+        return self._granted[port][0]
+
+    def same_bank(self, word_addr_a: Value, word_addr_b: Value) -> Value:
+        return self._bank_of(word_addr_a) == self._bank_of(word_addr_b)
+
+    def _bank_of(self, word_addr: Value) -> Value:
+        if self.bank_bits == 0:
+            return Bits(1)(0)
+        return word_addr[0 : self.bank_bits - 1]
+
+    @staticmethod
+    def _lane_writes(
+        we: Value, wdata: Value, op_type: Value, byte_offset: Value
+    ) -> list[tuple[Value, Value]]:
+        """Per-lane (write enable, write data) pairs for a byte, halfword or word store."""
         is_byte_op = op_type == Bits(MEMORY_OP_TYPE_LEN)(MemoryOpType.BYTE.value)
         is_half_op = op_type == Bits(MEMORY_OP_TYPE_LEN)(MemoryOpType.HALF.value)
         is_word_op = op_type == Bits(MEMORY_OP_TYPE_LEN)(MemoryOpType.WORD.value)
-        
+
         offset_0 = byte_offset == Bits(2)(0)
         offset_1 = byte_offset == Bits(2)(1)
         offset_2 = byte_offset == Bits(2)(2)
         offset_3 = byte_offset == Bits(2)(3)
-        
+
         we0 = we & (is_word_op | (is_half_op & offset_0) | (is_byte_op & offset_0))
         we1 = we & (is_word_op | (is_half_op & offset_0) | (is_byte_op & offset_1))
         we2 = we & (is_word_op | (is_half_op & offset_2) | (is_byte_op & offset_2))
         we3 = we & (is_word_op | (is_half_op & offset_2) | (is_byte_op & offset_3))
-        
+
         wdata_byte = wdata[0:7]  # Low byte of rs2
         wdata_half_lo = wdata[0:7]  # Low byte of halfword
         wdata_half_hi = wdata[8:15]  # High byte of halfword
-        
+
         wdata_word_b0 = wdata[0:7]    # bits 0-7
         wdata_word_b1 = wdata[8:15]   # bits 8-15
         wdata_word_b2 = wdata[16:23]  # bits 16-23
         wdata_word_b3 = wdata[24:31]  # bits 24-31
-        
+
         wdata0 = is_word_op.select(
             wdata_word_b0,
             is_half_op.select(
@@ -86,7 +204,7 @@ class ByteAddressableMemory(Downstream):
                 offset_0.select(wdata_byte, Bits(8)(0))
             )
         )
-        
+
         wdata1 = is_word_op.select(
             wdata_word_b1,
             is_half_op.select(
@@ -94,7 +212,7 @@ class ByteAddressableMemory(Downstream):
                 offset_1.select(wdata_byte, Bits(8)(0))
             )
         )
-        
+
         wdata2 = is_word_op.select(
             wdata_word_b2,
             is_half_op.select(
@@ -102,7 +220,7 @@ class ByteAddressableMemory(Downstream):
                 offset_2.select(wdata_byte, Bits(8)(0))
             )
         )
-        
+
         wdata3 = is_word_op.select(
             wdata_word_b3,
             is_half_op.select(
@@ -110,20 +228,17 @@ class ByteAddressableMemory(Downstream):
                 offset_3.select(wdata_byte, Bits(8)(0))
             )
         )
-        
-        # Build each byte SRAM
-        self.byte0.build(we=we0, re=re, addr=word_addr, wdata=wdata0)
-        self.byte1.build(we=we1, re=re, addr=word_addr, wdata=wdata1)
-        self.byte2.build(we=we2, re=re, addr=word_addr, wdata=wdata2)
-        self.byte3.build(we=we3, re=re, addr=word_addr, wdata=wdata3)
-    
+
+        return [(we0, wdata0), (we1, wdata1), (we2, wdata2), (we3, wdata3)]
+
     @property
     def dout(self):
         """
         Return a list that when indexed, concatenates the 4 byte SRAM outputs.
         This creates the concat expression in the caller's module context.
+        Index i is the data read by port i in the previous cycle.
         """
-        return _ByteMemoryDout(self.byte0, self.byte1, self.byte2, self.byte3)
+        return _ByteMemoryDout(self.banks, self._read_bank)
 
 
 class _ByteMemoryDout:
@@ -131,19 +246,27 @@ class _ByteMemoryDout:
     Helper class that creates the concat expression when indexed.
     This ensures the concat is created in the calling module's context.
     """
-    def __init__(self, byte0, byte1, byte2, byte3):
-        self.byte0 = byte0
-        self.byte1 = byte1
-        self.byte2 = byte2
-        self.byte3 = byte3
-    
+    def __init__(self, banks, read_bank):
+        self.banks = banks
+        self.read_bank = read_bank
+
     def __getitem__(self, idx):
-        if idx != 0:
-            raise IndexError("ByteAddressableMemory only has one output")
+        if not 0 <= idx < len(self.banks):
+            raise IndexError(f"ByteAddressableMemory only has {len(self.banks)} output(s)")
         # Create the concatenation in the caller's context
-        b0 = self.byte0.dout[0]
-        b1 = self.byte1.dout[0]
-        b2 = self.byte2.dout[0]
-        b3 = self.byte3.dout[0]
-        # Concatenate: [b3(31:24), b2(23:16), b1(15:8), b0(7:0)]
-        return b3.concat(b2).concat(b1).concat(b0)
+        words = []
+        for lanes in self.banks:
+            b0 = lanes[0].dout[0]
+            b1 = lanes[1].dout[0]
+            b2 = lanes[2].dout[0]
+            b3 = lanes[3].dout[0]
+            # Concatenate: [b3(31:24), b2(23:16), b1(15:8), b0(7:0)]
+            words.append(b3.concat(b2).concat(b1).concat(b0))
+        if len(words) == 1:
+            return words[0]
+
+        bank = self.read_bank[idx][0]
+        word = words[0]
+        for bank_idx in range(1, len(words)):
+            word = (bank == Bits(bank.dtype.bits)(bank_idx)).select(words[bank_idx], word)
+        return word
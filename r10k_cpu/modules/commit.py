@@ -1,9 +1,13 @@
+from typing import Optional
 from assassyn.frontend import *
 from dataclass.circular_queue import CircularQueue
-from r10k_cpu.common import ROBEntryType
+from r10k_cpu.common import DEFAULT_CORE_CONFIG, CoreConfig
+from r10k_cpu.downstreams.early_release import EarlyRelease
 from r10k_cpu.downstreams.fetcher_impl import FetcherFlushEntry
 from r10k_cpu.downstreams.map_table import MapTable
 from r10k_cpu.downstreams.predictor import PredictFeedback
+from r10k_cpu.perf_counters import PerfCounters
+from r10k_cpu.pipeline_trace import PipelineTrace
 from r10k_cpu.utils import attach_context
 
 
@@ -13,9 +17,10 @@ class Commit(Module):
     flush: Array
     retire_count: Array
 
-    def __init__(self):
+    def __init__(self, config: CoreConfig = DEFAULT_CORE_CONFIG):
         super().__init__(ports={})
         self.name = "Commit"
+        self.config = config
         self.flush = RegArray(Bits(1), 1)
         self.retire_count = RegArray(Bits(64), 1)
 
@@ -25,10 +30,15 @@ class Commit(Module):
         active_list_queue: CircularQueue,
         map_table: MapTable,
         register_file: Array,
+        perf_counters: Optional[PerfCounters] = None,
+        trace: Optional[PipelineTrace] = None,
+        commit_log: bool = False,
+        early_release: Optional[EarlyRelease] = None,
     ):
         """Graduate instructions, free physical registers, and surface map-table updates."""
+        physical_zero = Bits(self.config.physical_idx_len)(0)
 
-        front_entry = ROBEntryType.view(active_list_queue.front())
+        front_entry = self.config.rob_entry_type.view(active_list_queue.front())
         retire_with_dest = front_entry.ready & front_entry.has_dest
 
         is_branch = front_entry.is_branch
@@ -41,10 +51,14 @@ class Commit(Module):
 
         self.flush[0] = flush_recover & has_active_entries
 
+        # Commit runs every cycle, so it also keeps the cycle counter.
+        if perf_counters is not None:
+            perf_counters.count("cycle", Bits(1)(1))
+
         wait_until(has_active_entries)
 
         # Downstream can sometimes get valid data before wait_until even if wait_until is triggered in varilator, which causes inconsistent behavior with simulator.
-        front_entry = ROBEntryType.view(active_list_queue.front())
+        front_entry = self.config.rob_entry_type.view(active_list_queue.front())
         retire_with_dest = attach_context(retire_with_dest)
         is_branch = attach_context(is_branch)
         mispredict = attach_context(mispredict)
@@ -53,7 +67,7 @@ class Commit(Module):
         commit_write_enable = retire_with_dest
         commit_logical = retire_with_dest.select(front_entry.dest_logical, Bits(5)(0))
         commit_physical = retire_with_dest.select(
-            front_entry.dest_new_physical, Bits(6)(0)
+            front_entry.dest_new_physical, physical_zero
         )
 
         flush_fetcher = front_entry.ready & (mispredict | front_entry.is_jump)
@@ -72,21 +86,46 @@ class Commit(Module):
 
         out_branch = front_entry.ready & is_branch
 
+        if perf_counters is not None:
+            perf_counters.count("mispredict", flush_recover)
+            perf_counters.count("flush", flush_fetcher)
+
         # Because physical register 0 is reserved, we do not push it back to the free list. And when the register is first allocated, its old_physical is 0.
         need_push_freelist = (
             front_entry.ready
             & front_entry.has_dest
-            & (front_entry.dest_old_physical != Bits(6)(0))
+            & (front_entry.dest_old_physical != physical_zero)
         )
+        if early_release is not None:
+            need_push_freelist = need_push_freelist & ~early_release.is_released(
+                active_list_queue.get_head()
+            )
         need_pop_activelist = front_entry.ready
 
+        # A fused op stands for two instructions.
+        retired = front_entry.is_fused.select(UInt(64)(2), UInt(64)(1))
         next_retire_count = (
-            self.retire_count[0].bitcast(UInt(64)) + UInt(64)(1)
+            self.retire_count[0].bitcast(UInt(64)) + retired
         ).bitcast(Bits(64))
         self.retire_count[0] = need_pop_activelist.select(
             next_retire_count, self.retire_count[0]
         )
 
+        if trace is not None:
+            with Condition(need_pop_activelist):
+                trace.commit(active_list_queue.get_head(), flush_recover)
+
+        if commit_log:
+            # The architectural result of every instruction, compared against r10k_cpu.iss.
+            with Condition(need_pop_activelist):
+                log(
+                    "Retire pc={:08x} rd={} value={:08x} n={}",
+                    front_entry.pc,
+                    commit_logical,
+                    commit_write_enable.select(register_file[commit_physical], Bits(32)(0)),
+                    front_entry.is_fused.select(Bits(2)(2), Bits(2)(1)),
+                )
+
         # with Condition(need_pop_activelist):
         #     log_parts = ["PC=0x{:08X}"]
         #     for i in range(32):
@@ -103,6 +142,9 @@ class Commit(Module):
         #     log(log_format, front_entry.pc, *new_regs)
 
         with Condition(need_pop_activelist & front_entry.is_terminator): 
+            # Before the terminator line, which stays the last line of the output.
+            if perf_counters is not None:
+                perf_counters.log_all()
             log(
                 "PC=0x{:08X}, x10=0x{:08X}, retire_count={}",
                 front_entry.pc,
@@ -121,9 +163,9 @@ class Commit(Module):
         return (
             need_push_freelist,
             need_pop_activelist,
-            front_entry.ready & front_entry.is_alu,  # ALU pop enable
+            front_entry.ready & front_entry.is_alu & ~front_entry.is_eliminated,  # ALU pop enable
             front_entry.ready & ~front_entry.is_alu,  # LSQ pop enable
-            retire_with_dest.select(front_entry.dest_old_physical, Bits(6)(0)),
+            retire_with_dest.select(front_entry.dest_old_physical, physical_zero),
             commit_write_enable,
             commit_logical,
             commit_physical,
@@ -131,4 +173,7 @@ class Commit(Module):
             fetcher_flush_entry,
             out_branch,
             predict_feedback,
+            # An eliminated move adds a mapping to the physical register it shares.
+            retire_with_dest & front_entry.is_eliminated,
+            front_entry.dest_new_physical,
         )
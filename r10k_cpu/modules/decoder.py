@@ -8,7 +8,11 @@ from r10k_cpu.downstreams.lsq import LSQPushEntry
 from r10k_cpu.downstreams.map_table import MapTable, MapTableWriteEntry
 from r10k_cpu.downstreams.register_ready import RegisterReady
 from r10k_cpu.downstreams.speculation_state import SpeculationState
+from r10k_cpu.fusion import MacroFusion
 from r10k_cpu.instruction import select_instruction_args
+from r10k_cpu.move_elimination import MoveElimination, rename_destination
+from r10k_cpu.perf_counters import PerfCounters
+from r10k_cpu.pipeline_trace import PipelineTrace
 from r10k_cpu.utils import Bool, attach_context
 
 
@@ -27,6 +31,11 @@ class Decoder(Module):
         active_list: ActiveList,
         speculation_state: SpeculationState,
         register_ready: RegisterReady,
+        perf_counters: PerfCounters | None = None,
+        trace: PipelineTrace | None = None,
+        next_instruction_reg: Array | None = None,
+        fusion: MacroFusion | None = None,
+        move_elimination: MoveElimination | None = None,
     ):
         instruction: Value = instruction_reg[0]
         rd = instruction[7:11]
@@ -42,34 +51,72 @@ class Decoder(Module):
         is_zero_register = logical_rd == Bits(5)(0)
         dest_valid = has_dest & ~is_zero_register
 
-        old_physical_rd = dest_valid.select(map_table.read_spec(logical_rd), Bits(6)(0))
-        physical_rd = dest_valid.select(free_list.free_reg(), free_list.zero_reg)
-        physical_rs1 = map_table.read_spec(rs1)
-        physical_rs2 = map_table.read_spec(rs2)
+        mapped_rd, physical_rs1, physical_rs2 = map_table.read_spec_many([logical_rd, rs1, rs2])
+        old_physical_rd = dest_valid.select(mapped_rd, Bits(map_table.physical_bits)(0))
+        renamed = rename_destination(
+            move_elimination,
+            instruction,
+            opcode,
+            funct3,
+            funct7,
+            args.is_alu,
+            dest_valid,
+            physical_rs1,
+            free_list.free_reg(),
+            free_list.zero_reg,
+        )
+        physical_rd = renamed.physical
+        eliminated = renamed.eliminated
+        # A new physical register is allocated, and written later by an execution unit.
+        allocates = renamed.allocates
 
         PC_valid = self.PC.valid()
         PC: Value = PC_valid.select(self.PC.peek(), Bits(32)(0))
         with Condition(PC_valid):
             self.PC.pop()
 
+        # PC of the instruction (or of the last of a fused pair) in the Active List.
+        commit_PC = PC
+        fused = Bits(1)(0)
+        compare_branch = Bits(1)(0)
+        if fusion is not None:
+            fused_instruction = fusion.apply(instruction, next_instruction_reg[0], args, PC)
+            args = fused_instruction.args
+            commit_PC = fused_instruction.PC
+            fused = fused_instruction.fused
+            compare_branch = fused_instruction.compare_branch
+
+        rob_full = active_list.is_full()
+        branch_blocked = args.is_branch & speculation_state.speculating[0]
+        no_free_register = allocates & ~free_list.valid()
+        if perf_counters is not None:
+            perf_counters.count("rob_full_stall", PC_valid & rob_full)
+            perf_counters.count("branch_stall", PC_valid & ~rob_full & branch_blocked)
+            perf_counters.count(
+                "free_list_stall", PC_valid & ~rob_full & ~branch_blocked & no_free_register
+            )
+
         # Only the first wait_until is effective in verilator, so we must stack multiple conditions here.
-        wait_until(
-            PC_valid
-            & ~active_list.is_full()
-            & (~args.is_branch | ~speculation_state.speculating[0])
-        )
+        wait_until(PC_valid & ~rob_full & ~branch_blocked & ~no_free_register)
 
         # Check for halt instruction (sb x0, -1(x0))
         args.is_terminator |= instruction == Bits(32)(0b1111111_00000_00000_000_11111_0100011)
 
-        with Condition(dest_valid):
-            register_ready.mark_not_ready(physical_rd, enable=dest_valid)
+        if perf_counters is not None:
+            perf_counters.count("compare_branch_fused", compare_branch)
+
+        if trace is not None:
+            # The Active List entry this instruction is pushed into this cycle.
+            trace.decode(PC, active_list.queue.get_tail(), instruction)
+
+        with Condition(allocates):
+            register_ready.mark_not_ready(physical_rd, enable=allocates)
 
         # Branch predictor is attached outside of the decoder
         active_list_entry_partial = functools.partial(
             InstructionPushEntry,
             valid=attach_context(Bool(1)),
-            pc=PC,
+            pc=commit_PC,
             dest_logical=logical_rd,
             dest_new_physical=physical_rd,
             dest_old_physical=old_physical_rd,
@@ -80,10 +127,12 @@ class Decoder(Module):
             is_jump=args.is_jump,
             is_jalr=args.is_jalr,
             is_terminator=args.is_terminator,
-            is_naturally_ready=args.is_store | args.is_terminator,
+            is_naturally_ready=args.is_store | args.is_terminator | eliminated,
+            is_fused=fused,
+            is_eliminated=eliminated,
         )
 
-        alu_push_enable = attach_context(args.is_alu)
+        alu_push_enable = attach_context(renamed.issues)
         alu_queue_entry = ALUQueuePushEntry(
             rs1_physical=physical_rs1,
             rs2_physical=physical_rs2,
@@ -92,7 +141,7 @@ class Decoder(Module):
             imm=args.imm,
             operant1_from=args.operant1_from,
             operant2_from=args.operant2_from,
-            PC=PC,
+            PC=commit_PC,
             is_branch=args.is_branch,
             is_jalr=args.is_jalr,
             branch_flip=args.branch_flip,
@@ -109,7 +158,7 @@ class Decoder(Module):
             op_type=args.mem_op,
         )
 
-        free_list_pop_enable = attach_context(dest_valid)
+        free_list_pop_enable = attach_context(allocates)
 
         map_table_entry = MapTableWriteEntry(
             enable=attach_context(dest_valid),
@@ -122,6 +171,7 @@ class Decoder(Module):
             stall=args.is_jump | args.is_terminator,
             is_branch=attach_context(args.is_branch),
             branch_offset=args.imm,
+            fused=fused,
         )
 
         return (
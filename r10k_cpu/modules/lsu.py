@@ -1,41 +1,63 @@
+from typing import Optional
 from assassyn.frontend import *
 from assassyn.ir.dtype import RecordValue
-from r10k_cpu.common import LSQEntryType
-from r10k_cpu.modules.byte_memory import ByteAddressableMemory
+from r10k_cpu.common import DEFAULT_CORE_CONFIG, CoreConfig
+from r10k_cpu.downstreams.load_bypass import (
+    LoadBypass,
+    operand_port_types,
+    pop_operand_ports,
+    read_register,
+)
+from r10k_cpu.modules.byte_memory import MemoryRequest
 
 class LSU(Module):
-    """Performs load and store operations."""
+    """
+    Performs load and store operations.
 
-    def __init__(self):
-        super().__init__(ports={"instr": Port(LSQEntryType)})
-        self.name = "LSU"
+    With operand_ports the base and store value come with the instruction, read at issue
+    through the register bank ports.
+    """
+
+    def __init__(
+        self, name: str = "LSU", config: CoreConfig = DEFAULT_CORE_CONFIG, operand_ports: bool = False
+    ):
+        super().__init__(ports=operand_port_types(config.lsq_entry_type, operand_ports))
+        self.name = name
+        self.entry_type = config.lsq_entry_type
+        self.operand_ports = operand_ports
     
     @module.combinational
-    def build(self, physical_register_file: Array, memory: ByteAddressableMemory, wb: Module):
-        instr: RecordValue = LSQEntryType.view(self.pop_all_ports(False))
+    def build(
+        self,
+        physical_register_file: Array,
+        wb: Module,
+        load_bypass: Optional[LoadBypass] = None,
+        forward_loads: bool = False,
+    ) -> MemoryRequest:
+        instr, rs1_issued, rs2_issued = pop_operand_ports(self, self.operand_ports)
+        instr: RecordValue = self.entry_type.view(instr)
         
         store_active = (instr.is_store & instr.valid).bitcast(Bits(1)) # store only when committed
         load_active = (instr.is_load & instr.valid).bitcast(Bits(1))
         need_update_active_list = load_active # store instruction always has ready bit.
 
         # Compute the full byte address
-        full_addr = (physical_register_file[instr.rs1_physical].bitcast(Int(32)) + instr.imm.bitcast(Int(32))).bitcast(Bits(32))
-        # Word address (bits [31:2])
-        word_addr = full_addr[2:31].zext(Bits(32))
+        full_addr = (read_register(physical_register_file, instr.rs1_physical, load_bypass, rs1_issued).bitcast(Int(32)) + instr.imm.bitcast(Int(32))).bitcast(Bits(32))
         # Byte offset within the word (bits [1:0])
         byte_offset = full_addr[0:1]
         
-        val = store_active.select(physical_register_file[instr.rs2_physical], Bits(32)(0))
+        store_value = physical_register_file[instr.rs2_physical] if rs2_issued is None else rs2_issued
+        val = store_active.select(store_value, Bits(32)(0))
 
-        # Use ByteAddressableMemory which handles byte/halfword/word stores
-        memory.build(
-            we=store_active,
-            re=load_active,
-            word_addr=word_addr[0:19],
-            wdata=val,
-            op_type=instr.op_type,
-            byte_offset=byte_offset,
-        )
+        if forward_loads:
+            assert load_bypass is not None
+            # Dependents of this load were woken when it was issued; they read the data from the bypass.
+            load_bypass.track(
+                enable=load_active,
+                dest_physical=instr.rd_physical,
+                op_type=instr.op_type,
+                byte_offset=byte_offset,
+            )
 
         wb_call = wb.async_called(
             is_load=load_active,
@@ -44,6 +66,7 @@ class LSU(Module):
             op_type=instr.op_type,
             dest_physical=instr.rd_physical,
             active_list_idx=instr.active_list_idx,
+            lsq_queue_idx=instr.lsq_queue_idx,
             addr=full_addr,
         )
         wb_call.bind.set_fifo_depth(
@@ -53,5 +76,17 @@ class LSU(Module):
             op_type=1,
             dest_physical=1,
             active_list_idx=1,
+            lsq_queue_idx=1,
             addr=1,
-        )
\ No newline at end of file
+        )
+
+        # ByteAddressableMemory handles byte/halfword/word stores; it is built once for all LSU ports
+        # and keeps as many word address bits as its depth needs.
+        return MemoryRequest(
+            we=store_active,
+            re=load_active,
+            word_addr=full_addr[2:31],  # Word address (bits [31:2])
+            wdata=val,
+            op_type=instr.op_type,
+            byte_offset=byte_offset,
+        )
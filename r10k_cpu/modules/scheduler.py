@@ -1,12 +1,15 @@
+from typing import Optional
 from assassyn.frontend import *
-from r10k_cpu.common import (
-    LSQEntryType,
-)
+from dataclass.circular_queue import CircularQueueSelection
+from dataclass.multiport_regarray import BankedRegArray
 from r10k_cpu.downstreams.alu_queue import ALUQueue
+from r10k_cpu.downstreams.load_bypass import LoadBypass
 from r10k_cpu.downstreams.lsq import LSQ, StoreBuffer
 from r10k_cpu.downstreams.register_ready import RegisterReady
-from r10k_cpu.downstreams.scheduler_down import SchedulerDownEntry
+from r10k_cpu.downstreams.scheduler_down import LoadPortEntry, SchedulerDownEntry
 from r10k_cpu.modules.alu import Multiply_ALU
+from r10k_cpu.perf_counters import PerfCounters
+from r10k_cpu.pipeline_trace import PipelineTrace
 
 
 class Scheduler(Module):
@@ -26,12 +29,47 @@ class Scheduler(Module):
         alu: Module,
         multiply_alu: Multiply_ALU,
         lsu: Module,
+        load_lsu: Optional[Module] = None,
+        speculative_load_wakeup: bool = False,
+        perf_counters: Optional[PerfCounters] = None,
+        trace: Optional[PipelineTrace] = None,
+        register_banks: Optional[BankedRegArray] = None,
+        load_bypass: Optional[LoadBypass] = None,
     ):
         """Select ready instructions from active list and LSQ for execution."""
         alu_selection = alu_queue.select_first_ready(register_ready=register_ready)
-        lsq_selection = lsq.select_first_ready(register_ready=register_ready)
 
-        buffer_instr = LSQEntryType.view(store_buffer.reg[0])
+        buffer_instr = store_buffer.entry_type.view(store_buffer.reg[0])
+
+        load_port_entry = None
+        if load_lsu is None:
+            lsq_selection = lsq.select_first_ready(
+                register_ready=register_ready, perf_counters=perf_counters
+            )
+        else:
+            lsq_selection, second_selection = lsq.select_two_ready(
+                register_ready=register_ready, perf_counters=perf_counters
+            )
+            # While a committed store drains through the first LSU, the oldest load takes the second one.
+            buffer_valid = buffer_instr.valid
+            load_port_entry = LoadPortEntry(
+                selection=CircularQueueSelection(
+                    data=lsq.entry_type.view(
+                        buffer_valid.select(
+                            lsq_selection.data.value(), second_selection.data.value()
+                        )
+                    ),
+                    index=buffer_valid.select(lsq_selection.index, second_selection.index),
+                    distance=buffer_valid.select(
+                        lsq_selection.distance, second_selection.distance
+                    ),
+                    valid=buffer_valid.select(lsq_selection.valid, second_selection.valid),
+                ),
+                lsu=load_lsu,
+                lsq=lsq,
+                perf_counters=perf_counters,
+                trace=trace,
+            )
 
         return (
             SchedulerDownEntry(
@@ -44,6 +82,15 @@ class Scheduler(Module):
                 lsu=lsu,
                 lsq_selection=lsq_selection,
                 lsq=lsq,
+                load_wakeup=register_ready if speculative_load_wakeup else None,
+                perf_counters=perf_counters,
+                trace=trace,
+                register_banks=register_banks,
+                load_port_selection=(
+                    load_port_entry.selection if load_port_entry is not None else None
+                ),
+                load_bypass=load_bypass,
             ),
             buffer_instr.valid,
+            load_port_entry,
         )
@@ -1,25 +1,38 @@
+from typing import Optional
 from assassyn.frontend import *
+from r10k_cpu.common import DEFAULT_CORE_CONFIG, CoreConfig
 from r10k_cpu.downstreams.active_list import ActiveList
+from r10k_cpu.downstreams.lsq import LSQ
 from r10k_cpu.downstreams.register_ready import RegisterReady
 from r10k_cpu.modules.byte_memory import ByteAddressableMemory
 
 class WriteBack(Module):
     """Handles the write-back stage of the LSU."""
 
-    def __init__(self):
+    def __init__(self, name: str = "WriteBack", config: CoreConfig = DEFAULT_CORE_CONFIG):
         super().__init__(ports={
             "is_load": Port(Bits(1)),
             "is_store": Port(Bits(1)),
             "need_update_active_list": Port(Bits(1)),
             "op_type": Port(Bits(3)),
-            "dest_physical": Port(Bits(6)),
-            "active_list_idx": Port(Bits(5)),
+            "dest_physical": Port(Bits(config.physical_idx_len)),
+            "active_list_idx": Port(Bits(config.active_list_idx_len)),
+            "lsq_queue_idx": Port(Bits(config.lsq_idx_len)),
             "addr": Port(Bits(32)),
         })
-        self.name = "WriteBack"
+        self.name = name
     
     @module.combinational
-    def build(self, active_list: ActiveList, register_ready: RegisterReady, physical_register_file: Array, memory: ByteAddressableMemory):
+    def build(
+        self,
+        active_list: ActiveList,
+        register_ready: RegisterReady,
+        physical_register_file: Array,
+        memory: ByteAddressableMemory,
+        port: int = 0,
+        lsq: Optional[LSQ] = None,
+        flush: Optional[Array] = None,
+    ):
         (
             is_load, 
             is_store, 
@@ -27,16 +40,28 @@ class WriteBack(Module):
             op_type, 
             dest_physical, 
             active_list_idx,
+            lsq_queue_idx,
             addr,
         ) = self.pop_all_ports(False)
 
-        with Condition(is_load):
-            memory_out = memory.dout[0]
+        # Port 0 always wins its bank; a later port may lose it to a concurrent access.
+        granted = memory.granted(port) if port > 0 else Bits(1)(1)
+
+        with Condition(is_load & granted):
+            memory_out = memory.dout[port]
             physical_register_file[dest_physical] = self.process_memory_data(op_type, memory_out, addr)
-            register_ready.mark_ready(dest_physical, enable=is_load)
+            register_ready.mark_ready(dest_physical, enable=is_load & granted)
         
-        with Condition(need_update_active_list):
+        with Condition(need_update_active_list & granted):
             active_list.set_ready(index=active_list_idx)
+
+        if lsq is not None:
+            # A load that lost its bank goes back to the LSQ and is selected again.
+            replay = is_load & ~granted
+            if flush is not None:
+                replay = replay & ~flush[0]
+            with Condition(replay):
+                lsq.mark_replay(index=lsq_queue_idx)
         
         # If we have already committed the store, we do not need to do anything here.
 
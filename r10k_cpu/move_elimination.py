@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from assassyn.frontend import *
+from r10k_cpu.instruction import Instructions
+
+
+@dataclass(frozen=True)
+class EliminatedRename:
+    # The instruction is resolved at rename; it never issues and is ready in the Active List.
+    eliminated: Value
+    # The physical register rd is mapped to instead of a free one.
+    physical: Value
+
+
+@dataclass(frozen=True)
+class RenamedDestination:
+    # The physical register rd is mapped to.
+    physical: Value
+    # Resolved at rename: naturally ready in the Active List and never issued.
+    eliminated: Value
+    # A free physical register is popped, to be written later by an execution unit.
+    allocates: Value
+    # Pushed into the ALU Queue; an eliminated op retires without issuing.
+    issues: Value
+
+
+class MoveElimination:
+    """
+    Resolves register moves and zero idioms in rename instead of in the ALU.
+
+    - `addi rd, rs, 0` (`mv`) maps rd to the physical register of rs
+    - `xor rd, rs, rs` and `sub rd, rs, rs` map rd to physical register 0, which always
+      holds zero; `li rd, 0` is `addi rd, x0, 0`, a move from x0, which maps to it too
+
+    Several logical registers then share one physical register. The Free List counts the
+    extra mappings (`FreeList(shared_registers=True)`) and only frees a physical register
+    when the last one is overwritten.
+    """
+
+    def apply(
+        self,
+        instruction: Value,
+        opcode: Value,
+        funct3: Value,
+        funct7: Value,
+        physical_rs1: Value,
+        zero_reg: Value,
+    ) -> EliminatedRename:
+        is_move = Instructions.ADDI.value.matches(opcode, funct3, funct7) & (
+            instruction[20:31] == Bits(12)(0)
+        )
+        is_zero = (
+            Instructions.XOR.value.matches(opcode, funct3, funct7)
+            | Instructions.SUB.value.matches(opcode, funct3, funct7)
+        ) & (instruction[15:19] == instruction[20:24])
+        return EliminatedRename(
+            eliminated=is_move | is_zero,
+            physical=is_zero.select(zero_reg, physical_rs1),
+        )
+
+
+def rename_destination(
+    move_elimination: MoveElimination | None,
+    instruction: Value,
+    opcode: Value,
+    funct3: Value,
+    funct7: Value,
+    is_alu: Value,
+    dest_valid: Value,
+    physical_rs1: Value,
+    free_reg: Value,
+    zero_reg: Value,
+) -> RenamedDestination:
+    """Pick rd's physical register in rename: a free one, or the shared one of a move."""
+    eliminated = Bits(1)(0)
+    physical = free_reg
+    if move_elimination is not None:
+        rename = move_elimination.apply(instruction, opcode, funct3, funct7, physical_rs1, zero_reg)
+        eliminated = rename.eliminated
+        physical = eliminated.select(rename.physical, free_reg)
+    return RenamedDestination(
+        physical=dest_valid.select(physical, zero_reg),
+        eliminated=eliminated,
+        allocates=dest_valid & ~eliminated,
+        issues=is_alu & ~eliminated,
+    )
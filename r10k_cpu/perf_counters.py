@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from assassyn.frontend import *
+
+
+# User-level counter CSRs; the upper halves are at +0x80 (cycleh, instreth, hpmcounter3h, ...).
+CSR_CYCLE = 0xC00
+CSR_TIME = 0xC01
+CSR_INSTRET = 0xC02
+CSR_HPMCOUNTER3 = 0xC03
+CSR_HIGH_OFFSET = 0x80
+
+# Events counted per cycle, in hpmcounter order starting at hpmcounter3.
+PERF_EVENTS = (
+    "rob_full_stall",  # decoder holds an instruction because the Active List is full
+    "branch_stall",  # decoder holds a branch while another one is unresolved
+    "jump_stall",  # fetch waits for a jump (or the terminator) to commit
+    "alu_issue",  # an instruction is issued to the ALU or multiply/divide unit
+    "lsq_issue",  # the first LSU gets a load or a committed store
+    "load_port1_issue",  # the second LSU gets a load
+    "mispredict",  # a mispredicted branch commits
+    "flush",  # the pipeline is redirected at commit (mispredict or jump)
+    "load_blocked_by_store",  # a ready load waits behind an older store
+    "divider_busy",
+    "store_buffer_full",
+    "compare_branch_fused",  # an slt/sltu and a bnez/beqz are decoded as one branch
+    "free_list_stall",  # decoder holds an instruction because no physical register is free
+    "early_release",  # a physical register is freed before its overwriting instruction commits
+    "bank_conflict",  # an issue waits for a read port of a register file bank
+)
+
+
+class PerfCounters:
+    """
+    64-bit event counters, logged at finish and readable with `csrr` (rdcycle, rdinstret, ...).
+
+    Every counter has exactly one writer: the module or downstream that observes the event
+    calls `count` from its own build. `instret` is Commit's retire counter.
+    """
+
+    def __init__(self, instret: Array):
+        self.counters: dict[str, Array] = {"cycle": RegArray(Bits(64), 1), "instret": instret}
+        for event in PERF_EVENTS:
+            self.counters[event] = RegArray(Bits(64), 1)
+
+    def count(self, event: str, enable: Value) -> None:
+        counter = self.counters[event]
+        with Condition(enable):
+            counter[0] = (counter[0].bitcast(UInt(64)) + UInt(64)(1)).bitcast(Bits(64))
+
+    def csr_addresses(self) -> dict[int, str]:
+        addresses = {CSR_CYCLE: "cycle", CSR_TIME: "cycle", CSR_INSTRET: "instret"}
+        for i, event in enumerate(PERF_EVENTS):
+            addresses[CSR_HPMCOUNTER3 + i] = event
+        return addresses
+
+    def read_csr(self, csr: Value) -> Value:
+        """The 32-bit CSR `csr` (12 bits); unknown CSRs read as zero."""
+        value = Bits(32)(0)
+        for address, name in self.csr_addresses().items():
+            counter = self.counters[name][0]
+            value = (csr == Bits(12)(address)).select(counter[0:31], value)
+            value = (csr == Bits(12)(address + CSR_HIGH_OFFSET)).select(counter[32:63], value)
+        return value
+
+    def log_all(self) -> None:
+        names = list(self.counters)
+        log(
+            "[Perf] " + ", ".join(f"{name}={{}}" for name in names),
+            *[self.counters[name][0].bitcast(UInt(64)) for name in names],
+        )
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from assassyn.frontend import *
+
+
+class PipelineTrace:
+    """
+    Logs the pipeline events of every instruction as `[Trace]` lines.
+
+    Instructions are identified by their Active List index; `r10k_cpu.konata` turns the lines
+    into a Konata trace with one sequence number per dispatched instruction. Built only
+    with `build_cpu(trace=True)`, so an untraced design has none of these logs. Each method
+    logs unconditionally; callers invoke it under the Condition of the event.
+    """
+
+    PREFIX = "[Trace]"
+
+    def fetch(self, pc: Value) -> None:
+        log(f"{self.PREFIX} F pc={{:08x}}", pc)
+
+    def decode(self, pc: Value, rob_idx: Value, instruction: Value) -> None:
+        log(f"{self.PREFIX} D pc={{:08x}} rob={{}} instr={{:08x}}", pc, rob_idx, instruction)
+
+    def issue(self, rob_idx: Value, unit: str) -> None:
+        log(f"{self.PREFIX} I rob={{}} unit={unit}", rob_idx)
+
+    def complete(self, rob_idx: Value) -> None:
+        log(f"{self.PREFIX} C rob={{}}", rob_idx)
+
+    def commit(self, rob_idx: Value, flush: Value) -> None:
+        log(f"{self.PREFIX} R rob={{}} flush={{}}", rob_idx, flush)
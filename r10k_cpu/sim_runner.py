@@ -0,0 +1,246 @@
+"""
+Run one built simulator binary on many programs at once.
+
+The binary is built with init files relative to its working directory (`work_image_files`
+with `resource_base="."`), so every program gets a directory of its own with its own lane
+files and the runs can go in parallel on a process pool.
+
+The working directory is therefore the run-time image selector: `run_program` (and
+`scripts/run_program.py`) take it as an argument, from $R10K_IMAGE_DIR, or make a fresh one
+that is removed again when the run ends.
+
+`stream_program` runs the same way but parses the output while it is produced, keeping
+only the Commit aggregates and the last lines, so a run logging every commit does not
+have to fit in memory, and it can stop the simulator as soon as a failure is printed.
+"""
+
+from __future__ import annotations
+
+import collections
+import contextlib
+import os
+import re
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, TypeVar
+
+from r10k_cpu.memory_image import image_file_paths, prepare_image_files
+
+WORK_BASE = "exe"
+# The init files are looked up relative to the simulator's working directory.
+RESOURCE_BASE = "."
+# Work directory used by run_program when none is given.
+IMAGE_DIR_ENV = "R10K_IMAGE_DIR"
+
+COMMIT_LINE_RE = re.compile(
+    r"Cycle\s+@(?P<cycle>[0-9]+(?:\.[0-9]+)?):\s+\[Commit\]\s+(?P<message>.*)$"
+)
+TERMINATOR_RE = re.compile(
+    r"^PC=0x(?P<pc>[0-9A-Fa-f]{8}),\s+x10=(?P<x10>0x[0-9A-Fa-f]+),\s+retire_count=(?P<retire>[0-9]+)"
+)
+PERF_LINE_RE = re.compile(r"\[Perf\]\s+(?P<counters>.*)$")
+PERF_COUNTER_RE = re.compile(r"(?P<name>\w+)=(?P<value>[0-9]+)")
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class ProgramRun:
+    name: str
+    stdout: str | None
+    error: str
+
+
+@dataclass(frozen=True)
+class Terminator:
+    cycles: int
+    pc: int
+    x10: int
+    retired: int
+
+
+@dataclass(frozen=True)
+class StreamedRun:
+    name: str
+    # None if the simulator failed to run, exited with an error or was aborted.
+    terminator: Terminator | None
+    perf: dict[str, int]
+    lines: int
+    commit_lines: int
+    last_cycle: int | None
+    tail: list[str]
+    aborted: bool = False
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return not self.error and not self.aborted
+
+
+@dataclass
+class CommitLogParser:
+    """
+    Incremental parser of simulator output, fed one line at a time.
+
+    Only `[Commit]` lines are matched (the terminator and `[Perf]` lines are logged by
+    Commit); everything else is counted and kept in the tail. `abort_on` is a pattern whose
+    first match makes `feed` return False.
+    """
+
+    tail_lines: int = 32
+    abort_on: re.Pattern[str] | str | None = None
+    lines: int = 0
+    commit_lines: int = 0
+    last_cycle: int | None = None
+    terminator: Terminator | None = None
+    perf: dict[str, int] = field(default_factory=dict)
+    failure: str | None = None
+    tail: collections.deque[str] = field(init=False)
+
+    def __post_init__(self):
+        self.tail = collections.deque(maxlen=self.tail_lines)
+        if isinstance(self.abort_on, str):
+            self.abort_on = re.compile(self.abort_on)
+
+    def feed(self, line: str) -> bool:
+        line = line.rstrip("\n")
+        self.lines += 1
+        self.tail.append(line)
+        if self.abort_on is not None and self.abort_on.search(line):
+            self.failure = line
+            return False
+        if "[Commit]" not in line:
+            return True
+        m = COMMIT_LINE_RE.search(line)
+        if m is None:
+            return True
+        self.commit_lines += 1
+        cycles = int(round(float(m.group("cycle"))))
+        self.last_cycle = cycles
+        message = m.group("message")
+        terminator = TERMINATOR_RE.match(message)
+        if terminator is not None:
+            self.terminator = Terminator(
+                cycles=cycles,
+                pc=int(terminator.group("pc"), 16),
+                x10=int(terminator.group("x10"), 16),
+                retired=int(terminator.group("retire")),
+            )
+        elif message.startswith("[Perf]"):
+            counters = PERF_COUNTER_RE.finditer(PERF_LINE_RE.search(message).group("counters"))
+            self.perf = {c.group("name"): int(c.group("value")) for c in counters}
+        return True
+
+    def result(self, name: str = "", error: str = "") -> StreamedRun:
+        if self.failure is not None and not error:
+            error = f"aborted on: {self.failure}"
+        return StreamedRun(
+            name=name,
+            terminator=self.terminator,
+            perf=self.perf,
+            lines=self.lines,
+            commit_lines=self.commit_lines,
+            last_cycle=self.last_cycle,
+            tail=list(self.tail),
+            aborted=self.failure is not None,
+            error=error,
+        )
+
+
+def work_image_files(num_banks: int = 1) -> list[str]:
+    """The `sram_files` for `build_cpu` that `run_program` provides in each work directory."""
+    return image_file_paths(WORK_BASE, num_banks=num_banks)
+
+
+def run_program(
+    binary: str, init_file: str, work_dir: str | None = None, num_banks: int = 1, name: str = ""
+) -> ProgramRun:
+    """
+    Prepare `init_file` (hex or ELF) in `work_dir` and run the simulator there.
+
+    Without `work_dir`, $R10K_IMAGE_DIR is used, or else a temporary directory that is
+    removed after the run.
+    """
+    with _prepared_work_dir(init_file, work_dir, num_banks) as work_dir:
+        try:
+            proc = subprocess.run(
+                [os.path.abspath(binary)], cwd=work_dir, capture_output=True, text=True, check=False
+            )
+        except OSError as e:
+            return ProgramRun(name, None, str(e))
+    if proc.returncode != 0:
+        return ProgramRun(name, None, proc.stderr.strip() or proc.stdout.strip())
+    return ProgramRun(name, proc.stdout, "")
+
+
+def stream_program(
+    binary: str,
+    init_file: str,
+    work_dir: str | None = None,
+    num_banks: int = 1,
+    name: str = "",
+    abort_on: str | None = None,
+    tail_lines: int = 32,
+    parser: CommitLogParser | None = None,
+) -> StreamedRun:
+    """
+    Like `run_program`, but parse the output through a pipe with a `CommitLogParser`.
+
+    The simulator is killed on the first line matching `abort_on`, or as soon as the
+    `feed` of a given `parser` (which then replaces abort_on and tail_lines) returns False.
+    """
+    with _prepared_work_dir(init_file, work_dir, num_banks) as work_dir:
+        if parser is None:
+            parser = CommitLogParser(tail_lines=tail_lines, abort_on=abort_on)
+        # stderr goes to a file so that a chatty simulator cannot block on a full pipe.
+        with tempfile.TemporaryFile(mode="w+", encoding="utf-8", errors="replace") as stderr:
+            try:
+                proc = subprocess.Popen(
+                    [os.path.abspath(binary)],
+                    cwd=work_dir,
+                    stdout=subprocess.PIPE,
+                    stderr=stderr,
+                    text=True,
+                    errors="replace",
+                )
+            except OSError as e:
+                return parser.result(name, str(e))
+            with proc:
+                for line in proc.stdout:
+                    if not parser.feed(line):
+                        proc.kill()
+                        break
+                proc.stdout.close()
+                returncode = proc.wait()
+            if parser.failure is None and returncode != 0:
+                stderr.seek(0)
+                error = stderr.read().strip() or "\n".join(parser.tail).strip()
+                return parser.result(name, error or f"exit code {returncode}")
+        return parser.result(name)
+
+
+@contextlib.contextmanager
+def _prepared_work_dir(init_file: str, work_dir: str | None, num_banks: int):
+    """The work directory with the image of `init_file`; a temporary one is removed on exit."""
+    if work_dir is None:
+        work_dir = os.environ.get(IMAGE_DIR_ENV) or None
+    with contextlib.ExitStack() as stack:
+        if work_dir is None:
+            work_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix="r10k-"))
+        os.makedirs(work_dir, exist_ok=True)
+        prepare_image_files(init_file, num_banks=num_banks, output_base=os.path.join(work_dir, WORK_BASE))
+        yield work_dir
+
+
+def map_programs(
+    func: Callable[..., T], jobs: int | None, argument_lists: Iterable[tuple]
+) -> list[T]:
+    """Apply `func` to each argument tuple, on `jobs` processes; results keep the input order."""
+    argument_lists = list(argument_lists)
+    if jobs == 1 or len(argument_lists) <= 1:
+        return [func(*arguments) for arguments in argument_lists]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(func, *arguments) for arguments in argument_lists]
+        return [future.result() for future in futures]
@@ -52,6 +52,16 @@ def is_between(value: Value, lower: Value, upper: Value) -> Value:
     )
 
 
+def resize(value: Value, bits: int) -> Value:
+    """Zero-extend or truncate an unsigned index to `bits` bits."""
+    value_bits: int = value.dtype.bits  # pyright: ignore[reportAttributeAccessIssue]
+    if value_bits == bits:
+        return value
+    if value_bits < bits:
+        return value.zext(Bits(bits))
+    return value[0 : bits - 1]
+
+
 def neg(value: Value) -> Value:
     dtype: DType = value.dtype  # pyright: ignore[reportAssignmentType]
     bits: int = dtype.bits
@@ -83,7 +93,9 @@ def leading_zero_count(value: Value, *, trailing: bool = False) -> Value:
     return recursive(0, bits)
 
 
-def prepare_byte_files(init_file: str) -> list[str]:
+def prepare_byte_files(
+    init_file: str, num_banks: int = 1, output_base: str | None = None
+) -> list[str]:
     """
     Split a 32-bit hex file into 4 byte hex files.
 
@@ -93,54 +105,39 @@ def prepare_byte_files(init_file: str) -> list[str]:
     - file_b1.hex (bits 15:8)
     - file_b2.hex (bits 23:16)
     - file_b3.hex (bits 31:24)
+
+    With num_banks > 1 the byte files are split further for a word-interleaved
+    ByteAddressableMemory: file_bank{k}_b{i}.hex holds the words whose word address
+    is k modulo num_banks, at row word_address // num_banks.
+    output_base ("dir/exe") writes the files elsewhere instead of next to init_file.
+    Unchanged inputs are not processed again (see `r10k_cpu.memory_image`).
     """
-    import os
-
-    base, ext = os.path.splitext(init_file)
-    offset_trunc_file = f"{base}_bf{ext}"
-    byte_files = [f"{base}_b{i}{ext}" for i in range(4)]
-
-    # Check if we need to regenerate
-    if os.path.exists(init_file):
-        try:
-            with open(init_file, "r") as f:
-                lines = f.readlines()
-
-            trunc_data = []
-            byte_data = [[], [], [], []]
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                if line.startswith("@"):
-                    # Add segment marker to all byte files
-                    addr = int(line[1:], 16)
-                    assert addr % 4 == 0, "Address in init file must be 4-byte aligned"
-                    trunc_addr = addr // 4
-                    line = f"@{trunc_addr:x}"
-                    trunc_data.append(line)
-                    for i in range(4):
-                        byte_data[i].append(line)
-                    continue
-                # Parse 32-bit hex value
-                word = int(line, 16)
-                byte_data[0].append(f"{(word >> 0) & 0xFF:02x}")
-                byte_data[1].append(f"{(word >> 8) & 0xFF:02x}")
-                byte_data[2].append(f"{(word >> 16) & 0xFF:02x}")
-                byte_data[3].append(f"{(word >> 24) & 0xFF:02x}")
-                trunc_data.append(f"{word:08x}")
-
-            for i in range(4):
-                with open(byte_files[i], "w") as f:
-                    f.write("\n".join(byte_data[i]))
-                    if byte_data[i]:
-                        f.write("\n")
-            with open(offset_trunc_file, "w") as f:
-                f.write("\n".join(trunc_data))
-                if trunc_data:
-                    f.write("\n")
-        except Exception as e:
-            print(f"Error processing init file {init_file}: {e}")
-            raise
-
-    return [offset_trunc_file] + byte_files
+    from r10k_cpu.memory_image import prepare_image_files
+
+    try:
+        return prepare_image_files(init_file, num_banks=num_banks, output_base=output_base)
+    except Exception as e:
+        print(f"Error processing init file {init_file}: {e}")
+        raise
+
+
+def memory_depth_for(init_files: list[str], stack_top: int = 0x10000) -> int:
+    """
+    Smallest power-of-two word depth that holds every program image and the stack.
+
+    The images are hex or ELF files as accepted by prepare_byte_files; an ELF image also
+    needs room for its .bss. The stack is not part of the image, so its initial top
+    (`li sp, 0x10000` in scripts/boot.s) is passed separately.
+    A store above the depth fails the simulation (see ByteAddressableMemory); only the
+    terminator's `sb x0, -1(x0)` may address it.
+    """
+    from r10k_cpu.memory_image import MemoryImage
+
+    words = (stack_top + 3) // 4
+    for init_file in init_files:
+        words = max(words, MemoryImage.from_file(init_file).end_word)
+
+    depth = 1
+    while depth < words:
+        depth *= 2
+    return depth
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Check every commit of the core against the Python instruction-set simulator.
+
+This script:
+- Builds the simulator with `commit_log=True` (reusing the build cache)
+- Runs each program under asms/ (or the given programs), in parallel, each in its own work
+  directory, stepping `r10k_cpu.iss` in lock-step with the core's Retire lines
+- Stops a program at its first differing commit and prints it with the last lines before it
+
+    python scripts/cosim.py -j 8
+    python scripts/cosim.py --program asms/qsort/qsort.hex
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import build_simulator_cached
+from r10k_cpu.cosim import CoSimResult, cosim_program
+from r10k_cpu.sim_runner import RESOURCE_BASE, map_programs, work_image_files
+from r10k_cpu.utils import memory_depth_for
+from scripts.ipc_sweep import iter_asm_tests
+from tests.utils import run_quietly
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--asms-dir", default="asms")
+    parser.add_argument(
+        "--program", action="append", default=[], help="Program image to check (default: all asms)"
+    )
+    parser.add_argument("--work-dir", default="tmp/cosim")
+    parser.add_argument("--sim-threshold", type=int, default=3_000_000)
+    parser.add_argument("--load-ports", type=int, default=1, choices=(1, 2))
+    parser.add_argument(
+        "--build-cache",
+        default=".build_cache",
+        help="Directory of cached simulator binaries ('' = always rebuild)",
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=os.cpu_count(), help="Programs simulated in parallel"
+    )
+    args = parser.parse_args()
+
+    programs = args.program or [
+        os.path.join(args.asms_dir, test, f"{test}.hex") for test in iter_asm_tests(args.asms_dir)
+    ]
+    memory_depth = memory_depth_for(programs)
+
+    build, stdout, stderr = run_quietly(
+        build_simulator_cached,
+        cache_dir=args.build_cache or None,
+        report=False,
+        sram_files=work_image_files(args.load_ports),
+        resource_base=RESOURCE_BASE,
+        sim_threshold=args.sim_threshold,
+        load_ports=args.load_ports,
+        memory_depth=memory_depth,
+        commit_log=True,
+    )
+    if build is None:
+        raise RuntimeError(
+            f"Build simulator failed with stdout:\n{stdout}\n\nstderr:\n{stderr}\n"
+        )
+    print(build.report())
+
+    names = [os.path.splitext(os.path.basename(program))[0] for program in programs]
+    results: list[CoSimResult] = map_programs(
+        cosim_program,
+        args.jobs,
+        [
+            (
+                build.binary,
+                program,
+                os.path.join(args.work_dir, name),
+                args.load_ports,
+                name,
+                memory_depth,
+            )
+            for program, name in zip(programs, names)
+        ],
+    )
+
+    for result in results:
+        if result.ok:
+            print(f"{result.name}: {result.commits} commits match")
+            continue
+        if result.mismatch is not None:
+            print(f"{result.name}: MISMATCH at {result.mismatch}")
+            for line in result.run.tail[-8:]:
+                print(f"    {line}")
+        elif result.run.error:
+            print(f"{result.name}: ERROR {result.run.error}")
+        else:
+            print(f"{result.name}: INCOMPLETE after {result.commits} commits (sim_threshold?)")
+
+    failed = sum(not result.ok for result in results)
+    print(f"Summary: match={len(results) - failed} fail={failed}")
+    return 0 if failed == 0 else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
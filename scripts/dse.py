@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""Design-space exploration over the core's structure sizes.
+
+This script:
+- Enumerates configurations of Active List, ALU Queue and LSQ depth, physical register
+  count and branch predictor index bits (the full grid, or `--samples N` random points)
+- Builds a simulator per configuration, reusing binaries from the build cache
+- Runs every program under asms/ on every configuration, in parallel
+- Writes the geometric-mean IPC and an area estimate per configuration to out/dse_results.csv
+  and prints the Pareto front (no other configuration is both smaller and faster)
+
+The area estimate is the number of storage bits in the sized structures; it ignores
+the logic around them, so only compare it between configurations.
+
+    python scripts/dse.py --active-list 16,32 --lsq 8,16,32 --samples 6 -j 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import functools
+import itertools
+import math
+import os
+import random
+import sys
+from dataclasses import dataclass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import build_simulator_cached
+from r10k_cpu.common import CoreConfig
+from r10k_cpu.downstreams.predictor import BinaryPredictState, BinaryPredictor
+from r10k_cpu.sim_runner import RESOURCE_BASE, map_programs, work_image_files
+from r10k_cpu.utils import memory_depth_for
+from scripts.ipc_sweep import ResultRow, iter_asm_tests, run_test
+from tests.utils import run_quietly
+
+
+@dataclass(frozen=True)
+class DesignPoint:
+    active_list_depth: int
+    alu_queue_depth: int
+    lsq_depth: int
+    physical_registers: int
+    predictor_bits: int
+
+    def core_config(self) -> CoreConfig:
+        return CoreConfig(
+            active_list_depth=self.active_list_depth,
+            alu_queue_depth=self.alu_queue_depth,
+            lsq_depth=self.lsq_depth,
+            physical_registers=self.physical_registers,
+        )
+
+    def is_valid(self) -> bool:
+        try:
+            self.core_config()
+        except ValueError:
+            return False
+        return True
+
+    def build_kwargs(self) -> dict:
+        return {
+            "active_list_depth": self.active_list_depth,
+            "alu_queue_depth": self.alu_queue_depth,
+            "lsq_depth": self.lsq_depth,
+            "physical_registers": self.physical_registers,
+            # A partial rather than a lambda, so the build cache key only sees the parameters.
+            "predictor_factory": functools.partial(
+                BinaryPredictor, self.predictor_bits, BinaryPredictState.WeaklyNo
+            ),
+        }
+
+    def area_bits(self) -> int:
+        """Storage bits of the structures this sweep sizes."""
+        config = self.core_config()
+        return (
+            self.active_list_depth * config.rob_entry_type.bits
+            + self.alu_queue_depth * config.alu_queue_entry_type.bits
+            + self.lsq_depth * config.lsq_entry_type.bits
+            # Register file, ready bits and the doubled free list.
+            + self.physical_registers * (32 + 1 + 2 * config.physical_idx_len)
+            # Two-bit counters.
+            + 2 * (1 << self.predictor_bits)
+        )
+
+    def label(self) -> str:
+        return (
+            f"al{self.active_list_depth}-aq{self.alu_queue_depth}-lsq{self.lsq_depth}"
+            f"-pr{self.physical_registers}-bp{self.predictor_bits}"
+        )
+
+
+@dataclass(frozen=True)
+class PointResult:
+    point: DesignPoint
+    status: str
+    geomean_ipc: float | None
+    passed: int
+    total: int
+    notes: str
+
+
+def design_points(
+    axes: dict[str, list[int]], samples: int, seed: int
+) -> list[DesignPoint]:
+    grid = [DesignPoint(*values) for values in itertools.product(*axes.values())]
+    grid = [point for point in grid if point.is_valid()]
+    if samples and samples < len(grid):
+        grid = random.Random(seed).sample(grid, samples)
+    return grid
+
+
+def geometric_mean(values: list[float]) -> float:
+    return math.exp(sum(math.log(v) for v in values) / len(values))
+
+
+def summarize(point: DesignPoint, rows: list[ResultRow]) -> PointResult:
+    passed = [r for r in rows if r.status == "pass" and r.ipc]
+    if len(passed) != len(rows):
+        bad = ", ".join(f"{r.test}={r.status}" for r in rows if r.status != "pass")
+        return PointResult(point, "fail", None, len(passed), len(rows), bad)
+    return PointResult(
+        point, "pass", geometric_mean([r.ipc for r in passed]), len(passed), len(rows), ""
+    )
+
+
+def pareto_front(results: list[PointResult]) -> list[PointResult]:
+    """Passing points that no other point beats in IPC without being larger, by area."""
+    candidates = sorted(
+        (r for r in results if r.geomean_ipc is not None),
+        key=lambda r: (r.point.area_bits(), -r.geomean_ipc),
+    )
+    front: list[PointResult] = []
+    for result in candidates:
+        if not front or result.geomean_ipc > front[-1].geomean_ipc:
+            front.append(result)
+    return front
+
+
+def _int_list(text: str) -> list[int]:
+    return [int(item) for item in text.split(",") if item]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--asms-dir", default="asms")
+    parser.add_argument("--work-dir", default="tmp/dse")
+    parser.add_argument("--out-csv", default="out/dse_results.csv")
+    parser.add_argument("--sim-threshold", type=int, default=3_000_000)
+    parser.add_argument("--active-list", type=_int_list, default=[8, 16, 32])
+    parser.add_argument("--alu-queue", type=_int_list, default=[8, 16, 32])
+    parser.add_argument("--lsq", type=_int_list, default=[8, 16, 32])
+    parser.add_argument("--physical-registers", type=_int_list, default=[48, 64])
+    parser.add_argument("--predictor-bits", type=_int_list, default=[2, 4, 6])
+    parser.add_argument(
+        "--samples", type=int, default=0, help="Random configurations to try (0 = full grid)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--build-cache",
+        default=".build_cache",
+        help="Directory of cached simulator binaries ('' = always rebuild)",
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=os.cpu_count(), help="Programs simulated in parallel"
+    )
+    args = parser.parse_args()
+
+    axes = {
+        "active_list_depth": args.active_list,
+        "alu_queue_depth": args.alu_queue,
+        "lsq_depth": args.lsq,
+        "physical_registers": args.physical_registers,
+        "predictor_bits": args.predictor_bits,
+    }
+    points = design_points(axes, args.samples, args.seed)
+    if not points:
+        raise ValueError("No valid configuration in the given ranges.")
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    os.makedirs(os.path.dirname(args.out_csv) or ".", exist_ok=True)
+
+    tests = list(iter_asm_tests(args.asms_dir))
+    memory_depth = memory_depth_for(
+        [os.path.join(args.asms_dir, test, f"{test}.hex") for test in tests]
+    )
+
+    # Builds run one after another; the programs of all of them then share the pool.
+    binaries: dict[DesignPoint, str] = {}
+    build_errors: dict[DesignPoint, str] = {}
+    for i, point in enumerate(points):
+        build, stdout, stderr = run_quietly(
+            build_simulator_cached,
+            cache_dir=args.build_cache or None,
+            report=False,
+            sram_files=work_image_files(),
+            resource_base=RESOURCE_BASE,
+            sim_threshold=args.sim_threshold,
+            memory_depth=memory_depth,
+            **point.build_kwargs(),
+        )
+        if build is None:
+            build_errors[point] = "".join((stderr or stdout).strip().splitlines()[-1:])
+            print(f"[{i + 1}/{len(points)}] {point.label()}: build failed")
+            continue
+        binaries[point] = build.binary
+        print(f"[{i + 1}/{len(points)}] {point.label()}: {build.report()}")
+
+    jobs = [
+        (point, test)
+        for point in points
+        if point in binaries
+        for test in tests
+    ]
+    rows: list[ResultRow] = map_programs(
+        run_test,
+        args.jobs,
+        [
+            (
+                binaries[point],
+                args.asms_dir,
+                os.path.join(args.work_dir, point.label(), test),
+                test,
+                1,
+            )
+            for point, test in jobs
+        ],
+    )
+
+    results: list[PointResult] = []
+    for point in points:
+        if point in build_errors:
+            results.append(
+                PointResult(point, "error", None, 0, len(tests), build_errors[point])
+            )
+            continue
+        point_rows = [row for (p, _), row in zip(jobs, rows) if p == point]
+        results.append(summarize(point, point_rows))
+
+    front = pareto_front(results)
+    with open(args.out_csv, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(list(axes) + ["area_bits", "status", "geomean_ipc", "passed", "pareto", "notes"])
+        for r in results:
+            w.writerow(
+                [getattr(r.point, name) for name in axes]
+                + [
+                    r.point.area_bits(),
+                    r.status,
+                    f"{r.geomean_ipc:.6f}" if r.geomean_ipc is not None else None,
+                    f"{r.passed}/{r.total}",
+                    int(r in front),
+                    r.notes,
+                ]
+            )
+
+    print(f"Wrote {args.out_csv}")
+    print("Pareto front (area bits, geomean IPC):")
+    for r in front:
+        print(f"  {r.point.label():<32} {r.point.area_bits():>8} {r.geomean_ipc:.4f}")
+
+    return 0 if front else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
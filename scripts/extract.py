@@ -1,15 +1,19 @@
 #!/usr/bin/env python3
 
 import os
+import sys
 import argparse
 import subprocess
 
-def process_file(filename, optimization_level, gen_dis):
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from r10k_cpu.memory_image import MemoryImage
+
+def process_file(filename, optimization_level, gen_dis, keep_elf=False):
     raw_name, _ = os.path.splitext(os.path.basename(filename))
     dirname = os.path.dirname(filename)
 
     elf_name = os.path.join(dirname, raw_name + ".elf")
-    bin_name = os.path.join(dirname, raw_name + ".bin")
     hex_name = os.path.join(dirname, raw_name + ".hex")
     dis_name = os.path.join(dirname, raw_name + ".dis")
 
@@ -36,44 +40,44 @@ def process_file(filename, optimization_level, gen_dis):
             ],
         )
 
-        subprocess.check_output(["riscv64-unknown-elf-objcopy", "-O", "binary", elf_name, bin_name])
         if gen_dis:
             dis = subprocess.check_output(["riscv64-unknown-elf-objdump", "-d", "-j", ".data", "-j", ".text", elf_name])
             with open(dis_name, "wb") as f:
                 f.write(dis)
 
-        with open(bin_name, "rb") as bin, open(hex_name, "w") as hex:
-            while True:
-                instruction = bin.read(4)
-                if not instruction:
-                    break
-                code = int.from_bytes(instruction, byteorder="little")
-                hex.write(f"{code:08x}\n")
+        # Only the PT_LOAD segments, as @addr-separated words: no zero padding between them.
+        with open(hex_name, "w") as hex:
+            hex.write(MemoryImage.from_file(elf_name).hex_file())
 
-        os.remove(elf_name)
-        os.remove(bin_name)
+        if not keep_elf:
+            os.remove(elf_name)
         print(f"Processed: {filename}")
     except subprocess.CalledProcessError as e:
         print(f"Failed to process {filename}: {e}")
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Compile c file and extract to hex file.")
+    parser = argparse.ArgumentParser(description="Compile c or assembly file and extract to hex file.")
     parser.add_argument("path", type=str, help="The path to the input file or directory")
     parser.add_argument("--output", "-o", type=str, help="Specify the output file", required=False)
     parser.add_argument(
         "--optimize", "-O", type=int, choices=[0, 1, 2, 3], help="Specify the optimization level", required=False, default=3
     )
     parser.add_argument("--disassemble", "-d", help="Generate disassemble file", action="store_true")
+    parser.add_argument(
+        "--keep-elf", help="Keep the ELF file, which prepare_byte_files also accepts", action="store_true"
+    )
     args = vars(parser.parse_args())
 
     path = args["path"]
     optimization_level = args["optimize"]
     gen_dis = args["disassemble"]
+    keep_elf = args["keep_elf"]
 
     if os.path.isdir(path):
         for root, _, files in os.walk(path):
             for file in files:
-                if file.endswith(".c"):
-                    process_file(os.path.join(root, file), optimization_level, gen_dis)
+                # Hand-written .s programs hold sequences gcc does not emit, see asms/fusion.
+                if file.endswith((".c", ".s")):
+                    process_file(os.path.join(root, file), optimization_level, gen_dis, keep_elf)
     else:
-        process_file(path, optimization_level, gen_dis)
+        process_file(path, optimization_level, gen_dis, keep_elf)
@@ -3,8 +3,9 @@
 
 This script:
 - Builds the simulator once (via main.build_cpu + assassyn build_simulator)
-- Runs each program under asms/<name>/<name>.hex
-- Parses the final terminator commit line for cycle count, x10, and retire_count
+- Runs each program under asms/<name>/<name>.hex, in parallel, each in its own work directory
+- Parses the output as it streams in: the final terminator commit line for cycle count,
+  x10 and retire_count, and the [Perf] counters
 - Writes results to out/ipc_results.csv
 
 Note: per repo convention, run `ass` in your shell first to set up the
@@ -15,24 +16,20 @@ from __future__ import annotations
 
 import argparse
 import csv
+import functools
 import os
-import re
-import shutil
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Iterable
 
-from assassyn.utils import build_simulator, run_simulator
 
-from main import build_cpu
-from r10k_cpu.utils import prepare_byte_files
+from main import build_simulator_cached
+from r10k_cpu.downstreams.icache import InstructionCache
+from r10k_cpu.perf_counters import PERF_EVENTS
+from r10k_cpu.sim_runner import RESOURCE_BASE, map_programs, stream_program, work_image_files
+from r10k_cpu.utils import memory_depth_for
 from tests.utils import run_quietly
 
 
-TERMINATOR_LINE_RE = re.compile(
-    r"Cycle\s+@(?P<cycle>[0-9]+(?:\.[0-9]+)?):\s+\[Commit\]\s+PC=0x(?P<pc>[0-9A-Fa-f]{8}),\s+x10=(?P<x10>0x[0-9A-Fa-f]+),\s+retire_count=(?P<retire>[0-9]+)"
-)
-
-
 @dataclass(frozen=True)
 class ResultRow:
     test: str
@@ -43,6 +40,7 @@ class ResultRow:
     x10: int | None
     expected_x10: int | None
     notes: str
+    perf: dict[str, int] = field(default_factory=dict)
 
 
 def iter_asm_tests(asms_dir: str) -> Iterable[str]:
@@ -55,17 +53,56 @@ def iter_asm_tests(asms_dir: str) -> Iterable[str]:
             yield entry
 
 
-def parse_terminator_line(raw: str) -> tuple[int, int, int]:
-    """Return (cycles, x10, retired) from simulator output."""
-    for line in reversed(raw.splitlines()):
-        m = TERMINATOR_LINE_RE.search(line)
-        if m:
-            cycle_f = float(m.group("cycle"))
-            cycles = int(round(cycle_f))
-            x10 = int(m.group("x10"), 16)
-            retired = int(m.group("retire"))
-            return cycles, x10, retired
-    raise ValueError("Terminator line not found (possibly hit sim_threshold)")
+def run_test(
+    simulator_binary: str,
+    asms_dir: str,
+    work_dir: str,
+    test: str,
+    load_ports: int,
+    abort_on: str | None = None,
+) -> ResultRow:
+    hex_path = os.path.join(asms_dir, test, f"{test}.hex")
+    out_path = os.path.join(asms_dir, test, f"{test}.out")
+
+    with open(out_path, "r", encoding="utf-8") as f:
+        expected_x10 = int(f.readline().strip())
+
+    run = stream_program(
+        simulator_binary, hex_path, work_dir, num_banks=load_ports, name=test, abort_on=abort_on
+    )
+    if not run.ok:
+        return ResultRow(
+            test=test,
+            status="error",
+            cycles=None,
+            retired=None,
+            ipc=None,
+            x10=None,
+            expected_x10=expected_x10,
+            notes=f"run_simulator failed: {run.error}",
+        )
+
+    if run.terminator is not None:
+        cycles, x10, retired = run.terminator.cycles, run.terminator.x10, run.terminator.retired
+        ipc = (retired / cycles) if cycles > 0 else None
+        status = "pass" if x10 == expected_x10 else "fail"
+        notes = ""
+    else:
+        cycles, x10, retired, ipc = None, None, None, None
+        status = "timeout"
+        notes = f"Terminator line not found (possibly hit sim_threshold) after cycle {run.last_cycle}"
+
+    return ResultRow(
+        test=test,
+        status=status,
+        cycles=cycles,
+        retired=retired,
+        ipc=ipc,
+        x10=x10,
+        expected_x10=expected_x10,
+        notes=notes,
+        perf=run.perf,
+    )
 
 
 def main() -> int:
@@ -74,77 +111,109 @@ def main() -> int:
     parser.add_argument("--work-dir", default="tmp")
     parser.add_argument("--out-csv", default="out/ipc_results.csv")
     parser.add_argument("--sim-threshold", type=int, default=3_000_000)
+    parser.add_argument(
+        "--icache-size", type=int, default=0, help="I-cache size in bytes (0 = perfect fetch)"
+    )
+    parser.add_argument("--icache-ways", type=int, default=2)
+    parser.add_argument("--icache-line", type=int, default=16, help="I-cache line size in bytes")
+    parser.add_argument("--icache-miss-latency", type=int, default=8)
+    parser.add_argument(
+        "--icache-prefetch", type=int, default=0, help="Next-N-line prefetch distance (0 = off)"
+    )
+    parser.add_argument(
+        "--load-ports", type=int, default=1, choices=(1, 2), help="Number of load pipelines"
+    )
+    parser.add_argument(
+        "--speculative-wakeup",
+        action="store_true",
+        help="Wake load dependents at load issue instead of at WriteBack",
+    )
+    parser.add_argument(
+        "--memory-depth",
+        type=int,
+        default=0,
+        help="Words per memory (0 = smallest power of two holding every program and the stack)",
+    )
+    parser.add_argument(
+        "--build-cache",
+        default=".build_cache",
+        help="Directory of cached simulator binaries ('' = always rebuild)",
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=os.cpu_count(), help="Programs simulated in parallel"
+    )
+    parser.add_argument(
+        "--abort-on",
+        default=None,
+        help="Regex; a program printing a matching line is stopped and reported as an error",
+    )
     args = parser.parse_args()
 
     os.makedirs(args.work_dir, exist_ok=True)
     os.makedirs(os.path.dirname(args.out_csv) or ".", exist_ok=True)
 
-    work_hex_paths = [
-        os.path.join(args.work_dir, fname)
-        for fname in ["exe.hex", "exe_b0.hex", "exe_b1.hex", "exe_b2.hex", "exe_b3.hex"]
-    ]
+    icache_factory = None
+    if args.icache_size > 0:
+        # A partial rather than a lambda, so the build cache key only sees the cache parameters.
+        icache_factory = functools.partial(
+            InstructionCache,
+            size=args.icache_size,
+            ways=args.icache_ways,
+            line_size=args.icache_line,
+            miss_latency=args.icache_miss_latency,
+            prefetch_lines=args.icache_prefetch,
+        )
 
-    _, simulator_path, _ = build_cpu(sram_files=work_hex_paths, sim_threshold=args.sim_threshold)
-    simulator_binary, stdout, stderr = run_quietly(build_simulator, simulator_path)
-    if not simulator_binary:
+    tests = list(iter_asm_tests(args.asms_dir))
+    memory_depth = args.memory_depth or memory_depth_for(
+        [os.path.join(args.asms_dir, test, f"{test}.hex") for test in tests]
+    )
+
+    build, stdout, stderr = run_quietly(
+        build_simulator_cached,
+        cache_dir=args.build_cache or None,
+        report=False,
+        # The instruction SRAM reads the word file, the data memory the byte lanes,
+        # both from the work directory the simulator runs in.
+        sram_files=work_image_files(args.load_ports),
+        resource_base=RESOURCE_BASE,
+        sim_threshold=args.sim_threshold,
+        icache_factory=icache_factory,
+        load_ports=args.load_ports,
+        speculative_load_wakeup=args.speculative_wakeup,
+        perf_counters=True,
+        memory_depth=memory_depth,
+    )
+    if build is None:
         raise RuntimeError(
             f"Build simulator failed with stdout:\n{stdout}\n\nstderr:\n{stderr}\n"
         )
-
-    rows: list[ResultRow] = []
-
-    for test in iter_asm_tests(args.asms_dir):
-        hex_path = os.path.join(args.asms_dir, test, f"{test}.hex")
-        out_path = os.path.join(args.asms_dir, test, f"{test}.out")
-
-        with open(out_path, "r", encoding="utf-8") as f:
-            expected_x10 = int(f.readline().strip())
-
-        shutil.copyfile(hex_path, work_hex_paths[0])
-        prepare_byte_files(work_hex_paths[0])
-
-        raw, stdout, stderr = run_quietly(run_simulator, binary_path=simulator_binary)
-        if not isinstance(raw, str):
-            rows.append(
-                ResultRow(
-                    test=test,
-                    status="error",
-                    cycles=None,
-                    retired=None,
-                    ipc=None,
-                    x10=None,
-                    expected_x10=expected_x10,
-                    notes=f"run_simulator failed: {stderr.strip() or stdout.strip()}",
-                )
+    print(build.report())
+    simulator_binary = build.binary
+
+    # One work directory per program, so the programs run side by side on the same binary.
+    rows: list[ResultRow] = map_programs(
+        run_test,
+        args.jobs,
+        [
+            (
+                simulator_binary,
+                args.asms_dir,
+                os.path.join(args.work_dir, test),
+                test,
+                args.load_ports,
+                args.abort_on,
             )
-            continue
-
-        try:
-            cycles, x10, retired = parse_terminator_line(raw)
-            ipc = (retired / cycles) if cycles > 0 else None
-            status = "pass" if x10 == expected_x10 else "fail"
-            notes = ""
-        except Exception as e:  # noqa: BLE001
-            cycles, x10, retired, ipc = None, None, None, None
-            status = "timeout"
-            notes = str(e)
-
-        rows.append(
-            ResultRow(
-                test=test,
-                status=status,
-                cycles=cycles,
-                retired=retired,
-                ipc=ipc,
-                x10=x10,
-                expected_x10=expected_x10,
-                notes=notes,
-            )
-        )
+            for test in tests
+        ],
+    )
 
     with open(args.out_csv, "w", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
-        w.writerow(["test", "status", "cycles", "retired", "ipc", "x10", "expected_x10", "notes"])
+        w.writerow(
+            ["test", "status", "cycles", "retired", "ipc", "x10", "expected_x10", "notes"]
+            + list(PERF_EVENTS)
+        )
         for r in rows:
             w.writerow(
                 [
@@ -157,6 +226,7 @@ def main() -> int:
                     r.expected_x10,
                     r.notes,
                 ]
+                + [r.perf.get(event) for event in PERF_EVENTS]
             )
 
     # Also print a short summary to stdout.
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Turn the output of a traced simulator run into a Konata pipeline trace.
+
+Build the simulator with `build_cpu(trace=True)`, run a program and convert its output;
+open the result in Konata (https://github.com/shioyadan/Konata):
+
+    python scripts/run_program.py <traced binary> asms/qsort/qsort.hex > out/qsort.out
+    python scripts/konata.py out/qsort.out -o out/qsort.kanata
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from r10k_cpu.konata import konata_lines, parse_trace
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sim_output", help="Simulator output ('-' for stdin)")
+    parser.add_argument("-o", "--output", default=None, help="Trace file (default: stdout)")
+    args = parser.parse_args()
+
+    if args.sim_output == "-":
+        instructions = parse_trace(sys.stdin)
+    else:
+        with open(args.sim_output, encoding="utf-8", errors="replace") as f:
+            instructions = parse_trace(f)
+    if not instructions:
+        print("No [Trace] lines; was the simulator built with trace=True?", file=sys.stderr)
+        return 1
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for line in konata_lines(instructions):
+            out.write(line + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    flushed = sum(instruction.flushed for instruction in instructions)
+    print(f"{len(instructions)} instructions, {flushed} flushed", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Run a program on an already built simulator binary.
+
+The binary must have been built with `sram_files=sim_runner.work_image_files(...)` and
+`resource_base=sim_runner.RESOURCE_BASE`, as test_asms and ipc_sweep do; it then loads
+whatever image is in the directory it runs in. This script prepares the image there and
+runs the binary, so any number of programs can use the same binary at once:
+
+    python scripts/run_program.py .build_cache/<key>/simulator asms/qsort/qsort.hex
+    R10K_IMAGE_DIR=/tmp/qsort python scripts/run_program.py <binary> qsort.elf
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from r10k_cpu.sim_runner import IMAGE_DIR_ENV, run_program
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("binary", help="Simulator binary")
+    parser.add_argument("program", help="Program image (.hex or .elf)")
+    parser.add_argument(
+        "--work-dir",
+        default=None,
+        help=f"Directory to run in (default: ${IMAGE_DIR_ENV}, else a new temporary directory)",
+    )
+    parser.add_argument("--load-ports", type=int, default=1, choices=(1, 2))
+    args = parser.parse_args()
+
+    run = run_program(args.binary, args.program, args.work_dir, num_banks=args.load_ports)
+    if run.stdout is None:
+        print(run.error, file=sys.stderr)
+        return 1
+    sys.stdout.write(run.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
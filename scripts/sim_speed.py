@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Measure simulator speed in simulated cycles per second.
+
+Builds the simulator (through the build cache) and runs one program several times,
+reporting the wall time and cycles per second of each run and their median. Run it on
+two revisions to compare a change to the design's simulation cost:
+
+    python scripts/sim_speed.py asms/qsort/qsort.hex --runs 5
+
+Note: per repo convention, run `ass` in your shell first to set up the
+assassyn toolchain/PYTHONPATH before invoking this script.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import build_simulator_cached
+from r10k_cpu.sim_runner import RESOURCE_BASE, stream_program, work_image_files
+from r10k_cpu.utils import memory_depth_for
+from tests.utils import run_quietly
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("program", nargs="?", default="asms/qsort/qsort.hex")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--work-dir", default="tmp/sim_speed")
+    parser.add_argument("--sim-threshold", type=int, default=3_000_000)
+    parser.add_argument(
+        "--build-cache",
+        default=".build_cache",
+        help="Directory of cached simulator binaries ('' = always rebuild)",
+    )
+    args = parser.parse_args()
+
+    build, stdout, stderr = run_quietly(
+        build_simulator_cached,
+        cache_dir=args.build_cache or None,
+        report=False,
+        sram_files=work_image_files(),
+        resource_base=RESOURCE_BASE,
+        sim_threshold=args.sim_threshold,
+        memory_depth=memory_depth_for([args.program]),
+    )
+    if build is None:
+        raise RuntimeError(
+            f"Build simulator failed with stdout:\n{stdout}\n\nstderr:\n{stderr}\n"
+        )
+    print(build.report())
+
+    rates = []
+    for i in range(args.runs):
+        start = time.monotonic()
+        run = stream_program(build.binary, args.program, args.work_dir)
+        elapsed = time.monotonic() - start
+        if not run.ok or run.terminator is None:
+            print(f"run {i}: failed: {run.error or 'no terminator line'}", file=sys.stderr)
+            return 1
+        cycles = run.terminator.cycles
+        rates.append(cycles / elapsed)
+        print(f"run {i}: {cycles} cycles in {elapsed:.3f} s, {rates[-1]:,.0f} cycles/s")
+
+    print(f"median: {statistics.median(rates):,.0f} cycles/s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
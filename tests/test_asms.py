@@ -1,12 +1,15 @@
+import functools
 import os
 import re
-import shutil
 import pytest
 
 from assassyn.frontend import *
-from assassyn.utils import run_simulator, build_simulator, run_verilator
+from assassyn.utils import run_verilator
 
-from main import build_cpu
+from main import build_cpu, build_simulator_cached
+from r10k_cpu.downstreams.icache import InstructionCache
+from r10k_cpu.memory_image import image_file_paths
+from r10k_cpu.sim_runner import RESOURCE_BASE, map_programs, stream_program, work_image_files
 from r10k_cpu.utils import prepare_byte_files
 from utils import run_quietly
 
@@ -14,40 +17,68 @@ test_cases_path = "asms"
 work_path = "tmp"
 
 
-def test_asms():
-    work_hex_paths = [
-        os.path.join(work_path, fname)
-        for fname in ["exe.hex", "exe_b0.hex", "exe_b1.hex", "exe_b2.hex", "exe_b3.hex"]
-    ]
-
+# Optional design features, each checked on its own against every program.
+FEATURES = {
+    "baseline": {},
+    "speculative_load_wakeup": {"speculative_load_wakeup": True},
+    "perf_counters": {"perf_counters": True},
+    "macro_fusion": {"macro_fusion": True},
+    "move_elimination": {"move_elimination": True},
+    "early_release": {"early_release": True},
+    "divider_radix_4": {"divider_radix": 4},
+    "register_banks": {"register_banks": 2},
+    "load_ports": {"load_ports": 2},
+    "icache": {"icache_factory": InstructionCache},
+    "icache_prefetch": {"icache_factory": functools.partial(InstructionCache, prefetch_lines=2)},
+}
+
+
+@pytest.mark.parametrize("feature", list(FEATURES))
+def test_asms(feature):
+    # A second load port splits the data memory into as many banks, each with its own lane files.
+    num_banks = FEATURES[feature].get("load_ports", 1)
     os.makedirs(work_path, exist_ok=True)
-    sys, simulator_path, verilog_path = build_cpu(
-        sram_files=work_hex_paths, sim_threshold=1000000
+    build, stdout, stderr = run_quietly(
+        build_simulator_cached,
+        report=False,
+        sram_files=work_image_files(num_banks),
+        resource_base=RESOURCE_BASE,
+        sim_threshold=1000000,
+        **FEATURES[feature],
     )
-    simulator_binary, stdout, stderr = run_quietly(build_simulator, simulator_path)
-    assert (
-        simulator_binary
-    ), f"Build simulator failed with stdout: \n{stdout}\n stderr: \n{stderr}\n"
-    print(f"Simulator built at {simulator_binary}")
+    assert build, f"Build simulator failed with stdout: \n{stdout}\n stderr: \n{stderr}\n"
+    print(build.report())
+    simulator_binary = build.binary
 
-    test_cases = os.listdir(test_cases_path)
+    test_cases = sorted(os.listdir(test_cases_path))
     print(test_cases)
 
-    for test_case in test_cases:
-        hex_path = os.path.join(test_cases_path, test_case, test_case + ".hex")
+    # Every program runs in its own work directory, all at once; only the tail of each output is kept.
+    runs = map_programs(
+        stream_program,
+        None,
+        [
+            (
+                simulator_binary,
+                os.path.join(test_cases_path, test_case, test_case + ".hex"),
+                os.path.join(work_path, feature, test_case),
+                num_banks,
+                test_case,
+            )
+            for test_case in test_cases
+        ],
+    )
+
+    for test_case, run in zip(test_cases, runs):
         out_path = os.path.join(test_cases_path, test_case, test_case + ".out")
         with open(out_path, "r") as f:
             expected_result = int(f.readline())
 
-        shutil.copyfile(hex_path, work_hex_paths[0])
-        prepare_byte_files(work_hex_paths[0])
-
-        raw, stdout, stderr = run_quietly(run_simulator, binary_path=simulator_binary)
-        assert isinstance(
-            raw, str
-        ), f"Run simulator failed with stdout: \n{stdout}\n stderr: \n{stderr}\n"
+        assert (
+            run.ok and run.tail
+        ), f"Run simulator failed while testing {test_case}: \n{run.error}\n"
 
-        result = raw.splitlines()[-1]
+        result = run.tail[-1]
         assert (
             "PC=0x00000008" in result
         ), f"The processor is not down properly while testing {test_case}"
@@ -65,10 +96,7 @@ def test_asms():
 
 @pytest.mark.slow
 def test_asms_verilator():
-    work_hex_paths = [
-        os.path.join(work_path, fname)
-        for fname in ["exe_bf.hex", "exe_b0.hex", "exe_b1.hex", "exe_b2.hex", "exe_b3.hex"]
-    ]
+    work_hex_paths = image_file_paths(os.path.join(work_path, "exe"))
 
     os.makedirs(work_path, exist_ok=True)
     sys, simulator_path, verilog_path = build_cpu(
@@ -84,8 +112,7 @@ def test_asms_verilator():
         with open(out_path, "r") as f:
             expected_result = int(f.readline())
 
-        shutil.copyfile(hex_path, work_hex_paths[0])
-        prepare_byte_files(work_hex_paths[0])
+        prepare_byte_files(hex_path, output_base=os.path.join(work_path, "exe"))
 
         raw, _, stderr = run_quietly(run_verilator, verilog_path)
         assert isinstance(raw, str), f"Run verilator failed with stderr: \n {stderr}"
@@ -0,0 +1,66 @@
+import re
+
+import pytest
+from assassyn.frontend import *
+from assassyn.backend import elaborate
+from assassyn.utils import run_simulator
+
+from dataclass.multiport_regarray import BankedRegArray
+from tests.utils import run_quietly
+
+
+DEPTH = 8
+# Addresses read through one port per bank; 2 and 4 share bank 0.
+READS = [2, 4, 5]
+
+
+class Driver(Module):
+    def __init__(self):
+        super().__init__(ports={})
+        self.array = BankedRegArray(Bits(32), DEPTH, num_banks=2, read_ports_per_bank=1)
+        self.cycle = RegArray(UInt(32), 1, initializer=[0])
+
+    @module.combinational
+    def build(self):
+        self.cycle[0] = self.cycle[0] + UInt(32)(1)
+        cycle_val = self.cycle[0]
+
+        # Cycles 1..DEPTH write 11 * addr to addr.
+        addr = (cycle_val - UInt(32)(1)).bitcast(Bits(32))[0:2]
+        data = ((cycle_val - UInt(32)(1)) * UInt(32)(11)).bitcast(Bits(32))[0:31]
+        with Condition((cycle_val >= UInt(32)(1)) & (cycle_val <= UInt(32)(DEPTH))):
+            self.array[addr] = data
+
+        result = self.array.read_ports([(Bits(1)(1), Bits(3)(read)) for read in READS])
+        with Condition(cycle_val == UInt(32)(DEPTH + 2)):
+            log(
+                "values: {} {} {}, granted: {} {} {}, indexed: {}",
+                *result.values,
+                *result.granted,
+                self.array[Bits(3)(7)],
+            )
+
+
+def test_banked_regarray():
+    sys = SysBuilder("test_banked_regarray")
+    with sys:
+        driver = Driver()
+        driver.build()
+
+    sim, ver = elaborate(sys, verilog=True, verbose=False, sim_threshold=DEPTH + 5)
+    raw, std_out, std_err = run_quietly(run_simulator, sim)
+    assert raw is not None, std_err
+
+    m = re.search(r"values: (\d+) (\d+) (\d+), granted: (\d) (\d) (\d), indexed: (\d+)", raw)
+    assert m is not None, raw
+    values = [int(m.group(i)) for i in range(1, 4)]
+    granted = [int(m.group(i)) for i in range(4, 7)]
+    # The second read of bank 0 finds its only port taken.
+    assert granted == [1, 0, 1]
+    assert values == [22, 0, 55]
+    assert int(m.group(7)) == 77
+
+
+def test_banked_regarray_rejects_uneven_banks():
+    with pytest.raises(ValueError):
+        BankedRegArray(Bits(32), 6, num_banks=4)
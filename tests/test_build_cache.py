@@ -0,0 +1,63 @@
+import functools
+import os
+
+from r10k_cpu.build_cache import build_key, cached_build, describe
+
+
+class Predictor:
+    def __init__(self, bits: int):
+        self.bits = bits
+
+
+def _tree(tmp_path, body: str) -> str:
+    root = tmp_path / "repo"
+    (root / "r10k_cpu").mkdir(parents=True, exist_ok=True)
+    (root / "main.py").write_text("def build_cpu(): pass\n")
+    (root / "r10k_cpu" / "core.py").write_text(body)
+    return str(root)
+
+
+def test_describe_factories():
+    assert describe(lambda: Predictor(4)) == describe(lambda: Predictor(4))
+    assert describe(lambda: Predictor(4)) != describe(lambda: Predictor(2))
+    assert describe(functools.partial(Predictor, bits=4)) != describe(
+        functools.partial(Predictor, bits=2)
+    )
+
+    def factory(bits):
+        return lambda: Predictor(bits)
+
+    assert describe(factory(4)) == describe(factory(4))
+    assert describe(factory(4)) != describe(factory(2))
+
+
+def test_key_covers_params_and_sources(tmp_path):
+    root = _tree(tmp_path, "DEPTH = 32\n")
+    key = build_key({"sim_threshold": 100}, root)
+
+    assert build_key({"sim_threshold": 100}, root) == key
+    assert build_key({"sim_threshold": 200}, root) != key
+
+    _tree(tmp_path, "DEPTH = 16\n")
+    assert build_key({"sim_threshold": 100}, root) != key
+
+
+def test_cached_build_hit_and_miss(tmp_path):
+    builds = []
+
+    def build():
+        path = tmp_path / f"sim{len(builds)}"
+        path.write_text("#!/bin/sh\n")
+        os.chmod(path, 0o755)
+        builds.append(path)
+        return str(path)
+
+    cache_dir = str(tmp_path / "cache")
+    first = cached_build("a" * 64, cache_dir, build)
+    second = cached_build("a" * 64, cache_dir, build)
+    other = cached_build("b" * 64, cache_dir, build)
+
+    assert (first.hit, second.hit, other.hit) == (False, True, False)
+    assert len(builds) == 2
+    assert second.binary == first.binary and os.access(second.binary, os.X_OK)
+    assert "hit" in second.report() and "miss" in other.report()
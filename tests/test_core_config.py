@@ -0,0 +1,37 @@
+import pytest
+
+from r10k_cpu.common import DEFAULT_CORE_CONFIG, ROBEntryType, CoreConfig
+
+
+def test_default_widths():
+    config = DEFAULT_CORE_CONFIG
+    assert (config.active_list_idx_len, config.alu_queue_idx_len, config.lsq_idx_len) == (5, 5, 5)
+    assert config.physical_idx_len == 6
+    assert config.rob_entry_type is ROBEntryType
+
+
+def test_large_config_widens_records():
+    small = CoreConfig()
+    large = CoreConfig(
+        active_list_depth=128, alu_queue_depth=64, lsq_depth=64, physical_registers=256
+    )
+    assert (large.active_list_idx_len, large.lsq_idx_len, large.physical_idx_len) == (7, 6, 8)
+
+    # Two physical register fields grow by 2 bits each.
+    assert large.rob_entry_type.bits == small.rob_entry_type.bits + 4
+    # Three physical register fields plus the Active List and queue indices.
+    assert large.lsq_entry_type.bits == small.lsq_entry_type.bits + 3 * 2 + 2 + 1
+    assert large.alu_queue_entry_type.bits == small.alu_queue_entry_type.bits + 3 * 2 + 2 + 1
+
+
+def test_invalid_configs():
+    with pytest.raises(ValueError):
+        CoreConfig(lsq_depth=24)
+    with pytest.raises(ValueError):
+        # x0 and 31 architectural registers leave nothing to rename into.
+        CoreConfig(physical_registers=32)
+
+
+def test_active_list_may_outgrow_free_registers():
+    # Rename stalls on an empty free list instead.
+    assert CoreConfig(active_list_depth=64, physical_registers=64).active_list_idx_len == 6
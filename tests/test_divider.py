@@ -0,0 +1,224 @@
+import random
+import re
+
+import pytest
+from assassyn.frontend import *
+from assassyn.backend import elaborate
+from assassyn.utils import run_simulator
+
+from r10k_cpu.common import ALU_CODE_LEN, DEFAULT_CORE_CONFIG, OPERANT_FROM_LEN, ALU_Code, OperantFrom
+from r10k_cpu.downstreams.active_list import ActiveList, InstructionPushEntry
+from r10k_cpu.downstreams.register_ready import RegisterReady
+from r10k_cpu.modules.alu import Multiply_ALU
+from tests.utils import run_quietly
+
+
+INT_MIN = 0x80000000
+MASK = 0xFFFFFFFF
+# Cycles between two divides, more than the slowest one takes.
+ISSUE_GAP = 40
+
+_rng = random.Random(10)
+CASES = [
+    (ALU_Code.DIVU, MASK, 0xFFFF),  # 32-bit by 16-bit
+    (ALU_Code.REMU, MASK, 0xFFFF),
+    (ALU_Code.DIV, 0, 5),
+    (ALU_Code.REM, 0, 5),
+    (ALU_Code.DIV, 1, 1),
+    (ALU_Code.DIV, 1, MASK),  # 1 / -1
+    (ALU_Code.DIV, MASK, 1),  # -1 / 1
+    (ALU_Code.REM, MASK, 2),  # -1 % 2
+    (ALU_Code.DIV, -7 & MASK, 2),
+    (ALU_Code.REM, -7 & MASK, 2),
+    (ALU_Code.DIV, INT_MIN, 1),
+    (ALU_Code.DIV, INT_MIN, MASK),  # Overflow
+    (ALU_Code.REM, INT_MIN, MASK),
+    (ALU_Code.DIV, 5, 0),  # Division by zero
+    (ALU_Code.DIVU, 5, 0),
+    (ALU_Code.REM, 5, 0),
+    (ALU_Code.REMU, 5, 0),
+    (ALU_Code.DIVU, 3, MASK),  # Smaller by larger
+    (ALU_Code.REMU, 3, MASK),
+] + [
+    (op, _rng.getrandbits(32), _rng.getrandbits(_rng.randint(1, 32)) or 1)
+    for op in (ALU_Code.DIV, ALU_Code.DIVU, ALU_Code.REM, ALU_Code.REMU)
+]
+
+# Every distinct operand lives in one physical register, the results in the last ones.
+OPERANDS = sorted({a for _, a, _ in CASES} | {b for _, _, b in CASES})
+OPERAND_REGS = {value: i + 1 for i, value in enumerate(OPERANDS)}
+NUM_REGS = DEFAULT_CORE_CONFIG.physical_registers
+FIRST_RESULT = NUM_REGS - len(CASES)
+assert len(OPERANDS) < FIRST_RESULT
+
+
+def signed(value: int) -> int:
+    return value - (1 << 32) if value & INT_MIN else value
+
+
+def expected_result(op: ALU_Code, a: int, b: int) -> int:
+    """RISC-V M semantics, through Python's // and % on the magnitudes."""
+    is_signed = op in (ALU_Code.DIV, ALU_Code.REM)
+    is_div = op in (ALU_Code.DIV, ALU_Code.DIVU)
+    if b == 0:
+        return MASK if is_div else a
+    if is_signed:
+        if a == INT_MIN and b == MASK:
+            return INT_MIN if is_div else 0
+        sa, sb = signed(a), signed(b)
+        quotient = abs(sa) // abs(sb)
+        remainder = abs(sa) % abs(sb)
+        if (sa < 0) != (sb < 0):
+            quotient = -quotient
+        if sa < 0:
+            remainder = -remainder
+        return (quotient if is_div else remainder) & MASK
+    return a // b if is_div else a % b
+
+
+def divider_steps(op: ALU_Code, a: int, b: int, radix: int) -> int | None:
+    """Cycles the divider iterates for, or None when Multiply_ALU answers directly."""
+    is_signed = op in (ALU_Code.DIV, ALU_Code.REM)
+    if b == 0 or (is_signed and a == INT_MIN and b == MASK):
+        return None
+    if is_signed:
+        a, b = abs(signed(a)), abs(signed(b))
+    la = 32 - a.bit_length()
+    lb = 32 - b.bit_length()
+    if radix == 2:
+        return 32 - la
+    skip = min(31 + la - lb, 32) & ~1
+    return (32 - skip) // 2
+
+
+class Driver(Module):
+    cycle: Array
+
+    def __init__(self, multiply_alu: Multiply_ALU, register_file: Array):
+        super().__init__(ports={})
+        self.multiply_alu = multiply_alu
+        self.register_file = register_file
+        self.cycle = RegArray(UInt(32), 1, initializer=[0])
+
+    @module.combinational
+    def build(self):
+        self.cycle[0] = self.cycle[0] + UInt(32)(1)
+        cycle_val = self.cycle[0]
+        physical_bits = DEFAULT_CORE_CONFIG.physical_idx_len
+
+        issue = Bits(1)(0)
+        alu_op = Bits(ALU_CODE_LEN)(0)
+        rs1 = Bits(physical_bits)(0)
+        rs2 = Bits(physical_bits)(0)
+        rd = Bits(physical_bits)(0)
+        for i, (op, a, b) in enumerate(CASES):
+            cond = cycle_val == UInt(32)(1 + i * ISSUE_GAP)
+            issue = cond.select(Bits(1)(1), issue)
+            alu_op = cond.select(Bits(ALU_CODE_LEN)(op.value), alu_op)
+            rs1 = cond.select(Bits(physical_bits)(OPERAND_REGS[a]), rs1)
+            rs2 = cond.select(Bits(physical_bits)(OPERAND_REGS[b]), rs2)
+            rd = cond.select(Bits(physical_bits)(FIRST_RESULT + i), rd)
+
+        # Issue like SchedulerDown: the divider is busy from the next cycle on.
+        with Condition(issue):
+            self.multiply_alu.async_called(
+                instr=DEFAULT_CORE_CONFIG.alu_queue_entry_type.bundle(
+                    valid=Bits(1)(1),
+                    active_list_idx=Bits(DEFAULT_CORE_CONFIG.active_list_idx_len)(0),
+                    alu_queue_idx=Bits(DEFAULT_CORE_CONFIG.alu_queue_idx_len)(0),
+                    rs1_physical=rs1,
+                    rs2_physical=rs2,
+                    rd_physical=rd,
+                    alu_op=alu_op,
+                    imm=Bits(32)(0),
+                    operant1_from=Bits(OPERANT_FROM_LEN)(OperantFrom.RS1.value),
+                    operant2_from=Bits(OPERANT_FROM_LEN)(OperantFrom.RS2.value),
+                    PC=Bits(32)(0),
+                    is_branch=Bits(1)(0),
+                    is_jalr=Bits(1)(0),
+                    branch_flip=Bits(1)(0),
+                    issued=Bits(1)(0),
+                )
+            )
+            self.multiply_alu.div_busy[0] = Bits(1)(1)
+
+        log("cycle: {}, busy: {}", cycle_val, self.multiply_alu.div_busy[0])
+        with Condition(cycle_val == UInt(32)(len(CASES) * ISSUE_GAP)):
+            log(
+                "results: " + "{} " * len(CASES),
+                *[self.register_file[FIRST_RESULT + i] for i in range(len(CASES))],
+            )
+
+
+@pytest.mark.parametrize("radix", [2, 4])
+def test_divider(radix):
+    initializer = [0] * NUM_REGS
+    for value, reg in OPERAND_REGS.items():
+        initializer[reg] = value
+
+    sys = SysBuilder(f"test_divider_radix{radix}")
+    with sys:
+        register_file = RegArray(Bits(32), NUM_REGS, initializer=initializer)
+        register_ready = RegisterReady(NUM_REGS)
+        active_list = ActiveList()
+        flush = RegArray(Bits(1), 1)
+        multiply_alu = Multiply_ALU(divider_radix=radix)
+        driver = Driver(multiply_alu, register_file)
+
+        driver.build()
+        multiply_alu.build(register_file, register_ready, active_list, flush)
+        active_list.build(
+            push_inst=InstructionPushEntry(
+                valid=Bits(1)(0),
+                pc=Bits(32)(0),
+                dest_logical=Bits(5)(0),
+                dest_new_physical=Bits(DEFAULT_CORE_CONFIG.physical_idx_len)(0),
+                dest_old_physical=Bits(DEFAULT_CORE_CONFIG.physical_idx_len)(0),
+                has_dest=Bits(1)(0),
+                imm=Bits(32)(0),
+                is_branch=Bits(1)(0),
+                is_alu=Bits(1)(0),
+                predict_branch=Bits(1)(0),
+                is_jump=Bits(1)(0),
+                is_jalr=Bits(1)(0),
+                is_terminator=Bits(1)(0),
+                is_naturally_ready=Bits(1)(0),
+            ),
+            pop_enable=Bits(1)(0),
+            flush=Bits(1)(0),
+        )
+        register_ready.build(flush_recover=Bits(1)(0))
+
+    sim, ver = elaborate(
+        sys, verilog=True, verbose=False, sim_threshold=len(CASES) * ISSUE_GAP + 2
+    )
+    raw, std_out, std_err = run_quietly(run_simulator, sim)
+    assert raw is not None, std_err
+
+    m = re.search(r"results: ([\d ]+)", raw)
+    assert m is not None, raw
+    results = [int(x) for x in m.group(1).split()]
+    for (op, a, b), result in zip(CASES, results):
+        assert result == expected_result(op, a, b), f"{op.name} {a:#x}, {b:#x}: got {result:#x}"
+
+    busy = {}
+    for m in re.finditer(r"cycle: (\d+), busy: (\d+)", raw):
+        busy[int(m.group(1))] = int(m.group(2))
+    busy_cycles = [
+        sum(busy[c] for c in range(issue + 1, issue + ISSUE_GAP + 1))
+        for issue in range(1, len(CASES) * ISSUE_GAP, ISSUE_GAP)
+    ]
+    # The 32-bit by 16-bit divide: 32 single steps, or 9 double steps after the skip.
+    assert busy_cycles[0] == {2: 35, 4: 12}[radix]
+    for (op, a, b), cycles in zip(CASES, busy_cycles):
+        steps = divider_steps(op, a, b, radix)
+        if steps is None:
+            # Only the Multiply_ALU cycle.
+            expected = 1
+        elif a == 0:
+            # The leading zeros of 0 do not fit the counter; only the result is checked.
+            continue
+        else:
+            # Multiply_ALU, loading the dividend, the steps and the result write.
+            expected = steps + 3
+        assert cycles == expected, f"{op.name} {a:#x}, {b:#x}: {cycles} cycles"
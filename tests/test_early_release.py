@@ -0,0 +1,191 @@
+from dataclasses import dataclass
+from typing import Optional
+import re
+
+from assassyn.frontend import *
+from assassyn.backend import elaborate
+from assassyn.utils import run_simulator
+from tests.utils import run_quietly
+
+from r10k_cpu.common import ALU_CODE_LEN, DEFAULT_CORE_CONFIG, OPERANT_FROM_LEN, OperantFrom
+from r10k_cpu.downstreams.active_list import ActiveList, InstructionPushEntry
+from r10k_cpu.downstreams.alu_queue import ALUQueue, ALUQueuePushEntry
+from r10k_cpu.downstreams.early_release import EarlyRelease
+from r10k_cpu.downstreams.lsq import LSQ, LSQPushEntry, StoreBuffer
+from r10k_cpu.downstreams.register_ready import RegisterReady
+
+
+@dataclass
+class Step:
+    cycle: int
+    push_old: Optional[int] = None  # dest_old_physical of an Active List push
+    alu_reader: Optional[int] = None  # unissued ALU Queue entry reading this register
+    lsq_reader: Optional[int] = None  # load reading this register as its base
+    alu_pop: bool = False
+    lsq_pop: bool = False
+    flush: bool = False
+
+
+STEPS = [
+    Step(1, push_old=10, alu_reader=10),  # Entry 0 overwrites 10, which an add still reads.
+    Step(2, push_old=11, lsq_reader=11),  # Entry 1 overwrites 11, which a load still reads.
+    Step(4, alu_pop=True),                # The add leaves; 10 is released in cycle 5.
+    Step(7, lsq_pop=True),                # The load leaves; 11 is released in cycle 8.
+    Step(10, push_old=12),                # Entry 2 could be released in cycle 11...
+    Step(11, flush=True),                 # ...but is squashed in that cycle.
+    Step(13, push_old=13),                # Entry 0 again, after the flush reset the tail.
+    Step(16),                             # Idle.
+]
+
+
+class Driver(Module):
+    cycle: Array
+
+    def __init__(self):
+        super().__init__(ports={})
+        self.active_list = ActiveList()
+        self.alu_queue = ALUQueue(4)
+        self.lsq = LSQ(4)
+        self.store_buffer = StoreBuffer()
+        self.register_ready = RegisterReady(DEFAULT_CORE_CONFIG.physical_registers)
+        self.early_release = EarlyRelease()
+        self.cycle = RegArray(UInt(32), 1, initializer=[0])
+
+    @module.combinational
+    def build(self):
+        self.cycle[0] = self.cycle[0] + UInt(32)(1)
+        cycle_val = self.cycle[0]
+        physical_bits = DEFAULT_CORE_CONFIG.physical_idx_len
+
+        push = Bits(1)(0)
+        push_old = Bits(physical_bits)(0)
+        alu_push = Bits(1)(0)
+        alu_rs1 = Bits(physical_bits)(0)
+        lsq_push = Bits(1)(0)
+        lsq_rs1 = Bits(physical_bits)(0)
+        alu_pop = Bits(1)(0)
+        lsq_pop = Bits(1)(0)
+        flush = Bits(1)(0)
+
+        for step in STEPS:
+            cond = cycle_val == UInt(32)(step.cycle)
+
+            if step.push_old is not None:
+                push = cond.select(Bits(1)(1), push)
+                push_old = cond.select(Bits(physical_bits)(step.push_old), push_old)
+            if step.alu_reader is not None:
+                alu_push = cond.select(Bits(1)(1), alu_push)
+                alu_rs1 = cond.select(Bits(physical_bits)(step.alu_reader), alu_rs1)
+            if step.lsq_reader is not None:
+                lsq_push = cond.select(Bits(1)(1), lsq_push)
+                lsq_rs1 = cond.select(Bits(physical_bits)(step.lsq_reader), lsq_rs1)
+            if step.alu_pop:
+                alu_pop = cond.select(Bits(1)(1), alu_pop)
+            if step.lsq_pop:
+                lsq_pop = cond.select(Bits(1)(1), lsq_pop)
+            if step.flush:
+                flush = cond.select(Bits(1)(1), flush)
+
+        active_list_idx = Bits(DEFAULT_CORE_CONFIG.active_list_idx_len)(0)
+        self.active_list.build(
+            push_inst=InstructionPushEntry(
+                valid=push,
+                pc=Bits(32)(0),
+                dest_logical=Bits(5)(1),
+                dest_new_physical=Bits(physical_bits)(40),
+                dest_old_physical=push_old,
+                has_dest=Bits(1)(1),
+                imm=Bits(32)(0),
+                is_branch=Bits(1)(0),
+                is_alu=Bits(1)(1),
+                predict_branch=Bits(1)(0),
+                is_jump=Bits(1)(0),
+                is_jalr=Bits(1)(0),
+                is_terminator=Bits(1)(0),
+                is_naturally_ready=Bits(1)(0),
+            ),
+            pop_enable=Bits(1)(0),
+            flush=flush,
+        )
+        self.alu_queue.build(
+            push_enable=alu_push,
+            push_data=ALUQueuePushEntry(
+                rs1_physical=alu_rs1,
+                rs2_physical=Bits(physical_bits)(0),
+                rd_physical=Bits(physical_bits)(41),
+                alu_op=Bits(ALU_CODE_LEN)(0),
+                imm=Bits(32)(1),
+                operant1_from=Bits(OPERANT_FROM_LEN)(OperantFrom.RS1.value),
+                operant2_from=Bits(OPERANT_FROM_LEN)(OperantFrom.IMM.value),
+                PC=Bits(32)(0),
+                is_branch=Bits(1)(0),
+                is_jalr=Bits(1)(0),
+                branch_flip=Bits(1)(0),
+            ),
+            pop_enable=alu_pop,
+            active_list_idx=active_list_idx,
+            flush=flush,
+        )
+        store_push, store_data = self.lsq.build(
+            push_enable=lsq_push,
+            push_data=LSQPushEntry(
+                rs1_physical=lsq_rs1,
+                rs2_physical=Bits(physical_bits)(0),
+                rd_physical=Bits(physical_bits)(42),
+                imm=Bits(32)(0),
+                is_load=Bits(1)(1),
+                is_store=Bits(1)(0),
+                op_type=Bits(3)(0),
+            ),
+            pop_enable=lsq_pop,
+            active_list_idx=active_list_idx,
+            flush=flush,
+        )
+        self.store_buffer.build(store_push, store_data, Bits(1)(0))
+        self.register_ready.build(flush_recover=Bits(1)(0))
+        self.early_release.build(
+            self.active_list,
+            self.alu_queue,
+            self.lsq,
+            self.store_buffer,
+            self.register_ready,
+            push_enable=push,
+            commit_push=Bits(1)(0),
+            flush=flush,
+        )
+
+        log(
+            "cycle: {}, released: {}, count: {}",
+            cycle_val,
+            self.early_release.released[0],
+            self.active_list.queue.count(),
+        )
+
+
+def test_early_release():
+    sys = SysBuilder("test_early_release")
+    with sys:
+        driver = Driver()
+        driver.build()
+
+    max_cycle = max(s.cycle for s in STEPS)
+    sim, ver = elaborate(sys, verilog=True, verbose=False, sim_threshold=max_cycle + 2)
+    raw, std_out, std_err = run_quietly(run_simulator, sim)
+    assert raw is not None, std_err
+
+    history = {}
+    for m in re.finditer(r"cycle: (\d+), released: (\d+), count: (\d+)", raw):
+        history[int(m.group(1))] = (int(m.group(2)), int(m.group(3)))
+
+    # history[c] is the state at the start of cycle c; a release in c shows in c + 1.
+    # Entry 0 is held while the add has not issued, entry 1 while the load is queued.
+    for cycle in range(2, 6):
+        assert history[cycle][0] == 0, f"Released with a reader at cycle {cycle}"
+    for cycle in range(6, 9):
+        assert history[cycle][0] == 0b01, f"Released with a queued load at cycle {cycle}"
+    assert history[9][0] == 0b11
+    # Entry 2 is not released in the flush cycle, and the Active List is empty after it.
+    assert history[12] == (0b11, 0)
+    # The reused entry 0 starts unreleased and is released once pushed.
+    assert history[14] == (0b10, 1)
+    assert history[15] == (0b11, 1)
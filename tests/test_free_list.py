@@ -15,6 +15,7 @@ class Step:
     push: Optional[int] = None # Free (push back)
     snapshot: bool = False
     recover: bool = False
+    share: Optional[int] = None # A committed move maps one more register to it
 
 # Test with 4 registers: 0, 1, 2, 3
 # Register 0 is reserved, so FreeList manages 1, 2, 3.
@@ -37,9 +38,9 @@ class Driver(Module):
     cycle: Array
     steps: list[Step]
 
-    def __init__(self, size: int, steps: list[Step]):
+    def __init__(self, size: int, steps: list[Step], shared_registers: bool = False):
         super().__init__(ports={})
-        self.free_list = FreeList(size)
+        self.free_list = FreeList(size, shared_registers=shared_registers)
         self.size = size
         self.cycle = RegArray(UInt(32), 1, initializer=[0])
         self.steps = steps
@@ -55,6 +56,8 @@ class Driver(Module):
         push_data = Bits(self.free_list.queue._dtype.bits)(0)
         make_snapshot = attach_context(Bits(1)(0))
         flush_recover = attach_context(Bits(1)(0))
+        share_enable = Bits(1)(0)
+        share_data = Bits(self.free_list.queue._dtype.bits)(0)
 
         for step in self.steps:
             cond = cycle_val == UInt(32)(step.cycle)
@@ -72,7 +75,22 @@ class Driver(Module):
             if step.recover:
                 flush_recover = cond.select(Bits(1)(1), flush_recover)
 
-        self.free_list.build(pop_enable, push_enable, push_data, make_snapshot, flush_recover)
+            if step.share is not None:
+                share_enable = cond.select(Bits(1)(1), share_enable)
+                share_data = cond.select(Bits(self.free_list.queue._dtype.bits)(step.share), share_data)
+
+        if self.free_list.sharers is None:
+            self.free_list.build(pop_enable, push_enable, push_data, make_snapshot, flush_recover)
+        else:
+            self.free_list.build(
+                pop_enable,
+                push_enable,
+                push_data,
+                make_snapshot,
+                flush_recover,
+                share_enable=attach_context(share_enable),
+                share_data=attach_context(share_data),
+            )
         
         # Outputs to check
         alloc_reg = self.free_list.free_reg()
@@ -269,3 +287,82 @@ def test_free_list_snapshot():
     # Count should be recalculated based on restored head and current tail
     # Head=1, Tail=4 -> Count=3
     assert state_c6["count"] == 3, f"Count mismatch: {state_c6['count']} != 3"
+
+
+def test_free_list_shared_registers():
+    steps = [
+        Step(1, pop=True),          # Alloc 1.
+        Step(2, share=1),           # A move maps a second register to 1.
+        Step(3, push=1),            # One mapping of 1 is overwritten; 1 stays allocated.
+        Step(4, share=1, push=1),   # mv x1, x1: one mapping replaced by another.
+        Step(5, push=1),            # The last mapping is overwritten; free 1.
+        Step(6),                    # Idle.
+    ]
+
+    sys = SysBuilder("test_free_list_shared_registers")
+    with sys:
+        driver = Driver(4, steps, shared_registers=True)
+        driver.build()
+
+    sim, ver = elaborate(sys, verilog=True, verbose=False, sim_threshold=10)
+    raw, std_out, std_err = run_quietly(run_simulator, sim)
+    assert raw is not None, std_err
+
+    history = parse_history(raw)
+    # Initial tail=3; only the push in cycle 5 reaches the queue.
+    assert [history[c]["tail"] for c in range(2, 7)] == [3, 3, 3, 3, 4]
+    assert history[6]["count"] == 3
+    assert history[6]["contents"][3] == 1
+
+
+def _run_recovery(name: str, size: int, steps: list[Step]):
+    sys = SysBuilder(name)
+    with sys:
+        driver = Driver(size, steps)
+        driver.build()
+
+    max_cycle = max(s.cycle for s in steps)
+    sim, ver = elaborate(sys, verilog=True, verbose=False, sim_threshold=max_cycle + 5)
+    raw, std_out, std_err = run_quietly(run_simulator, sim)
+    assert raw is not None, std_err
+    return parse_history(raw)
+
+
+def test_free_list_recovery_wraps_non_power_of_two():
+    # FreeList(3) is a 6-entry queue with 3-bit pointers: [1, 2], Head=0, Tail=2, Count=2.
+    steps = [
+        Step(1, pop=True, push=1),  # H=1, T=3
+        Step(2, pop=True, push=2),  # H=2, T=4
+        Step(3, pop=True, push=1),  # H=3, T=5
+        Step(4, pop=True, push=2),  # H=4, T=0
+        Step(5, pop=True, snapshot=True),  # The branch's own pop. Snapshot head=5, C=1
+        Step(6, pop=True),          # Wrong path. H=0 (wrapped), C=0
+        Step(7, push=1),            # Commit. T=1, C=1
+        Step(8, recover=True),      # Head=5: entries 5 and 0 are free again.
+        Step(9),                    # Idle.
+    ]
+    history = _run_recovery("test_free_list_recovery_wraps", 3, steps)
+
+    assert history[9]["head"] == 5
+    assert history[9]["tail"] == 1
+    assert history[9]["count"] == 2
+    assert history[9]["alloc_reg"] == history[5]["contents"][5]
+
+
+def test_free_list_recovery_when_empty():
+    # FreeList(4): [1, 2, 3], Head=0, Tail=3, Count=3.
+    steps = [
+        Step(1, pop=True),          # Alloc 1.
+        Step(2, pop=True),          # Alloc 2.
+        Step(3, pop=True),          # Alloc 3. Empty: Head=3, Tail=3.
+        Step(4, snapshot=True),     # A branch without rd is decoded.
+        Step(5, recover=True),      # Nothing was allocated or freed since.
+        Step(6),                    # Idle.
+    ]
+    history = _run_recovery("test_free_list_recovery_when_empty", 4, steps)
+
+    # Head equal to tail is an empty list, not a full one.
+    assert history[6]["head"] == 3
+    assert history[6]["tail"] == 3
+    assert history[6]["count"] == 0
+    assert history[6]["valid"] == 0
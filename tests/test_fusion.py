@@ -0,0 +1,143 @@
+from dataclasses import dataclass
+import re
+
+from assassyn.frontend import *
+from assassyn.backend import elaborate
+from assassyn.utils import run_simulator
+from tests.utils import run_quietly
+
+from r10k_cpu.downstreams.fetcher_impl import fetch_offset
+from r10k_cpu.fusion import MacroFusion
+from r10k_cpu.instruction import select_instruction_args
+
+PC = 0x100
+
+
+@dataclass
+class FusionTestCase:
+    name: str
+    instruction: int
+    next_instruction: int
+    expected: dict
+
+
+TEST_CASES = [
+    FusionTestCase(
+        "lui+addi",
+        0x123452B7,  # lui  x5, 0x12345
+        0x67828293,  # addi x5, x5, 0x678
+        # A LUI of the whole constant, at the addi.
+        {'fused': 1, 'compare_branch': 0, 'PC': PC + 4, 'imm': 0x12345678, 'has_rd': 1, 'alu_op': 8, 'operant1_from': 2, 'operant2_from': 2, 'is_jump': 0, 'is_branch': 0, 'branch_flip': 0}
+    ),
+    FusionTestCase(
+        "auipc+jalr",
+        0x00001097,  # auipc x1, 0x1
+        0x010080E7,  # jalr  x1, 0x10(x1)
+        # A JAL at the jalr: links PC + 4 and jumps to the auipc PC + 0x1010.
+        {'fused': 1, 'compare_branch': 0, 'PC': PC + 4, 'imm': 0x1010 - 4, 'has_rd': 1, 'alu_op': 0, 'operant1_from': 3, 'operant2_from': 4, 'is_jump': 1, 'is_branch': 0, 'branch_flip': 0}
+    ),
+    FusionTestCase(
+        "slt+bnez",
+        0x001022B3,  # slt  x5, x0, x1
+        0x00029463,  # bnez x5, 8
+        {'fused': 1, 'compare_branch': 1, 'PC': PC + 4, 'imm': 8, 'has_rd': 1, 'alu_op': 3, 'operant1_from': 0, 'operant2_from': 1, 'is_jump': 0, 'is_branch': 1, 'branch_flip': 0}
+    ),
+    FusionTestCase(
+        "lui+addi to another register",
+        0x123452B7,  # lui  x5, 0x12345
+        0x67828313,  # addi x6, x5, 0x678; x5 stays live
+        {'fused': 0, 'compare_branch': 0, 'PC': PC, 'imm': 0x12345000, 'has_rd': 1, 'alu_op': 8, 'operant1_from': 2, 'operant2_from': 2, 'is_jump': 0, 'is_branch': 0, 'branch_flip': 0}
+    ),
+    FusionTestCase(
+        # A branch to the second half of a pair fetches the addi first; it decodes alone.
+        "branch target at the addi",
+        0x67828293,  # addi x5, x5, 0x678
+        0x00528333,  # add  x6, x5, x5
+        {'fused': 0, 'compare_branch': 0, 'PC': PC, 'imm': 0x678, 'has_rd': 1, 'alu_op': 0, 'operant1_from': 0, 'operant2_from': 2, 'is_jump': 0, 'is_branch': 0, 'branch_flip': 0}
+    ),
+]
+
+FIELDS = ["has_rd", "imm", "alu_op", "operant1_from", "operant2_from", "is_jump", "is_branch", "branch_flip"]
+
+BRANCH_OFFSET = 0x40
+# (is_branch, predict_branch, fused) -> offset of the next fetch from the decoded PC.
+OFFSET_CASES = [
+    ((0, 0, 0), 4),
+    ((0, 0, 1), 8),
+    ((1, 0, 1), 8),  # Fall-through after a fused branch.
+    ((1, 1, 0), BRANCH_OFFSET),
+    ((1, 1, 1), BRANCH_OFFSET + 4),  # The branch is the second instruction of the pair.
+]
+
+
+class Driver(Module):
+    cycle: Array
+
+    def __init__(self):
+        super().__init__(ports={})
+        self.cycle = RegArray(UInt(32), 1, initializer=[0])
+
+    @module.combinational
+    def build(self):
+        self.cycle[0] = self.cycle[0] + UInt(32)(1)
+        cycle_val = self.cycle[0]
+
+        instr_val = Bits(32)(0)
+        next_val = Bits(32)(0)
+        for i, test in enumerate(TEST_CASES):
+            cond = cycle_val == UInt(32)(i + 1)
+            instr_val = cond.select(Bits(32)(test.instruction), instr_val)
+            next_val = cond.select(Bits(32)(test.next_instruction), next_val)
+
+        args = select_instruction_args(instr_val, instr_val[0:6], instr_val[12:14], instr_val[25:31])
+        fused = MacroFusion().apply(instr_val, next_val, args, Bits(32)(PC))
+
+        log_str = "cycle: {}, fused: {}, compare_branch: {}, PC: {}, "
+        log_args = [cycle_val, fused.fused, fused.compare_branch, fused.PC]
+        for field in FIELDS:
+            log_str += f"{field}: {{}}, "
+            log_args.append(getattr(fused.args, field))
+        log(log_str, *log_args)
+
+        offsets = [
+            fetch_offset(Bits(1)(is_branch), Bits(1)(predict), Bits(32)(BRANCH_OFFSET), Bits(1)(pair))
+            for (is_branch, predict, pair), _ in OFFSET_CASES
+        ]
+        log("offsets: " + "{}, " * len(offsets), *offsets)
+
+
+def check(raw: str):
+    history = {}
+    offsets = None
+    for line in raw.strip().split("\n"):
+        m = re.search(r"cycle: (\d+), (.*)", line)
+        if m:
+            data = {}
+            for pair in m.group(2).split(", "):
+                parts = pair.split(": ")
+                if len(parts) == 2:
+                    data[parts[0]] = int(parts[1].strip().rstrip(","))
+            history[int(m.group(1))] = data
+        m = re.search(r"offsets: (.*)", line)
+        if m:
+            offsets = [int(x) for x in m.group(1).split(",") if x.strip()]
+
+    for i, test in enumerate(TEST_CASES):
+        log_entry = history.get(i + 1)
+        assert log_entry, f"Missing log for cycle {i + 1}"
+        for k, v in test.expected.items():
+            assert log_entry.get(k) == v, f"{test.name}: Expected {k}={v}, got {log_entry.get(k)}"
+
+    assert offsets == [offset for _, offset in OFFSET_CASES]
+
+
+def test_macro_fusion_decode():
+    sys = SysBuilder("test_fusion")
+    with sys:
+        driver = Driver()
+        driver.build()
+
+    sim, _ = elaborate(sys, verilog=True, verbose=False, sim_threshold=len(TEST_CASES) + 2)
+    raw, _, stderr = run_quietly(run_simulator, sim)
+    assert raw is not None, stderr
+    check(raw)
@@ -1,5 +1,7 @@
 from dataclasses import dataclass
 from typing import Dict, Any, Optional, List
+import itertools
+import random
 import re
 
 from assassyn.frontend import *
@@ -7,7 +9,14 @@ from assassyn.backend import elaborate
 from assassyn.utils import run_simulator
 from tests.utils import run_quietly
 
-from r10k_cpu.instruction import select_instruction_args, ALU_Code, OperantFrom, MemoryOpType
+from r10k_cpu.instruction import (
+    Instructions,
+    select_instruction_args,
+    select_instruction_args_chain,
+    ALU_Code,
+    OperantFrom,
+    MemoryOpType,
+)
 
 @dataclass
 class InstructionTestCase:
@@ -206,8 +215,44 @@ TEST_CASES = [
         0x02A100F3,
         {'has_rd': 1, 'has_rs1': 1, 'has_rs2': 0, 'imm': 42, 'alu_op': 0, 'operant1_from': 0, 'operant2_from': 2, 'is_load': 0, 'is_store': 0, 'mem_op': 0, 'is_branch': 0, 'branch_flip': 0, 'is_terminator': 1, 'is_jump': 0, 'is_jalr': 0, 'is_alu': 1}
     ),
+    InstructionTestCase(
+        "RDCYCLE",
+        0xC00020F3,
+        {'has_rd': 1, 'has_rs1': 1, 'has_rs2': 0, 'imm': 0xFFFFFC00, 'alu_op': 8, 'operant1_from': 5, 'operant2_from': 5, 'is_load': 0, 'is_store': 0, 'mem_op': 0, 'is_branch': 0, 'branch_flip': 0, 'is_terminator': 0, 'is_jump': 0, 'is_jalr': 0, 'is_alu': 1}
+    ),
 ]
 
+
+def sweep_words(seed: int = 0) -> list[int]:
+    """Every table entry with random other bits, plus near misses that decode to nothing."""
+    rng = random.Random(seed)
+    words = []
+    for instr in Instructions:
+        entry = instr.value
+        for _ in range(3):
+            word = rng.getrandbits(32) & ~0x7F | entry.opcode
+            if entry.funct3 is not None:
+                word = word & ~(0x7 << 12) | entry.funct3 << 12
+            if entry.funct7 is not None:
+                word = word & ~(0x7F << 25) | entry.funct7 << 25
+            words.append(word)
+        if entry.funct7 is not None:
+            words.append(word ^ (0x40 << 25))
+    words += [rng.getrandbits(32) for _ in range(16)]
+    return words
+
+
+DECODE_WORDS = [test.instruction for test in TEST_CASES] + sweep_words()
+
+FIELDS = [
+    "has_rd", "has_rs1", "has_rs2", "imm",
+    "alu_op", "operant1_from", "operant2_from",
+    "is_load", "is_store", "mem_op",
+    "is_branch", "branch_flip", "is_terminator",
+    "is_jump", "is_jalr", "is_alu"
+]
+
+
 class Driver(Module):
     cycle: Array
     
@@ -222,42 +267,38 @@ class Driver(Module):
         
         instr_val = Bits(32)(0)
         
-        for i, test in enumerate(TEST_CASES):
+        for i, word in enumerate(DECODE_WORDS):
             cond = cycle_val == UInt(32)(i + 1)
-            instr_val = cond.select(Bits(32)(test.instruction), instr_val)
+            instr_val = cond.select(Bits(32)(word), instr_val)
             
         opcode = instr_val[0:6]
         funct3 = instr_val[12:14]
         funct7 = instr_val[25:31]
-        args = select_instruction_args(instr_val, opcode, funct3, funct7)
-        
-        log_str = "cycle: {}, instr: {:x}, "
-        log_args = [cycle_val, instr_val]
-        
-        fields = [
-            "has_rd", "has_rs1", "has_rs2", "imm", 
-            "alu_op", "operant1_from", "operant2_from",
-            "is_load", "is_store", "mem_op",
-            "is_branch", "branch_flip", "is_terminator",
-            "is_jump", "is_jalr", "is_alu"
-        ]
-        
-        for field in fields:
-            log_str += f"{field}: {{}}, "
-            log_args.append(getattr(args, field))
-            
-        log(log_str, *log_args)
+
+        # The decode ROM, then the mux chain it replaces as the reference.
+        for prefix, select in (("", select_instruction_args), ("chain ", select_instruction_args_chain)):
+            args = select(instr_val, opcode, funct3, funct7)
+
+            log_str = prefix + "cycle: {}, instr: {:x}, "
+            log_args = [cycle_val, instr_val]
+
+            for field in FIELDS:
+                log_str += f"{field}: {{}}, "
+                log_args.append(getattr(args, field))
+
+            log(log_str, *log_args)
 
 def check(raw: str):
     lines = raw.strip().split("\n")
     history = {}
+    chain_history = {}
     
     for line in lines:
-        m = re.search(r"cycle: (\d+), instr: ([0-9a-f]+), (.*)", line)
+        m = re.search(r"(chain )?cycle: (\d+), instr: ([0-9a-f]+), (.*)", line)
         if m:
-            cycle = int(m.group(1))
-            instr = int(m.group(2), 16)
-            rest = m.group(3)
+            cycle = int(m.group(2))
+            instr = int(m.group(3), 16)
+            rest = m.group(4)
             
             data = {"cycle": cycle, "instr": instr}
             
@@ -272,7 +313,7 @@ def check(raw: str):
                     v = v.strip().rstrip(",")
                     data[k] = int(v)
             
-            history[cycle] = data
+            (chain_history if m.group(1) else history)[cycle] = data
 
     for i, test in enumerate(TEST_CASES):
         cycle = i + 1
@@ -285,12 +326,28 @@ def check(raw: str):
             got = log_entry.get(k)
             assert got == v, f"{test.name}: Expected {k}={v}, got {got}"
 
+    for i, word in enumerate(DECODE_WORDS):
+        cycle = i + 1
+        assert history.get(cycle) and history[cycle]["instr"] == word, f"Missing log for cycle {cycle}"
+        assert history[cycle] == chain_history.get(cycle), f"Decode ROM differs for {word:08x}"
+
+
+def test_decode_rom_entries_are_exclusive():
+    # The ROM ORs the control words of all matching entries, so at most one may match.
+    entries = [instr.value for instr in Instructions]
+    for a, b in itertools.combinations(entries, 2):
+        if a.opcode != b.opcode:
+            continue
+        funct3_differs = None not in (a.funct3, b.funct3) and a.funct3 != b.funct3
+        funct7_differs = None not in (a.funct7, b.funct7) and a.funct7 != b.funct7
+        assert funct3_differs or funct7_differs, f"Overlapping entries {a} and {b}"
+
 def test_instruction_decode():
     sys = SysBuilder("test_instruction")
     with sys:
         driver = Driver()
         driver.build()
         
-    sim, _ = elaborate(sys, verilog=True, verbose=False, sim_threshold=len(TEST_CASES) + 2)
+    sim, _ = elaborate(sys, verilog=True, verbose=False, sim_threshold=len(DECODE_WORDS) + 2)
     raw, _, _ = run_quietly(run_simulator, sim)
     check(raw)
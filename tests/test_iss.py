@@ -0,0 +1,209 @@
+import functools
+import os
+from collections import Counter
+
+import pytest
+
+from r10k_cpu.common import DEFAULT_CORE_CONFIG, MemoryOpType
+from r10k_cpu.cosim import LockStepChecker
+from r10k_cpu.instruction import (
+    BTypeInstruction,
+    Instructions,
+    JTypeInstruction,
+    RTypeInstruction,
+    STypeInstruction,
+    UTypeInstruction,
+)
+from r10k_cpu.iss import ISS, CommitRecord, DecodedInstruction, decode
+from r10k_cpu.memory_image import MemoryImage
+from r10k_cpu.utils import memory_depth_for
+
+test_cases_path = "asms"
+
+
+def _iss(*words: int) -> ISS:
+    return ISS(MemoryImage.parse("\n".join(f"{word:08x}" for word in words)), memory_depth=1024)
+
+
+def test_decode_uses_instruction_table():
+    assert decode(0x02A10093).name == "ADDI"
+    assert decode(0x403150B3).name == "SRA"
+    assert decode(0x02C5C533).name == "DIV"
+    assert decode(0xFE000FA3).is_terminator
+    assert decode(0xFFF00193).imm == 0xFFFFFFFF  # addi x3, x0, -1
+    with pytest.raises(ValueError):
+        decode(0xFFFFFFFF)
+
+
+def test_step_commits_architectural_results():
+    iss = _iss(
+        0xFFF00093,  # addi x1, x0, -1
+        0x0000D133,  # srl  x2, x1, x0
+        0x0210C1B3,  # div  x3, x1, x1
+        0x00302223,  # sw   x3, 4(x0)
+        0x00401203,  # lh   x4, 4(x0)
+        0x0040006F,  # jal  x0, 4
+        0xFE000FA3,  # sb   x0, -1(x0)
+    )
+    assert list(iss.run()) == [
+        CommitRecord(0x00, 1, 0xFFFFFFFF),
+        CommitRecord(0x04, 2, 0xFFFFFFFF),
+        CommitRecord(0x08, 3, 1),
+        CommitRecord(0x0C, 0, 0),
+        CommitRecord(0x10, 4, 1),
+        CommitRecord(0x14, 0, 0),
+        CommitRecord(0x18, 0, 0),
+    ]
+    assert iss.halted
+
+
+def test_access_outside_memory_raises():
+    iss = _iss(
+        0x00001137,  # lui x2, 0x1
+        0x00012023,  # sw  x0, 0(x2)
+    )
+    iss.step()
+    with pytest.raises(ValueError, match="outside the 1024-word memory"):
+        iss.step()
+    with pytest.raises(ValueError):
+        iss.load(4 * 1024 - 2, MemoryOpType.WORD)
+    with pytest.raises(ValueError):
+        ISS(MemoryImage.parse("@1000\n00000000"), memory_depth=1024)
+
+
+@pytest.mark.parametrize("test_case", sorted(os.listdir(test_cases_path)))
+def test_iss_runs_asms(test_case):
+    hex_path = os.path.join(test_cases_path, test_case, test_case + ".hex")
+    with open(os.path.join(test_cases_path, test_case, test_case + ".out")) as f:
+        expected_result = int(f.readline())
+
+    iss = ISS.from_file(hex_path, memory_depth=memory_depth_for([hex_path]))
+    for _ in iss.run(max_instructions=10_000_000):
+        pass
+    assert iss.halted, f"{test_case} did not finish"
+    assert iss.regs[10] == expected_result & 0xFFFFFFFF
+
+
+def test_lock_step_checker_stops_at_first_difference():
+    lines = [
+        "Cycle @3.00: [Commit] Retire pc=00000000 rd=1 value=ffffffff",
+        "Cycle @4.00: [Commit] Retire pc=00000004 rd=2 value=00000000",
+    ]
+    checker = LockStepChecker(iss=_iss(0xFFF00093, 0x0000D133, 0xFE000FA3))
+    assert checker.feed(lines[0])
+    assert not checker.feed(lines[1])
+    assert checker.commits == 1
+    assert checker.mismatch.expected == CommitRecord(0x04, 2, 0xFFFFFFFF)
+    assert checker.result().aborted
+
+
+def test_lock_step_checker_steps_over_fused_pairs():
+    # lui x5, 0x12345; addi x5, x5, 0x678 commits once, as the addi.
+    checker = LockStepChecker(iss=_iss(0x123452B7, 0x67828293, 0xFE000FA3))
+    assert checker.feed("Cycle @5.00: [Commit] Retire pc=00000004 rd=5 value=12345678 n=2")
+    assert checker.feed("Cycle @6.00: [Commit] Retire pc=00000008 rd=0 value=00000000 n=1")
+    assert checker.iss.halted and checker.mismatch is None
+
+
+def test_lock_step_checker_keeps_fused_compare_result():
+    # slt x5, x0, x1; bnez x5, 8 commits once, at the bnez, with the slt result.
+    checker = LockStepChecker(iss=_iss(0xFFF00093, 0x001022B3, 0x00029463, 0xFE000FA3))
+    assert checker.feed("Cycle @3.00: [Commit] Retire pc=00000000 rd=1 value=ffffffff n=1")
+    assert checker.feed("Cycle @5.00: [Commit] Retire pc=00000008 rd=5 value=00000000 n=2")
+    assert checker.feed("Cycle @6.00: [Commit] Retire pc=0000000c rd=0 value=00000000 n=1")
+    assert checker.iss.halted and checker.mismatch is None
+
+
+@functools.cache
+def _executed_asms() -> dict[str, list[tuple[int, DecodedInstruction]]]:
+    """The (pc, instruction) sequence each program in asms/ executes."""
+    executed = {}
+    for test_case in sorted(os.listdir(test_cases_path)):
+        hex_path = os.path.join(test_cases_path, test_case, test_case + ".hex")
+        iss = ISS.from_file(hex_path, memory_depth=memory_depth_for([hex_path]))
+        executed[test_case] = [(record.pc, iss.fetch(record.pc)) for record in iss.run()]
+    return executed
+
+
+def _fusion_kind(first: DecodedInstruction, second: DecodedInstruction) -> str | None:
+    """The MacroFusion pattern of two adjacent instructions, if any."""
+    chained = second.rd == first.rd and second.rs1 == first.rd and first.rd != 0
+    if first.name == "LUI" and second.name == "ADDI" and chained:
+        return "li"
+    if first.name == "AUIPC" and second.name == "JALR" and chained:
+        return "call"
+    if (
+        first.name in ("SLT", "SLTU")
+        and second.name in ("BEQ", "BNE")
+        and second.rs1 == first.rd
+        and second.rs2 == 0
+        and first.rd != 0
+    ):
+        return "compare_branch"
+    return None
+
+
+def test_asms_exercise_macro_fusion():
+    # test_asms runs every program with macro_fusion on; each pair must occur for that to check it.
+    pairs = Counter(
+        _fusion_kind(first, second)
+        for executed in _executed_asms().values()
+        for (pc, first), (next_pc, second) in zip(executed, executed[1:])
+        if next_pc == pc + 4
+    )
+    assert pairs["li"] and pairs["call"] and pairs["compare_branch"]
+
+
+def test_asms_exercise_move_elimination():
+    # The MoveElimination cases: `mv` (addi rd, rs, 0) and the xor/sub rd, rs, rs zero idioms.
+    kinds = Counter(
+        "move" if instr.name == "ADDI" and instr.imm == 0 else "zero"
+        for executed in _executed_asms().values()
+        for _, instr in executed
+        if instr.rd != 0
+        and (
+            (instr.name == "ADDI" and instr.imm == 0)
+            or (instr.name in ("XOR", "SUB") and instr.rs1 == instr.rs2)
+        )
+    )
+    assert kinds["move"] and kinds["zero"]
+
+
+def test_asms_exercise_early_release():
+    # EarlyRelease only frees the register of an instruction with no older branch. It matters
+    # when more registers are written without a branch than rename has free registers.
+    free_registers = DEFAULT_CORE_CONFIG.physical_registers - 32
+
+    def longest_run(executed):
+        longest = run = 0
+        for _, instr in executed:
+            if isinstance(instr.info, BTypeInstruction) or instr.name == "JALR":
+                run = 0
+            elif instr.rd != 0:
+                run += 1
+                longest = max(longest, run)
+        return longest
+
+    assert max(longest_run(executed) for executed in _executed_asms().values()) > free_registers
+
+
+def _registers_read(instr: DecodedInstruction) -> tuple[int, ...]:
+    if isinstance(instr.info, (UTypeInstruction, JTypeInstruction)):
+        return ()
+    if isinstance(instr.info, (RTypeInstruction, STypeInstruction, BTypeInstruction)):
+        return (instr.rs1, instr.rs2)
+    return (instr.rs1,)
+
+
+def test_asms_exercise_speculative_load_wakeup():
+    # A load's result read by the next instruction is the case where the dependent, woken at
+    # load issue, takes the data from the LoadBypass rather than the register file.
+    load_uses = sum(
+        1
+        for executed in _executed_asms().values()
+        for (_, load), (_, user) in zip(executed, executed[1:])
+        if load.info.opcode == Instructions.LW.value.opcode
+        and load.rd != 0
+        and load.rd in _registers_read(user)
+    )
+    assert load_uses
@@ -0,0 +1,52 @@
+from r10k_cpu.konata import convert, parse_trace
+
+# Two runs of Active List entry 0: an addi, then a branch that mispredicts and flushes the
+# load decoded behind it.
+SIM_OUTPUT = """\
+Cycle @1.00: [FetcherImpl] [Trace] F pc=00000000
+Cycle @2.00: [FetcherImpl] [Trace] F pc=00000004
+Cycle @2.00: [Decoder] [Trace] D pc=00000000 rob=0 instr=00100093
+Cycle @3.00: [FetcherImpl] [Trace] F pc=00000008
+Cycle @3.00: [Decoder] [Trace] D pc=00000004 rob=1 instr=00008463
+Cycle @4.00: [SchedulerDown] [Trace] I rob=0 unit=alu
+Cycle @4.00: [Decoder] [Trace] D pc=00000008 rob=2 instr=0000a103
+Cycle @5.00: [ALU] [Trace] C rob=0
+Cycle @5.00: [SchedulerDown] [Trace] I rob=1 unit=alu
+Cycle @6.00: [ALU] [Trace] C rob=1
+Cycle @6.00: [Commit] [Trace] R rob=0 flush=0
+Cycle @7.00: [FetcherImpl] [Trace] F pc=0000000c
+Cycle @7.00: [Commit] [Trace] R rob=1 flush=1
+Cycle @8.00: [Decoder] [Trace] D pc=0000000c rob=0 instr=00000013
+Cycle @8.00: [Commit] PC=0x00000000, x10=0x00000000, retire_count=2
+"""
+
+
+def test_parse_trace_tracks_reused_entries_and_flushes():
+    addi, branch, load, nop = parse_trace(SIM_OUTPUT.splitlines())
+
+    assert (addi.fetch, addi.decode, addi.issue, addi.complete, addi.retire) == (1, 2, 4, 5, 6)
+    assert not addi.flushed
+    assert (branch.retire, branch.flushed) == (7, False)
+    # Never issued, dropped when the branch commits.
+    assert (load.issue, load.retire, load.flushed) == (None, 7, True)
+    # Reuses entry 0 and is still in flight at the end of the run.
+    assert (nop.rob, nop.seq, nop.fetch, nop.retire) == (0, 3, 7, None)
+
+    assert [name for name, _ in addi.stages()] == ["F", "Dc", "Ds", "Is", "Cm"]
+    assert [name for name, _ in load.stages()] == ["F", "Dc", "Ds"]
+
+
+def test_convert_emits_kanata():
+    lines = convert(SIM_OUTPUT.splitlines()).splitlines()
+
+    assert lines[:3] == ["Kanata\t0004", "C=\t1", "I\t0\t0\t0"]
+    assert "L\t0\t0\t00000000: 00100093" in lines
+    assert "R\t0\t0\t0" in lines and "R\t1\t1\t0" in lines
+    # Flushed instructions are retired with type 1.
+    assert "R\t2\t2\t1" in lines
+    assert not any(line.startswith("R\t3\t") for line in lines)
+
+    # Cycles only move forward, up to the dispatch of the last instruction.
+    deltas = [int(line.split("\t")[1]) for line in lines if line.startswith("C\t")]
+    assert all(delta > 0 for delta in deltas)
+    assert 1 + sum(deltas) == 9
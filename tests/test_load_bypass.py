@@ -0,0 +1,107 @@
+import re
+
+from assassyn.frontend import *
+from assassyn.backend import elaborate
+from assassyn.utils import run_simulator
+
+from r10k_cpu.common import MEMORY_OP_TYPE_LEN, MemoryOpType
+from r10k_cpu.downstreams.load_bypass import LoadBypass
+from r10k_cpu.downstreams.register_ready import RegisterReady
+from r10k_cpu.modules.byte_memory import ByteAddressableMemory, MemoryRequest
+from tests.utils import run_quietly
+
+
+NUM_REGS = 64
+# The load's destination, and the value it holds before the load writes it back.
+DEST = 5
+STALE = 7
+WORD = 0x12345678
+STORE_CYCLE = 1
+DECODE_CYCLE = 2
+# (cycle, op type, byte offset) of the loads of WORD.
+LOADS = [
+    (3, MemoryOpType.WORD, 0),
+    (5, MemoryOpType.HALF, 2),
+]
+
+
+class Driver(Module):
+    def __init__(self):
+        super().__init__(ports={})
+        self.memory = ByteAddressableMemory(depth=16)
+        self.load_bypass = LoadBypass(memory=self.memory, port=0)
+        self.ready = RegisterReady(num_registers=NUM_REGS)
+        initializer = [0] * NUM_REGS
+        initializer[DEST] = STALE
+        self.register_file = RegArray(Bits(32), NUM_REGS, initializer=initializer)
+        self.cycle = RegArray(UInt(32), 1, initializer=[0])
+
+    @module.combinational
+    def build(self):
+        self.cycle[0] = self.cycle[0] + UInt(32)(1)
+        cycle_val = self.cycle[0]
+        dest = Bits(self.ready.index_bits)(DEST)
+
+        store = cycle_val == UInt(32)(STORE_CYCLE)
+        load = Bits(1)(0)
+        op_type = Bits(MEMORY_OP_TYPE_LEN)(MemoryOpType.WORD.value)
+        byte_offset = Bits(2)(0)
+        for cycle, load_op, offset in LOADS:
+            cond = cycle_val == UInt(32)(cycle)
+            load = cond.select(Bits(1)(1), load)
+            op_type = cond.select(Bits(MEMORY_OP_TYPE_LEN)(load_op.value), op_type)
+            byte_offset = cond.select(Bits(2)(offset), byte_offset)
+
+        self.memory.build(
+            [
+                MemoryRequest(
+                    we=store,
+                    re=load,
+                    word_addr=Bits(30)(3),
+                    wdata=Bits(32)(WORD),
+                    op_type=op_type,
+                    byte_offset=byte_offset,
+                )
+            ]
+        )
+
+        # Decode marks the destination not ready; issuing the load wakes it up again.
+        self.ready.mark_not_ready(dest, enable=cycle_val == UInt(32)(DECODE_CYCLE))
+        self.ready.mark_ready(dest, enable=load)
+        self.load_bypass.track(
+            enable=load, dest_physical=dest, op_type=op_type, byte_offset=byte_offset
+        )
+        self.load_bypass.build()
+        self.ready.build(flush_recover=Bits(1)(0))
+
+        # A dependent selected as soon as the destination is ready reads its operand here.
+        log(
+            "cycle: {}, ready: {}, value: {}",
+            cycle_val,
+            self.ready.read(dest),
+            self.load_bypass.read(self.register_file, dest),
+        )
+
+
+def test_load_bypass():
+    sys = SysBuilder("test_load_bypass")
+    with sys:
+        driver = Driver()
+        driver.build()
+
+    sim, ver = elaborate(sys, verilog=True, verbose=False, sim_threshold=10)
+    raw, std_out, std_err = run_quietly(run_simulator, sim)
+    assert raw is not None, std_err
+
+    history = {}
+    for m in re.finditer(r"cycle: (\d+), ready: (\d+), value: (\d+)", raw):
+        history[int(m.group(1))] = (int(m.group(2)), int(m.group(3)))
+
+    # Not ready between decode and the load's issue; the register file is stale.
+    assert history[3] == (0, STALE)
+    # The load's WriteBack cycle: woken at issue, the operand comes from the SRAM output.
+    assert history[4] == (1, WORD)
+    # A halfword load takes the aligned, sign-extended half.
+    assert history[6] == (1, (WORD >> 16) & 0xFFFF)
+    # Without a load completing, the register file is read.
+    assert history[7] == (1, STALE)
@@ -0,0 +1,256 @@
+import re
+
+from assassyn.frontend import *
+from assassyn.backend import elaborate
+from assassyn.utils import run_simulator
+from tests.utils import run_quietly
+
+from r10k_cpu.common import (
+    ALU_CODE_LEN,
+    DEFAULT_CORE_CONFIG,
+    MEMORY_OP_TYPE_LEN,
+    OPERANT_FROM_LEN,
+    MemoryOpType,
+)
+from r10k_cpu.downstreams.active_list import ActiveList, InstructionPushEntry
+from r10k_cpu.downstreams.alu_queue import ALUQueue, ALUQueuePushEntry
+from r10k_cpu.downstreams.lsq import LSQ, LSQPushEntry, StoreBuffer
+from r10k_cpu.downstreams.register_ready import RegisterReady
+from r10k_cpu.downstreams.scheduler_down import LoadPortDown, SchedulerDown
+from r10k_cpu.modules.byte_memory import ByteAddressableMemory
+from r10k_cpu.modules.lsu import LSU
+from r10k_cpu.modules.scheduler import Scheduler
+from r10k_cpu.modules.writeback import WriteBack
+from r10k_cpu.pipeline_trace import PipelineTrace
+
+NUM_REGS = DEFAULT_CORE_CONFIG.physical_registers
+PHYSICAL_BITS = DEFAULT_CORE_CONFIG.physical_idx_len
+# (base register, its value, data register, data, destination, Active List index) of each
+# store and the load reading it back. Words 2 and 4 both live in bank 0 of two.
+ACCESSES = [
+    (1, 8, 3, 0xAAAA0001, 10, 1),
+    (2, 16, 4, 0xBBBB0002, 11, 2),
+]
+STORE_CYCLES = [1, 2]
+LOAD_CYCLES = [3, 4]
+# The bases are not ready in between, so both loads become issuable in the same cycle.
+BASE_BUSY_CYCLE = 1
+BASE_READY_CYCLE = 6
+LAST_CYCLE = 16
+
+
+class IdleUnit(Module):
+    """Stands in for the ALUs, to which nothing is issued."""
+
+    div_busy: Array
+
+    def __init__(self, name: str):
+        super().__init__(ports={"instr": Port(DEFAULT_CORE_CONFIG.alu_queue_entry_type)})
+        self.name = name
+        self.div_busy = RegArray(Bits(1), 1)
+
+    @module.combinational
+    def build(self):
+        self.pop_all_ports(False)
+
+
+class Driver(Module):
+    cycle: Array
+
+    def __init__(self):
+        super().__init__(ports={})
+        self.cycle = RegArray(UInt(32), 1, initializer=[0])
+
+    @module.combinational
+    def build(self, scheduler: Scheduler, register_ready: RegisterReady, register_file: Array):
+        self.cycle[0] = self.cycle[0] + UInt(32)(1)
+        cycle_val = self.cycle[0]
+        scheduler.async_called()
+
+        def reg(idx: int) -> Value:
+            return Bits(PHYSICAL_BITS)(idx)
+
+        store = load = Bits(1)(0)
+        store_rs1 = store_rs2 = load_rs1 = load_rd = reg(0)
+        load_rob = Bits(DEFAULT_CORE_CONFIG.active_list_idx_len)(0)
+        for (base, _, data_reg, _, dest, rob), store_cycle, load_cycle in zip(
+            ACCESSES, STORE_CYCLES, LOAD_CYCLES
+        ):
+            cond = cycle_val == UInt(32)(store_cycle)
+            store = cond.select(Bits(1)(1), store)
+            store_rs1 = cond.select(reg(base), store_rs1)
+            store_rs2 = cond.select(reg(data_reg), store_rs2)
+            cond = cycle_val == UInt(32)(load_cycle)
+            load = cond.select(Bits(1)(1), load)
+            load_rs1 = cond.select(reg(base), load_rs1)
+            load_rd = cond.select(reg(dest), load_rd)
+            load_rob = cond.select(Bits(DEFAULT_CORE_CONFIG.active_list_idx_len)(rob), load_rob)
+
+        for base, *_ in ACCESSES:
+            register_ready.mark_not_ready(reg(base), enable=cycle_val == UInt(32)(BASE_BUSY_CYCLE))
+            register_ready.mark_ready(reg(base), enable=cycle_val == UInt(32)(BASE_READY_CYCLE))
+
+        with Condition(cycle_val == UInt(32)(LAST_CYCLE)):
+            log(
+                "results: " + "{} " * len(ACCESSES),
+                *[register_file[dest] for *_, dest, _ in ACCESSES],
+            )
+
+        committed_store = DEFAULT_CORE_CONFIG.lsq_entry_type.bundle(
+            valid=Bits(1)(1),
+            active_list_idx=Bits(DEFAULT_CORE_CONFIG.active_list_idx_len)(0),
+            lsq_queue_idx=Bits(DEFAULT_CORE_CONFIG.lsq_idx_len)(0),
+            rs1_physical=store_rs1,
+            rs2_physical=store_rs2,
+            rd_physical=reg(0),
+            imm=Bits(32)(0),
+            is_load=Bits(1)(0),
+            is_store=Bits(1)(1),
+            op_type=Bits(MEMORY_OP_TYPE_LEN)(MemoryOpType.WORD.value),
+            issued=Bits(1)(0),
+        )
+        load_entry = LSQPushEntry(
+            rs1_physical=load_rs1,
+            rs2_physical=reg(0),
+            rd_physical=load_rd,
+            imm=Bits(32)(0),
+            is_load=Bits(1)(1),
+            is_store=Bits(1)(0),
+            op_type=Bits(MEMORY_OP_TYPE_LEN)(MemoryOpType.WORD.value),
+        )
+        return store, committed_store, load, load_entry, load_rob
+
+
+def test_same_bank_loads_replay():
+    initializer = [0] * NUM_REGS
+    for base, address, data_reg, data, *_ in ACCESSES:
+        initializer[base] = address
+        initializer[data_reg] = data
+
+    sys = SysBuilder("test_load_ports")
+    with sys:
+        register_file = RegArray(Bits(32), NUM_REGS, initializer=initializer)
+        register_ready = RegisterReady(NUM_REGS)
+        active_list = ActiveList()
+        alu_queue = ALUQueue()
+        lsq = LSQ()
+        store_buffer = StoreBuffer()
+        memory = ByteAddressableMemory(depth=16, num_banks=2)
+        flush = RegArray(Bits(1), 1)
+        alu = IdleUnit("ALU")
+        multiply_alu = IdleUnit("Multiply_ALU")
+        lsu = LSU()
+        load_lsu = LSU(name="LSU1")
+        writeback = WriteBack()
+        load_writeback = WriteBack(name="WriteBack1")
+        scheduler = Scheduler()
+        driver = Driver()
+
+        store_push, committed_store, load_push, load_entry, load_rob = driver.build(
+            scheduler, register_ready, register_file
+        )
+        alu.build()
+        multiply_alu.build()
+        memory.build(
+            [
+                lsu.build(physical_register_file=register_file, wb=writeback),
+                load_lsu.build(physical_register_file=register_file, wb=load_writeback),
+            ]
+        )
+        scheduler_down_entry, store_buffer_pop, load_port_entry = scheduler.build(
+            alu_queue=alu_queue,
+            lsq=lsq,
+            store_buffer=store_buffer,
+            register_ready=register_ready,
+            alu=alu,
+            multiply_alu=multiply_alu,
+            lsu=lsu,
+            load_lsu=load_lsu,
+            trace=PipelineTrace(),
+        )
+        grant = SchedulerDown().build(scheduler_down_entry, Bits(1)(0))
+        LoadPortDown().build(load_port_entry, Bits(1)(0), grant=grant)
+        writeback.build(
+            active_list=active_list,
+            register_ready=register_ready,
+            physical_register_file=register_file,
+            memory=memory,
+        )
+        load_writeback.build(
+            active_list=active_list,
+            register_ready=register_ready,
+            physical_register_file=register_file,
+            memory=memory,
+            port=1,
+            lsq=lsq,
+            flush=flush,
+        )
+
+        active_list.build(
+            push_inst=InstructionPushEntry(
+                valid=Bits(1)(0),
+                pc=Bits(32)(0),
+                dest_logical=Bits(5)(0),
+                dest_new_physical=Bits(PHYSICAL_BITS)(0),
+                dest_old_physical=Bits(PHYSICAL_BITS)(0),
+                has_dest=Bits(1)(0),
+                imm=Bits(32)(0),
+                is_branch=Bits(1)(0),
+                is_alu=Bits(1)(0),
+                predict_branch=Bits(1)(0),
+                is_jump=Bits(1)(0),
+                is_jalr=Bits(1)(0),
+                is_terminator=Bits(1)(0),
+                is_naturally_ready=Bits(1)(0),
+            ),
+            pop_enable=Bits(1)(0),
+            flush=Bits(1)(0),
+        )
+        alu_queue.build(
+            push_enable=Bits(1)(0),
+            push_data=ALUQueuePushEntry(
+                rs1_physical=Bits(PHYSICAL_BITS)(0),
+                rs2_physical=Bits(PHYSICAL_BITS)(0),
+                rd_physical=Bits(PHYSICAL_BITS)(0),
+                alu_op=Bits(ALU_CODE_LEN)(0),
+                imm=Bits(32)(0),
+                operant1_from=Bits(OPERANT_FROM_LEN)(0),
+                operant2_from=Bits(OPERANT_FROM_LEN)(0),
+                PC=Bits(32)(0),
+                is_branch=Bits(1)(0),
+                is_jalr=Bits(1)(0),
+                branch_flip=Bits(1)(0),
+            ),
+            pop_enable=Bits(1)(0),
+            active_list_idx=Bits(DEFAULT_CORE_CONFIG.active_list_idx_len)(0),
+            flush=Bits(1)(0),
+        )
+        lsq.build(
+            push_enable=load_push,
+            push_data=load_entry,
+            pop_enable=Bits(1)(0),
+            active_list_idx=load_rob,
+            flush=Bits(1)(0),
+        )
+        store_buffer.build(store_push, committed_store, store_buffer_pop)
+        register_ready.build(flush_recover=Bits(1)(0))
+
+    sim, ver = elaborate(sys, verilog=True, verbose=False, sim_threshold=LAST_CYCLE + 2)
+    raw, std_out, std_err = run_quietly(run_simulator, sim)
+    assert raw is not None, std_err
+
+    issues = {}
+    for m in re.finditer(r"Cycle @(\d+)\.\d+:.*\[Trace\] I rob=(\d+) unit=(\w+)", raw):
+        issues.setdefault(int(m.group(2)), []).append((int(m.group(1)), m.group(3)))
+    (first_rob, second_rob) = [rob for *_, rob in ACCESSES]
+
+    # Both loads are selected in the same cycle, one for each LSU.
+    assert len(issues[first_rob]) == 1
+    cycle, unit = issues[first_rob][0]
+    assert unit == "lsu" and issues[second_rob][0] == (cycle, "lsu1")
+    # The second LSU loses bank 0 to the first and its load is issued again.
+    assert len(issues[second_rob]) == 2 and issues[second_rob][1][0] > cycle
+
+    m = re.search(r"results: ([\d ]+)", raw)
+    assert m is not None, raw
+    assert [int(x) for x in m.group(1).split()] == [data for _, _, _, data, *_ in ACCESSES]
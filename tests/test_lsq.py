@@ -91,6 +91,18 @@ STEPS = [
     Step(26, push={"is_load": 1, "is_store": 0, "op_type": 0, "imm": 0}),
     Step(27, flush=True, push={"is_load": 0, "is_store": 1, "op_type": 0, "imm": 0}),
     Step(28),
+    # Dual load issue. Queue is empty again. Head=0, Tail=0.
+    # Step index 28: Load at 0, rs1=30. Step index 29: Load at 1, rs1=31.
+    Step(29, push={"is_load": 1, "is_store": 0, "op_type": 0, "imm": 0}),
+    Step(30, push={"is_load": 1, "is_store": 0, "op_type": 0, "imm": 0}),
+    Step(31, reg_ready=[30, 31]),  # Expect select 0, second select 1.
+    Step(32, reg_ready=[31]),  # Expect select 1, no second select.
+    # Step index 32: Store at 2. Step index 33: Load at 3, rs1=35.
+    Step(33, push={"is_load": 0, "is_store": 1, "op_type": 0, "imm": 0}),
+    Step(34, push={"is_load": 1, "is_store": 0, "op_type": 0, "imm": 0}),
+    Step(35, reg_ready=[31, 35]),  # Store at 2 blocks the load at 3: second select none.
+    Step(36, reg_ready=[30, 31, 35], issue_idx=0),  # Expect select 0, second select 1.
+    Step(37, reg_ready=[30, 31, 35]),  # 0 issued. Expect select 1 only.
 ]
 
 
@@ -196,13 +208,14 @@ class Driver(Module):
 
         mock_ready = MockRegisterReady(ready_indices_map, cycle_val)
         selection = self.queue.select_first_ready(mock_ready)
+        _, second_selection = self.queue.select_two_ready(mock_ready)
 
         front_entry = self.queue.queue._dtype.view(self.queue.queue.front())
 
         log_str = (
             "cycle: {}, head: {}, tail: {}, count: {}, push_en: {}, pop_en: {}, "
             "front_valid: {}, front_queue_idx: {}, sel_valid: {}, sel_idx: {}, "
-            "check_idx: {}, is_store_before: {}, contents: "
+            "sel2_valid: {}, sel2_idx: {}, check_idx: {}, is_store_before: {}, contents: "
         )
 
         args = [
@@ -216,6 +229,8 @@ class Driver(Module):
             front_entry.lsq_queue_idx,
             selection.valid,
             selection.index,
+            second_selection.valid,
+            second_selection.index,
             check_idx_val,
             is_store_before_res,
         ]
@@ -242,13 +257,13 @@ def parse_line(line: str) -> Optional[Dict[str, Any]]:
     base_match = re.search(
         r"cycle: (\d+), head: (\d+), tail: (\d+), count: (\d+), push_en: (\d+), pop_en: (\d+), "
         r"front_valid: (\d+), front_queue_idx: (\d+), sel_valid: (\d+), sel_idx: (\d+), "
-        r"check_idx: (\d+), is_store_before: (\d+), contents: (.*)",
+        r"sel2_valid: (\d+), sel2_idx: (\d+), check_idx: (\d+), is_store_before: (\d+), contents: (.*)",
         line,
     )
     if not base_match:
         return None
 
-    entry_block = base_match.group(13)
+    entry_block = base_match.group(15)
     entries: Dict[int, Dict[str, int]] = {}
     for match in re.finditer(r"E(\d+):([0-9]+),([0-9]+),([0-9]+),([0-9]+),([0-9]+),([0-9]+),([0-9]+);", entry_block):
         idx = int(match.group(1))
@@ -273,8 +288,10 @@ def parse_line(line: str) -> Optional[Dict[str, Any]]:
         "front_queue_idx": int(base_match.group(8)),
         "sel_valid": int(base_match.group(9)),
         "sel_idx": int(base_match.group(10)),
-        "check_idx": int(base_match.group(11)),
-        "is_store_before": int(base_match.group(12)),
+        "sel2_valid": int(base_match.group(11)),
+        "sel2_idx": int(base_match.group(12)),
+        "check_idx": int(base_match.group(13)),
+        "is_store_before": int(base_match.group(14)),
         "entries": entries,
     }
 
@@ -335,8 +352,7 @@ def check(raw: str):
         step = step_map.get(cycle)
         
         # Check selection
-        expected_sel_valid = 0
-        expected_sel_idx = 0
+        expected_selected: List[int] = []
         
         if step and step.reg_ready is not None:
             ready_regs = set(step.reg_ready)
@@ -354,13 +370,19 @@ def check(raw: str):
                 rs1_ok = entry["rs1"] in ready_regs
 
                 if rs1_ok:
-                    expected_sel_valid = 1
-                    expected_sel_idx = idx
-                    break
-        
+                    expected_selected.append(idx)
+                    if len(expected_selected) == 2:
+                        break
+
+        expected_sel_valid = int(len(expected_selected) >= 1)
         assert log_entry["sel_valid"] == expected_sel_valid, f"Cycle {cycle}: expected sel_valid {expected_sel_valid}, got {log_entry['sel_valid']}"
         if expected_sel_valid:
-            assert log_entry["sel_idx"] == expected_sel_idx, f"Cycle {cycle}: expected sel_idx {expected_sel_idx}, got {log_entry['sel_idx']}"
+            assert log_entry["sel_idx"] == expected_selected[0], f"Cycle {cycle}: expected sel_idx {expected_selected[0]}, got {log_entry['sel_idx']}"
+
+        expected_sel2_valid = int(len(expected_selected) == 2)
+        assert log_entry["sel2_valid"] == expected_sel2_valid, f"Cycle {cycle}: expected sel2_valid {expected_sel2_valid}, got {log_entry['sel2_valid']}"
+        if expected_sel2_valid:
+            assert log_entry["sel2_idx"] == expected_selected[1], f"Cycle {cycle}: expected sel2_idx {expected_selected[1]}, got {log_entry['sel2_idx']}"
 
         # Check is_store_before
         if step and step.check_idx is not None:
@@ -203,3 +203,63 @@ def test_map_table():
     print(f"DEBUG: stderr output:\n{stderr}")
     assert raw is not None, stderr
     check(raw)
+
+
+# (logical, physical) rename writes per cycle, in program order.
+MULTI_RENAMES = {
+    1: [(1, 40), (2, 41)],
+    2: [(3, 42), (3, 43)],  # The younger write to x3 wins.
+}
+
+
+class MultiWriterDriver(Module):
+    def __init__(self):
+        super().__init__(ports={})
+        self.map_table = MapTable(num_logical=32, physical_bits=6)
+        self.cycle = RegArray(UInt(32), 1, initializer=[0])
+
+    @module.combinational
+    def build(self):
+        self.cycle[0] = self.cycle[0] + UInt(32)(1)
+        cycle_val = self.cycle[0]
+
+        writes = []
+        for port in range(2):
+            enable = Bits(1)(0)
+            logical = Bits(self.map_table.logical_bits)(0)
+            physical = Bits(self.map_table.physical_bits)(0)
+            for cycle, renames in MULTI_RENAMES.items():
+                cond = cycle_val == UInt(32)(cycle)
+                enable = cond.select(Bits(1)(1), enable)
+                logical = cond.select(Bits(self.map_table.logical_bits)(renames[port][0]), logical)
+                physical = cond.select(Bits(self.map_table.physical_bits)(renames[port][1]), physical)
+            writes.append(MapTableWriteEntry(enable=enable, logical_idx=logical, physical_value=physical))
+
+        self.map_table.build(rename_write=writes, commit_write=[], flush_to_commit=Bits(1)(0))
+
+        reads = self.map_table.read_spec_many(
+            [Bits(self.map_table.logical_bits)(i) for i in (1, 2, 3)]
+        )
+        log("cycle: {}, reads: {} {} {}", cycle_val, *reads)
+
+
+def test_map_table_multiple_writers():
+    sys = SysBuilder("test_map_table_multiple_writers")
+    with sys:
+        driver = MultiWriterDriver()
+        driver.build()
+
+    sim, _ = elaborate(sys, verilog=True, verbose=False, sim_threshold=8)
+    raw, _, stderr = run_quietly(run_simulator, sim)
+    assert raw is not None, stderr
+
+    reads = {}
+    for line in raw.splitlines():
+        if "reads:" not in line:
+            continue
+        parts = line[line.find("cycle:") :].replace(",", "").split()
+        reads[int(parts[1])] = [int(part) for part in parts[3:6]]
+
+    assert reads[1] == [0, 0, 0]
+    assert reads[2] == [40, 41, 0]
+    assert reads[3] == [40, 41, 43]
@@ -0,0 +1,128 @@
+import os
+import struct
+
+from r10k_cpu.memory_image import MemoryImage, image_file_paths, prepare_image_files
+
+
+HEX = "\n".join(
+    [
+        "00010137",
+        "00c000ef",
+        "@20",
+        "deadbeef",
+        "01020304",
+        "0000000a",
+        "",
+    ]
+)
+
+
+def _read(path: str) -> list[str]:
+    with open(path, "r") as f:
+        return f.read().splitlines()
+
+
+def test_single_bank_files(tmp_path):
+    init_file = str(tmp_path / "prog.hex")
+    with open(init_file, "w") as f:
+        f.write(HEX)
+
+    paths = prepare_image_files(init_file)
+    assert paths == image_file_paths(str(tmp_path / "prog"))
+
+    bf, b0, b1, b2, b3 = (_read(path) for path in paths)
+    assert bf == ["00010137", "00c000ef", "@8", "deadbeef", "01020304", "0000000a"]
+    assert b0 == ["37", "ef", "@8", "ef", "04", "0a"]
+    assert b1 == ["01", "00", "@8", "be", "03", "00"]
+    assert b2 == ["01", "c0", "@8", "ad", "02", "00"]
+    assert b3 == ["00", "00", "@8", "de", "01", "00"]
+
+
+def test_banked_files():
+    image = MemoryImage.parse(HEX)
+    lanes = [text.splitlines() for text in image.lane_files(num_banks=2)]
+
+    # Words 0, 8, 10 go to bank 0 at rows 0, 4, 5; words 1, 9 to bank 1 at rows 0, 4.
+    assert lanes[0] == ["37", "@4", "ef", "0a"]
+    assert lanes[4] == ["ef", "@4", "04"]
+    assert lanes[7] == ["00", "@4", "01"]
+
+
+def test_unchanged_input_is_not_rewritten(tmp_path):
+    init_file = str(tmp_path / "prog.hex")
+    with open(init_file, "w") as f:
+        f.write(HEX)
+    output_base = str(tmp_path / "work" / "exe")
+    os.makedirs(os.path.dirname(output_base))
+
+    paths = prepare_image_files(init_file, output_base=output_base)
+    os.utime(paths[1], ns=(0, 0))
+
+    # Same mtime: skipped without reading the input.
+    prepare_image_files(init_file, output_base=output_base)
+    assert os.stat(paths[1]).st_mtime_ns == 0
+
+    # Touched but same content: skipped after hashing.
+    os.utime(init_file, ns=(10**9, 10**9))
+    prepare_image_files(init_file, output_base=output_base)
+    assert os.stat(paths[1]).st_mtime_ns == 0
+
+    with open(init_file, "w") as f:
+        f.write("00000001\n")
+    prepare_image_files(init_file, output_base=output_base)
+    assert _read(paths[1]) == ["01"]
+
+
+def _elf(segments: list[tuple[int, int, bytes, int]]) -> bytes:
+    """A minimal RV32 ELF with (p_type, p_paddr, data, p_memsz) program headers."""
+    phoff = 52
+    data_offset = phoff + 32 * len(segments)
+    header = b"\x7fELF" + bytes([1, 1, 1]) + bytes(9)
+    header += struct.pack("<HHIIIIIHHHHHH", 2, 0xF3, 1, 0, phoff, 0, 0, 52, 32, len(segments), 40, 0, 0)
+
+    program_headers = b""
+    payload = b""
+    for p_type, p_paddr, data, p_memsz in segments:
+        program_headers += struct.pack(
+            "<8I", p_type, data_offset + len(payload), p_paddr, p_paddr, len(data), p_memsz, 5, 4
+        )
+        payload += data
+    return header + program_headers + payload
+
+
+def test_elf_segments(tmp_path):
+    text = bytes.fromhex("37010100" "ef00c000")  # lui sp, 0x10 ; jal ra, 12
+    data = bytes([0xAA, 0xBB])
+    elf = _elf(
+        [
+            (1, 0x0, text, len(text)),
+            (4, 0x40, b"\xff" * 4, 4),  # PT_NOTE is not loaded
+            (1, 0x1002, data, 0x100),  # half-word aligned, followed by .bss
+        ]
+    )
+
+    image = MemoryImage.parse_elf(elf)
+    assert image.hex_file().splitlines() == ["@0", "00010137", "00c000ef", "@1000", "bbaa0000"]
+    assert image.lane_files()[0].splitlines() == ["@0", "37", "ef", "@400", "00"]
+
+    elf_file = str(tmp_path / "prog.elf")
+    with open(elf_file, "wb") as f:
+        f.write(elf)
+    paths = prepare_image_files(elf_file)
+    assert paths[0] == str(tmp_path / "prog_bf.hex")
+    assert _read(paths[0]) == ["@0", "00010137", "00c000ef", "@400", "bbaa0000"]
+
+
+def test_memory_end_covers_bss(tmp_path):
+    text = bytes(8)
+    elf = _elf(
+        [
+            (1, 0x0, text, len(text)),
+            (1, 0x9000, bytes(4), 0xFE8),  # .data followed by .bss up to 0x9FE8
+            (1, 0xA000, b"", 0x2000),  # .bss-only segment
+        ]
+    )
+    image = MemoryImage.parse_elf(elf)
+    assert image.end_word == 0xC000 // 4
+    assert MemoryImage.parse(HEX).end_word == 0x20 // 4 + 3
+
@@ -0,0 +1,178 @@
+from dataclasses import dataclass
+import re
+
+from assassyn.frontend import *
+from assassyn.backend import elaborate
+from assassyn.utils import run_simulator
+from tests.utils import run_quietly
+
+from r10k_cpu.downstreams.active_list import ActiveList, InstructionPushEntry
+from r10k_cpu.instruction import select_instruction_args
+from r10k_cpu.move_elimination import MoveElimination, rename_destination
+
+PHYSICAL_BITS = 6
+# rs1's physical register, the Free List head and the zero register.
+PHYSICAL_RS1 = 17
+FREE_REG = 40
+ZERO_REG = 0
+
+
+@dataclass
+class RenameTestCase:
+    name: str
+    instruction: int
+    expected: dict
+
+
+# Eliminated ops come first: each retires the cycle after rename, without an ALU push.
+# The first op that is not eliminated then stays at the head, as nothing executes it.
+TEST_CASES = [
+    RenameTestCase(
+        "mv x5, x6",
+        0x00030293,  # addi x5, x6, 0
+        {'eliminated': 1, 'physical': PHYSICAL_RS1, 'allocates': 0, 'issues': 0},
+    ),
+    RenameTestCase(
+        "xor x5, x6, x6",
+        0x006342B3,
+        {'eliminated': 1, 'physical': ZERO_REG, 'allocates': 0, 'issues': 0},
+    ),
+    RenameTestCase(
+        "sub x5, x6, x6",
+        0x406302B3,
+        {'eliminated': 1, 'physical': ZERO_REG, 'allocates': 0, 'issues': 0},
+    ),
+    RenameTestCase(
+        "nop",
+        0x00000013,  # addi x0, x0, 0
+        {'eliminated': 1, 'physical': ZERO_REG, 'allocates': 0, 'issues': 0},
+    ),
+    RenameTestCase(
+        "addi x5, x6, 1",
+        0x00130293,
+        {'eliminated': 0, 'physical': FREE_REG, 'allocates': 1, 'issues': 1},
+    ),
+    RenameTestCase(
+        "xor x5, x6, x7",
+        0x007342B3,
+        {'eliminated': 0, 'physical': FREE_REG, 'allocates': 1, 'issues': 1},
+    ),
+]
+
+NUM_ELIMINATED = sum(test.expected['eliminated'] for test in TEST_CASES)
+
+
+class Driver(Module):
+    active_list: ActiveList
+    cycle: Array
+
+    def __init__(self):
+        super().__init__(ports={})
+        self.active_list = ActiveList(8)
+        self.cycle = RegArray(UInt(32), 1, initializer=[0])
+
+    @module.combinational
+    def build(self):
+        self.cycle[0] = self.cycle[0] + UInt(32)(1)
+        cycle_val = self.cycle[0]
+
+        valid = Bits(1)(0)
+        instruction = Bits(32)(0)
+        pc = Bits(32)(0)
+        for i, test in enumerate(TEST_CASES):
+            cond = cycle_val == UInt(32)(i + 1)
+            valid = cond.select(Bits(1)(1), valid)
+            instruction = cond.select(Bits(32)(test.instruction), instruction)
+            pc = cond.select(Bits(32)(4 * i), pc)
+
+        opcode = instruction[0:6]
+        funct3 = instruction[12:14]
+        funct7 = instruction[25:31]
+        args = select_instruction_args(instruction, opcode, funct3, funct7)
+        dest_valid = args.has_rd & (instruction[7:11] != Bits(5)(0))
+        renamed = rename_destination(
+            MoveElimination(),
+            instruction,
+            opcode,
+            funct3,
+            funct7,
+            args.is_alu,
+            dest_valid,
+            Bits(PHYSICAL_BITS)(PHYSICAL_RS1),
+            Bits(PHYSICAL_BITS)(FREE_REG),
+            Bits(PHYSICAL_BITS)(ZERO_REG),
+        )
+
+        # Commit pops the head once it is ready; eliminated ops are pushed ready.
+        front = self.active_list.queue.front()
+        retire = ~self.active_list.queue.is_empty() & front.ready
+        self.active_list.build(
+            push_inst=InstructionPushEntry(
+                valid=valid,
+                pc=pc,
+                dest_logical=instruction[7:11],
+                dest_new_physical=renamed.physical,
+                dest_old_physical=Bits(PHYSICAL_BITS)(0),
+                has_dest=dest_valid,
+                imm=args.imm,
+                is_branch=args.is_branch,
+                is_alu=args.is_alu,
+                predict_branch=Bits(1)(0),
+                is_jump=args.is_jump,
+                is_jalr=args.is_jalr,
+                is_terminator=Bits(1)(0),
+                is_naturally_ready=renamed.eliminated,
+                is_eliminated=renamed.eliminated,
+            ),
+            pop_enable=retire,
+            flush=Bits(1)(0),
+        )
+
+        log(
+            "cycle: {}, eliminated: {}, physical: {}, allocates: {}, issues: {}, retire: {}, retire_pc: {}",
+            cycle_val,
+            renamed.eliminated,
+            renamed.physical,
+            renamed.allocates,
+            renamed.issues,
+            retire,
+            front.pc,
+        )
+
+
+def check(raw: str):
+    history = {}
+    for line in raw.strip().split("\n"):
+        m = re.search(r"cycle: (\d+), (.*)", line)
+        if m:
+            data = {}
+            for pair in m.group(2).split(", "):
+                key, value = pair.split(": ")
+                data[key] = int(value)
+            history[int(m.group(1))] = data
+
+    for i, test in enumerate(TEST_CASES):
+        log_entry = history.get(i + 1)
+        assert log_entry, f"Missing log for cycle {i + 1}"
+        for k, v in test.expected.items():
+            assert log_entry[k] == v, f"{test.name}: Expected {k}={v}, got {log_entry[k]}"
+
+    # Each eliminated op is at the head and retires the cycle after rename.
+    for i in range(NUM_ELIMINATED):
+        assert history[i + 2]['retire'] == 1, TEST_CASES[i].name
+        assert history[i + 2]['retire_pc'] == 4 * i
+    # The first op that issues waits for its ALU result.
+    for cycle in range(NUM_ELIMINATED + 2, len(TEST_CASES) + 3):
+        assert history[cycle]['retire'] == 0
+
+
+def test_move_elimination_rename():
+    sys = SysBuilder("test_move_elimination")
+    with sys:
+        driver = Driver()
+        driver.build()
+
+    sim, _ = elaborate(sys, verilog=True, verbose=False, sim_threshold=len(TEST_CASES) + 4)
+    raw, _, stderr = run_quietly(run_simulator, sim)
+    assert raw is not None, stderr
+    check(raw)
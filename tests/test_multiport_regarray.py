@@ -0,0 +1,70 @@
+import re
+
+import pytest
+
+from assassyn.frontend import *
+from assassyn.backend import elaborate
+from assassyn.utils import run_simulator
+
+from dataclass.multiport_regarray import MultiPortRegArray
+from tests.utils import run_quietly
+
+
+# Not a power of two, so the read tree is padded.
+DEPTH = 5
+# (addr, data) of the three write ports in cycle 1; ports 0 and 2 both write entry 1.
+WRITES = [(1, 10), (3, 30), (1, 12)]
+
+
+class Driver(Module):
+    def __init__(self):
+        super().__init__(ports={})
+        self.array = MultiPortRegArray(
+            Bits(32), DEPTH, num_write_ports=len(WRITES), num_read_ports=2, initializer=[7] * DEPTH
+        )
+        self.cycle = RegArray(UInt(32), 1, initializer=[0])
+
+    @module.combinational
+    def build(self):
+        self.cycle[0] = self.cycle[0] + UInt(32)(1)
+        cycle_val = self.cycle[0]
+
+        write_enable = cycle_val == UInt(32)(1)
+        self.array.write_ports(
+            [(write_enable, Bits(3)(addr), Bits(32)(data)) for addr, data in WRITES]
+        )
+
+        read_addrs = [Bits(3)(1), Bits(3)(3)]
+        bypassed = self.array.read_ports(read_addrs, bypass=True)
+        stored = self.array.read_ports(read_addrs, bypass=False)
+        with Condition(cycle_val <= UInt(32)(2)):
+            log(
+                "cycle {}: bypassed {} {}, stored {} {}",
+                cycle_val,
+                *bypassed.values,
+                *stored.values,
+            )
+
+
+def test_multiport_regarray():
+    sys = SysBuilder("test_multiport_regarray")
+    with sys:
+        driver = Driver()
+        driver.build()
+
+    sim, ver = elaborate(sys, verilog=True, verbose=False, sim_threshold=5)
+    raw, std_out, std_err = run_quietly(run_simulator, sim)
+    assert raw is not None, std_err
+
+    results = {}
+    for m in re.finditer(r"cycle (\d+): bypassed (\d+) (\d+), stored (\d+) (\d+)", raw):
+        results[int(m.group(1))] = [int(m.group(i)) for i in range(2, 6)]
+
+    # Same cycle: only the bypassed reads see the writes, and the last port wins.
+    assert results[1] == [12, 30, 7, 7]
+    assert results[2] == [12, 30, 12, 30]
+
+
+def test_multiport_regarray_checks_port_counts():
+    with pytest.raises(ValueError):
+        MultiPortRegArray(Bits(32), 4, num_write_ports=0)
@@ -0,0 +1,198 @@
+from dataclasses import dataclass
+from typing import Optional
+import re
+
+from assassyn.frontend import *
+from assassyn.backend import elaborate
+from assassyn.utils import run_simulator
+from tests.utils import run_quietly
+
+from dataclass.circular_queue import CircularQueueSelection
+from dataclass.multiport_regarray import BankedRegArray
+from r10k_cpu.common import ALU_CODE_LEN, DEFAULT_CORE_CONFIG, OPERANT_FROM_LEN, ALU_Code, OperantFrom
+from r10k_cpu.downstreams.alu_queue import ALUQueue
+from r10k_cpu.downstreams.load_bypass import operand_port_types
+from r10k_cpu.downstreams.scheduler_down import SchedulerDown, SchedulerDownEntry
+
+NUM_REGS = DEFAULT_CORE_CONFIG.physical_registers
+PHYSICAL_BITS = DEFAULT_CORE_CONFIG.physical_idx_len
+
+
+def register_value(idx: int) -> int:
+    return 100 + idx
+
+
+@dataclass
+class Step:
+    cycle: int
+    # (rs1, rs2) of the selected ALU op; rs2 None for an immediate op.
+    alu: Optional[tuple[int, Optional[int]]] = None
+    load: Optional[int] = None  # base register of the selected load
+    store: Optional[tuple[int, int]] = None  # (rs1, rs2) of the committed store
+
+
+# Two banks (even and odd registers) with two read ports each.
+STEPS = [
+    Step(1, alu=(2, 4), load=6),  # Three bank-0 reads: the load waits.
+    Step(2, alu=(2, 3), load=6),  # Two bank-0 reads and one bank-1 read all fit.
+    Step(3, alu=(1, None), store=(8, 10)),  # The store takes bank 0, the ALU op reads bank 1.
+    Step(4, alu=(2, 3), store=(8, 10)),  # The store cannot wait: the ALU op is held back.
+]
+# Issue cycle -> operands each unit receives, read through the bank ports.
+EXPECTED_ALU = {1: (2, 4), 2: (2, 3), 3: (1, None)}
+EXPECTED_LSU = {2: (6, None), 3: (8, 10), 4: (8, 10)}
+
+
+class Unit(Module):
+    """Stands in for an execution unit: logs the operands it was issued."""
+
+    div_busy: Array
+
+    def __init__(self, name: str, entry_type: Record):
+        super().__init__(ports=operand_port_types(entry_type, True))
+        self.name = name
+        self.div_busy = RegArray(Bits(1), 1)
+
+    @module.combinational
+    def build(self, cycle: Array):
+        _, rs1_value, rs2_value = self.pop_all_ports(False)
+        log(f"{self.name}: {{}} {{}} {{}}", cycle[0], rs1_value, rs2_value)
+
+
+class Queue:
+    """Stands in for the ALU queue and the LSQ, whose entries SchedulerDown marks issued."""
+
+    operands_needed = staticmethod(ALUQueue.operands_needed)
+
+    def mark_issued(self, index: Value):
+        pass
+
+
+class Driver(Module):
+    cycle: Array
+
+    def __init__(self):
+        super().__init__(ports={})
+        self.cycle = RegArray(UInt(32), 1, initializer=[0])
+
+    @module.combinational
+    def build(self, alu: Unit, multiply_alu: Unit, lsu: Unit, register_banks: BankedRegArray):
+        self.cycle[0] = self.cycle[0] + UInt(32)(1)
+        cycle_val = self.cycle[0]
+
+        def reg(idx: Optional[int]) -> Value:
+            return Bits(PHYSICAL_BITS)(idx or 0)
+
+        alu_valid = load_valid = store_valid = Bits(1)(0)
+        alu_rs1 = alu_rs2 = load_rs1 = store_rs1 = store_rs2 = reg(0)
+        alu_operand2 = Bits(OPERANT_FROM_LEN)(OperantFrom.RS2.value)
+        for step in STEPS:
+            cond = cycle_val == UInt(32)(step.cycle)
+            if step.alu is not None:
+                alu_valid = cond.select(Bits(1)(1), alu_valid)
+                alu_rs1 = cond.select(reg(step.alu[0]), alu_rs1)
+                alu_rs2 = cond.select(reg(step.alu[1]), alu_rs2)
+                if step.alu[1] is None:
+                    alu_operand2 = cond.select(Bits(OPERANT_FROM_LEN)(OperantFrom.IMM.value), alu_operand2)
+            if step.load is not None:
+                load_valid = cond.select(Bits(1)(1), load_valid)
+                load_rs1 = cond.select(reg(step.load), load_rs1)
+            if step.store is not None:
+                store_valid = cond.select(Bits(1)(1), store_valid)
+                store_rs1 = cond.select(reg(step.store[0]), store_rs1)
+                store_rs2 = cond.select(reg(step.store[1]), store_rs2)
+
+        alu_instr = DEFAULT_CORE_CONFIG.alu_queue_entry_type.bundle(
+            valid=Bits(1)(1),
+            active_list_idx=Bits(DEFAULT_CORE_CONFIG.active_list_idx_len)(0),
+            alu_queue_idx=Bits(DEFAULT_CORE_CONFIG.alu_queue_idx_len)(0),
+            rs1_physical=alu_rs1,
+            rs2_physical=alu_rs2,
+            rd_physical=reg(0),
+            alu_op=Bits(ALU_CODE_LEN)(ALU_Code.ADD.value),
+            imm=Bits(32)(0),
+            operant1_from=Bits(OPERANT_FROM_LEN)(OperantFrom.RS1.value),
+            operant2_from=alu_operand2,
+            PC=Bits(32)(0),
+            is_branch=Bits(1)(0),
+            is_jalr=Bits(1)(0),
+            branch_flip=Bits(1)(0),
+            issued=Bits(1)(0),
+        )
+
+        def lsq_instr(valid, rs1, rs2, is_store):
+            return DEFAULT_CORE_CONFIG.lsq_entry_type.bundle(
+                valid=valid,
+                active_list_idx=Bits(DEFAULT_CORE_CONFIG.active_list_idx_len)(0),
+                lsq_queue_idx=Bits(DEFAULT_CORE_CONFIG.lsq_idx_len)(0),
+                rs1_physical=rs1,
+                rs2_physical=rs2,
+                rd_physical=reg(0),
+                imm=Bits(32)(0),
+                is_load=~is_store,
+                is_store=is_store,
+                op_type=Bits(3)(0),
+                issued=Bits(1)(0),
+            )
+
+        def selection(data, valid):
+            return CircularQueueSelection(
+                data=data, index=Bits(1)(0), distance=Bits(1)(0), valid=valid
+            )
+
+        queue = Queue()
+        return SchedulerDownEntry(
+            alu_selection=selection(alu_instr, alu_valid),
+            alu=alu,
+            multiply_alu=multiply_alu,
+            alu_queue=queue,
+            buffer_valid=store_valid,
+            buffer_instr=lsq_instr(store_valid, store_rs1, store_rs2, Bits(1)(1)),
+            lsu=lsu,
+            lsq_selection=selection(lsq_instr(load_valid, load_rs1, reg(0), Bits(1)(0)), load_valid),
+            lsq=queue,
+            register_banks=register_banks,
+        )
+
+
+def parse(raw: str, unit: str) -> dict[int, tuple[int, int]]:
+    issued = {}
+    for m in re.finditer(rf"\b{unit}: (\d+) (\d+) (\d+)", raw):
+        # The unit executes the cycle after the issue.
+        issued[int(m.group(1)) - 1] = (int(m.group(2)), int(m.group(3)))
+    return issued
+
+
+def test_scheduler_reads_operands_through_bank_ports():
+    sys = SysBuilder("test_scheduler_banks")
+    with sys:
+        register_banks = BankedRegArray(
+            Bits(32),
+            NUM_REGS,
+            num_banks=2,
+            read_ports_per_bank=2,
+            initializer=[register_value(i) for i in range(NUM_REGS)],
+        )
+        alu = Unit("ALU", DEFAULT_CORE_CONFIG.alu_queue_entry_type)
+        multiply_alu = Unit("Multiply_ALU", DEFAULT_CORE_CONFIG.alu_queue_entry_type)
+        lsu = Unit("LSU", DEFAULT_CORE_CONFIG.lsq_entry_type)
+        driver = Driver()
+
+        entry = driver.build(alu, multiply_alu, lsu, register_banks)
+        SchedulerDown().build(entry, Bits(1)(0))
+        for unit in (alu, multiply_alu, lsu):
+            unit.build(driver.cycle)
+
+    max_cycle = max(step.cycle for step in STEPS)
+    sim, ver = elaborate(sys, verilog=True, verbose=False, sim_threshold=max_cycle + 3)
+    raw, std_out, std_err = run_quietly(run_simulator, sim)
+    assert raw is not None, std_err
+
+    def values(operands):
+        rs1, rs2 = operands
+        # Reads without a port grant (an operand the op does not use) return zero.
+        return (register_value(rs1), register_value(rs2) if rs2 is not None else 0)
+
+    assert parse(raw, "ALU") == {cycle: values(ops) for cycle, ops in EXPECTED_ALU.items()}
+    assert parse(raw, "LSU") == {cycle: values(ops) for cycle, ops in EXPECTED_LSU.items()}
+    assert parse(raw, "Multiply_ALU") == {}
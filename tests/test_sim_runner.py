@@ -0,0 +1,109 @@
+import os
+
+from r10k_cpu.sim_runner import (
+    IMAGE_DIR_ENV,
+    CommitLogParser,
+    Terminator,
+    map_programs,
+    run_program,
+    stream_program,
+    work_image_files,
+)
+
+
+def _square(x: int) -> int:
+    return x * x
+
+
+def test_map_programs_keeps_order():
+    assert map_programs(_square, 4, [(i,) for i in range(10)]) == [i * i for i in range(10)]
+    assert map_programs(_square, 1, [(3,)]) == [9]
+
+
+def test_programs_run_in_their_own_directories(tmp_path):
+    # Stands in for the simulator: prints the word file it finds in its working directory.
+    binary = tmp_path / "sim"
+    binary.write_text(f"#!/bin/sh\ncat {work_image_files()[0]}\n")
+    os.chmod(binary, 0o755)
+
+    programs = []
+    for value in range(3):
+        program = tmp_path / f"p{value}.hex"
+        program.write_text(f"{value:08x}\n")
+        programs.append((str(binary), str(program), str(tmp_path / "work" / f"p{value}"), 1, f"p{value}"))
+
+    runs = map_programs(run_program, 3, programs)
+    assert [run.name for run in runs] == ["p0", "p1", "p2"]
+    assert [run.stdout for run in runs] == [f"{value:08x}\n" for value in range(3)]
+
+    binary.write_text("#!/bin/sh\necho broken >&2\nexit 1\n")
+    failed = run_program(*programs[0])
+    assert failed.stdout is None and failed.error == "broken"
+
+
+def test_image_dir_from_environment(tmp_path, monkeypatch):
+    binary = tmp_path / "sim"
+    binary.write_text(f"#!/bin/sh\ncat {work_image_files()[1]}\n")
+    os.chmod(binary, 0o755)
+    program = tmp_path / "p.hex"
+    program.write_text("000000ab\n")
+
+    monkeypatch.setenv(IMAGE_DIR_ENV, str(tmp_path / "image"))
+    run = run_program(str(binary), str(program))
+    assert run.stdout == "ab\n"
+    assert os.path.exists(tmp_path / "image" / os.path.basename(work_image_files()[1]))
+
+
+SIM_LINES = [
+    "@line:10 Cycle @1.00: [Decoder] decoded",
+    "@line:20 Cycle @5.00: [Commit] [Perf] cycle=5, instret=2, mispredict=0",
+    "@line:30 Cycle @5.00: [Commit] PC=0x00000008, x10=0x0000002A, retire_count=2",
+]
+
+
+def test_commit_log_parser_keeps_aggregates_and_tail():
+    parser = CommitLogParser(tail_lines=2)
+    for line in SIM_LINES:
+        assert parser.feed(line + "\n")
+
+    run = parser.result("p")
+    assert run.ok and (run.lines, run.commit_lines, run.last_cycle) == (3, 2, 5)
+    assert run.terminator == Terminator(cycles=5, pc=8, x10=42, retired=2)
+    assert run.perf == {"cycle": 5, "instret": 2, "mispredict": 0}
+    assert run.tail == SIM_LINES[1:]
+
+
+def test_stream_program_aborts_on_failure(tmp_path):
+    binary = tmp_path / "sim"
+    lines = "\n".join(f"echo '{line}'" for line in SIM_LINES[:2])
+    # The simulator would keep running for a minute after the failure.
+    binary.write_text(f"#!/bin/sh\n{lines}\necho 'ASSERTION FAILED'\nexec sleep 60\n")
+    os.chmod(binary, 0o755)
+    program = tmp_path / "p.hex"
+    program.write_text("00000000\n")
+
+    run = stream_program(str(binary), str(program), str(tmp_path / "work"), abort_on="FAILED")
+    assert run.aborted and not run.ok
+    assert run.error == "aborted on: ASSERTION FAILED"
+    assert run.terminator is None and run.perf["cycle"] == 5
+
+    binary.write_text(f"#!/bin/sh\n{lines}\necho 'PC=0x0, x10=0x1' >&2\nexit 3\n")
+    failed = stream_program(str(binary), str(program), str(tmp_path / "work"))
+    assert not failed.aborted and failed.error == "PC=0x0, x10=0x1"
+
+
+def test_temporary_work_dir_is_removed(tmp_path, monkeypatch):
+    # Stands in for the simulator: reports the directory it runs in.
+    binary = tmp_path / "sim"
+    binary.write_text("#!/bin/sh\npwd\n")
+    os.chmod(binary, 0o755)
+    program = tmp_path / "p.hex"
+    program.write_text("00000000\n")
+
+    monkeypatch.delenv(IMAGE_DIR_ENV, raising=False)
+    run = run_program(str(binary), str(program))
+    assert os.path.basename(run.stdout.strip()).startswith("r10k-")
+    assert not os.path.exists(run.stdout.strip())
+
+    streamed = stream_program(str(binary), str(program), tail_lines=1)
+    assert streamed.ok and not os.path.exists(streamed.tail[0].strip())